@@ -5,9 +5,9 @@ import asyncio
 import logging
 import os
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from strawberry.fastapi import GraphQLRouter
 from strawberry.subscriptions import GRAPHQL_TRANSPORT_WS_PROTOCOL, GRAPHQL_WS_PROTOCOL
@@ -41,11 +41,14 @@ import uvicorn
 from copy import deepcopy
 from uvicorn.config import LOGGING_CONFIG
 
+from selfprivacy_api.actions.api_tokens import is_token_valid
 from selfprivacy_api.dependencies import get_api_version
 from selfprivacy_api.graphql.schema import schema
+from selfprivacy_api.jobs.export_logs import get_log_export_path
 from selfprivacy_api.migrations import run_migrations
 from selfprivacy_api.services.suggested import SuggestedServices
 from selfprivacy_api.utils.otel import OTEL_ENABLED, setup_instrumentation
+from selfprivacy_api.utils.prometheus_client import PrometheusClient
 from selfprivacy_api.utils.memory_profiler import memory_profiler_task
 
 from starlette.middleware.sessions import SessionMiddleware
@@ -155,6 +158,7 @@ async def app_lifespan(app: FastAPI):
     try:
         yield
     finally:
+        await PrometheusClient().aclose()
         # Flush OpenTelemetry logs/traces on shutdown
         try:
             logger_provider.shutdown()
@@ -201,6 +205,25 @@ async def get_version():
     return {"version": get_api_version()}
 
 
+@app.get("/api/logs/export/{job_id}")
+async def download_log_export(job_id: str, request: Request):
+    """Download the file written by a finished log export job"""
+    token = request.headers.get("Authorization")
+    if token is None:
+        token = request.query_params.get("token")
+    if token is None or not await is_token_valid(token.replace("Bearer ", "")):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    path = get_log_export_path(job_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Log export not found")
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        filename=f"logs-{job_id}.log.gz",
+    )
+
+
 @app.get("/")
 async def root():
     return RedirectResponse(url="/user")
@@ -645,8 +645,7 @@ class Backups:
         """
         upstream_snapshots = Backups.provider().backupper.get_snapshots()
         Storage.invalidate_snapshot_storage()
-        for snapshot in upstream_snapshots:
-            Storage.cache_snapshot(snapshot)
+        Storage.cache_snapshots(upstream_snapshots)
 
     @staticmethod
     @tracer.start_as_current_span("snapshot_restored_size")
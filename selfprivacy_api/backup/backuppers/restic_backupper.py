@@ -275,6 +275,7 @@ class ResticBackupper(AbstractBackupper):
                     job,
                     JobStatus.RUNNING,
                     progress=int(message["percent_done"] * 100),
+                    throttle=True,
                 )
         return message
 
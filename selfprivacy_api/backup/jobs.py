@@ -27,11 +27,8 @@ def restore_job_type(service: Service) -> str:
 
 def get_jobs_by_service(service: Service) -> List[Job]:
     result = []
-    for job in Jobs.get_jobs():
-        if job.type_id.startswith(job_type_prefix(service)) and job.status in [
-            JobStatus.CREATED,
-            JobStatus.RUNNING,
-        ]:
+    for job in get_ok_jobs():
+        if job.type_id.startswith(job_type_prefix(service)):
             result.append(job)
     return result
 
@@ -153,25 +150,17 @@ def get_failed_job_by_type(type_id: str) -> Optional[Job]:
 
 
 def get_jobs_by_type(type_id: str):
-    return [job for job in Jobs.get_jobs() if job.type_id == type_id]
+    return Jobs.get_jobs_by_type(type_id)
 
 
-# Can be moved out to Jobs
 def get_ok_jobs() -> List[Job]:
-    return [
-        job
-        for job in Jobs.get_jobs()
-        if job.status
-        in [
-            JobStatus.CREATED,
-            JobStatus.RUNNING,
-        ]
-    ]
+    return Jobs.get_jobs_by_status(JobStatus.CREATED) + Jobs.get_jobs_by_status(
+        JobStatus.RUNNING
+    )
 
 
-# Can be moved out to Jobs
 def get_failed_jobs() -> List[Job]:
-    return [job for job in Jobs.get_jobs() if job.status == JobStatus.ERROR]
+    return Jobs.get_jobs_by_status(JobStatus.ERROR)
 
 
 def intersection(a: Iterable, b: Iterable):
@@ -16,6 +16,7 @@ from selfprivacy_api.graphql.common_types.backup import (
 from selfprivacy_api.utils.redis_pool import RedisPool
 from selfprivacy_api.utils.redis_model_storage import (
     store_model_as_hash,
+    store_models_as_hashes,
     hash_as_model,
 )
 
@@ -101,6 +102,15 @@ class Storage:
         snapshot_key = Storage.__snapshot_key(snapshot)
         store_model_as_hash(redis, snapshot_key, snapshot)
 
+    @staticmethod
+    @tracer.start_as_current_span("cache_snapshots")
+    def cache_snapshots(snapshots: List[Snapshot]) -> None:
+        """Stores metadata of many snapshots in redis in one round trip"""
+        store_models_as_hashes(
+            redis,
+            [(Storage.__snapshot_key(snapshot), snapshot) for snapshot in snapshots],
+        )
+
     @staticmethod
     @tracer.start_as_current_span("delete_cached_snapshot")
     def delete_cached_snapshot(snapshot: Snapshot) -> None:
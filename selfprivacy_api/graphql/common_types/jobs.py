@@ -3,10 +3,11 @@
 # pylint: disable=too-few-public-methods
 import datetime
 from opentelemetry import trace
-from typing import Optional
+from typing import Iterable, List, Optional
 import strawberry
 
 from selfprivacy_api.jobs import Job, Jobs
+from selfprivacy_api.jobs.history import ArchivedJob
 from selfprivacy_api.utils.localization import TranslateSystemMessage as t
 
 tracer = trace.get_tracer(__name__)
@@ -35,6 +36,24 @@ class ApiJob:
     result_args: strawberry.Private[Optional[dict]] = None
 
 
+@strawberry.type
+class ApiJobDelta:
+    """A change of a single job. job is null if the job was removed or expired."""
+
+    uid: str
+    job: Optional[ApiJob]
+
+
+@strawberry.type
+class ApiJobsPage:
+    """A page of jobs, most recently updated first."""
+
+    jobs: List[ApiJob]
+    next_cursor: Optional[str] = strawberry.field(
+        description="Pass it as cursor to get the next page. Null on the last page."
+    )
+
+
 def job_to_api_job(job: Job) -> ApiJob:
     """Convert a Job from jobs controller to a GraphQL ApiJob."""
     return ApiJob(
@@ -58,6 +77,28 @@ def job_to_api_job(job: Job) -> ApiJob:
     )
 
 
+def archived_job_to_api_job(job: ArchivedJob) -> ApiJob:
+    """Convert a job from the history archive to a GraphQL ApiJob."""
+    return ApiJob(
+        uid=job.uid,
+        type_id=job.type_id,
+        name=job.name,
+        description=job.description,
+        status=job.status,
+        status_text=None,
+        progress=None,
+        created_at=job.created_at,
+        updated_at=job.finished_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        result=job.result,
+        name_args=job.name_args,
+        description_args=job.description_args,
+        error_args=job.error_args,
+        result_args=job.result_args,
+    )
+
+
 async def get_api_job_by_id(job_id: str) -> Optional[ApiJob]:
     """Get a job for GraphQL by its ID."""
     with tracer.start_as_current_span(
@@ -69,22 +110,22 @@ async def get_api_job_by_id(job_id: str) -> Optional[ApiJob]:
         return job_to_api_job(job)
 
 
-@tracer.start_as_current_span("translate_job")
-def translate_job(job: ApiJob, locale: str) -> ApiJob:
-    def _tr_opt(
-        text: Optional[str], locale: str, args: Optional[dict] = None
-    ) -> Optional[str]:
-        if text is None:
-            return None
-        # I did this only to maintain compatibility.
-        # Why do we return empty strings instead of None at all?
-        if text == "":
-            return ""
-        translated = t.translate(text=text, locale=locale)
-        if args:
-            return translated % args
-        return translated
+def _tr_opt(
+    text: Optional[str], locale: str, args: Optional[dict] = None
+) -> Optional[str]:
+    if text is None:
+        return None
+    # I did this only to maintain compatibility.
+    # Why do we return empty strings instead of None at all?
+    if text == "":
+        return ""
+    translated = t.translate(text=text, locale=locale)
+    if args:
+        return translated % args
+    return translated
+
 
+def _translate_job(job: ApiJob, locale: str) -> ApiJob:
     return ApiJob(
         uid=job.uid,
         type_id=job.type_id,
@@ -99,3 +140,14 @@ def translate_job(job: ApiJob, locale: str) -> ApiJob:
         error=_tr_opt(job.error, locale, job.error_args),
         result=_tr_opt(job.result, locale, job.result_args),
     )
+
+
+@tracer.start_as_current_span("translate_job")
+def translate_job(job: ApiJob, locale: str) -> ApiJob:
+    return _translate_job(job, locale)
+
+
+@tracer.start_as_current_span("translate_jobs")
+def translate_jobs(jobs: Iterable[ApiJob], locale: str) -> List[ApiJob]:
+    """Translate many jobs under a single span."""
+    return [_translate_job(job, locale) for job in jobs]
@@ -14,24 +14,52 @@ from selfprivacy_api.services import (
     ServiceDnsRecord,
     ServiceManager,
 )
+from selfprivacy_api.services.generic_size_counter import StorageUsageMeasurement
 from selfprivacy_api.utils.block_devices import BlockDevices
 from selfprivacy_api.utils.network import get_ip4, get_ip6
 
 tracer = trace.get_tracer(__name__)
 
 
+async def service_storage_usage(
+    service: ServiceInterface, graphql_service: Optional["Service"]
+) -> "ServiceStorageUsage":
+    by_folder = await service.get_storage_usage_by_folder()
+    measurement = StorageUsageMeasurement.combine(by_folder.values())
+    return ServiceStorageUsage(
+        service=graphql_service,
+        title=service.get_display_name(),
+        used_space=str(measurement.usage),
+        volume=get_volume_by_id(service.get_drive()),
+        measured_at=measurement.measured_at,
+        folders=[
+            FolderStorageUsage(
+                path=folder,
+                used_space=str(folder_measurement.usage),
+                measured_at=folder_measurement.measured_at,
+            )
+            for folder, folder_measurement in by_folder.items()
+        ],
+    )
+
+
 @tracer.start_as_current_span("get_usages")
 async def get_usages(root: "StorageVolume") -> list["StorageUsageInterface"]:
-    """Get usages of a volume"""
-    return [
-        ServiceStorageUsage(
-            service=await service_to_graphql_service(service),
-            title=service.get_display_name(),
-            used_space=str(await service.get_storage_usage()),
-            volume=get_volume_by_id(service.get_drive()),
+    """Get usages of a volume. Services are measured concurrently."""
+
+    async def usage(service: ServiceInterface) -> "StorageUsageInterface":
+        return await service_storage_usage(
+            service, await service_to_graphql_service(service)
+        )
+
+    return list(
+        await asyncio.gather(
+            *[
+                usage(service)
+                for service in await ServiceManager.get_services_by_location(root.name)
+            ]
         )
-        for service in await ServiceManager.get_services_by_location(root.name)
-    ]
+    )
 
 
 @strawberry.type
@@ -65,6 +93,20 @@ class ServiceStorageUsage(StorageUsageInterface):
     """Storage usage for a service"""
 
     service: Optional["Service"]
+    measured_at: Optional[datetime.datetime] = strawberry.field(
+        default=None,
+        description="When the usage was measured. It is refreshed in the background.",
+    )
+    folders: List["FolderStorageUsage"] = strawberry.field(default_factory=list)
+
+
+@strawberry.type
+class FolderStorageUsage:
+    """Storage usage of one folder of a service"""
+
+    path: str
+    used_space: str
+    measured_at: Optional[datetime.datetime]
 
 
 @strawberry.enum
@@ -111,12 +153,7 @@ async def get_storage_usage(root: "Service") -> ServiceStorageUsage:
             used_space="0",
             volume=get_volume_by_id("sda1"),
         )
-    return ServiceStorageUsage(
-        service=root,
-        title=service.get_display_name(),
-        used_space=str(await service.get_storage_usage()),
-        volume=get_volume_by_id(service.get_drive()),
-    )
+    return await service_storage_usage(service, root)
 
 
 # TODO: This won't be needed when deriving DnsRecord via strawberry pydantic integration
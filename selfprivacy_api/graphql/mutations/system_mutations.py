@@ -3,7 +3,8 @@
 # pylint: disable=too-few-public-methods
 
 import gettext
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 import strawberry
 from opentelemetry import trace
@@ -22,12 +23,14 @@ from selfprivacy_api.graphql.mutations.mutation_interface import (
     MutationReturnInterface,
 )
 from selfprivacy_api.graphql.queries.providers import DnsProvider
+from selfprivacy_api.jobs.export_logs import start_log_export
 from selfprivacy_api.jobs.nix_collect_garbage import start_nix_collect_garbage
 from selfprivacy_api.utils import pretty_error
 from selfprivacy_api.utils.localization import (
     TranslateSystemMessage as t,
     get_locale,
 )
+from selfprivacy_api.utils.systemd_journal import LogFilter
 
 tracer = trace.get_tracer(__name__)
 _ = gettext.gettext
@@ -84,6 +87,17 @@ class AutoUpgradeSettingsInput:
     allowReboot: Optional[bool] = None
 
 
+@strawberry.input
+class LogExportInput:
+    """Input type for exporting logs to a file"""
+
+    units: Optional[List[str]] = None
+    slices: Optional[List[str]] = None
+    max_priority: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
 @strawberry.type
 class SystemMutations:
     """Mutations related to system settings"""
@@ -281,6 +295,40 @@ class SystemMutations:
                 job=translate_job(job=job_to_api_job(job), locale=locale),
             )
 
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
+    def export_logs(
+        self, input: LogExportInput, info: Info
+    ) -> GenericJobMutationReturn:
+        """
+        Write logs to a compressed file in the background.
+        When the job finishes, the file can be downloaded from /api/logs/export/<job uid>.
+        """
+        locale = get_locale(info=info)
+
+        with tracer.start_as_current_span("export_logs_mutation"):
+            try:
+                log_filter = LogFilter(
+                    units=input.units or [],
+                    slices=input.slices or [],
+                    max_priority=input.max_priority,
+                    since=input.since,
+                    until=input.until,
+                )
+            except ValueError as error:
+                return GenericJobMutationReturn(
+                    success=False,
+                    code=400,
+                    message=str(error),
+                )
+            job = start_log_export(log_filter)
+
+            return GenericJobMutationReturn(
+                success=True,
+                code=200,
+                message=t.translate(text=_("Log export started"), locale=locale),
+                job=translate_job(job=job_to_api_job(job), locale=locale),
+            )
+
     @strawberry.mutation(permission_classes=[IsAuthenticated])
     def set_dns_provider(
         self, input: SetDnsProviderInput, info: Info
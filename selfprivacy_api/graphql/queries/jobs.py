@@ -2,6 +2,7 @@
 
 # pylint: disable=too-few-public-methods
 
+from datetime import datetime
 from typing import List, Optional
 
 import strawberry
@@ -10,15 +11,22 @@ from strawberry.types import Info
 
 from selfprivacy_api.graphql.common_types.jobs import (
     ApiJob,
+    ApiJobsPage,
+    archived_job_to_api_job,
     get_api_job_by_id,
     job_to_api_job,
     translate_job,
+    translate_jobs,
 )
-from selfprivacy_api.jobs import Jobs
+from selfprivacy_api.jobs import Jobs, JobStatus
+from selfprivacy_api.jobs.history import JobHistory
 from selfprivacy_api.utils.localization import get_locale
 
 tracer = trace.get_tracer(__name__)
 
+MAX_JOBS_PAGE_SIZE = 100
+MAX_JOB_HISTORY_SIZE = 1000
+
 
 @tracer.start_as_current_span("resolve_get_all_jobs")
 async def get_all_jobs() -> List[ApiJob]:
@@ -35,10 +43,7 @@ class Job:
         locale = get_locale(info=info)
 
         all_jobs = await get_all_jobs()
-        translated_jobs = []
-        for job in all_jobs:
-            translated_jobs.append(translate_job(job=job, locale=locale))
-        return translated_jobs
+        return translate_jobs(all_jobs, locale=locale)
 
     @strawberry.field
     async def get_job(self, job_id: str, info: Info) -> Optional[ApiJob]:
@@ -47,3 +52,77 @@ class Job:
         job = await get_api_job_by_id(job_id)
         if job:
             return translate_job(job=job, locale=locale)
+
+    @strawberry.field
+    async def paginated(
+        self,
+        info: Info,
+        limit: int = 20,
+        # Cursor of the previous page, as returned in nextCursor
+        cursor: Optional[str] = None,
+        # Only jobs with this status, e.g. RUNNING
+        status: Optional[str] = None,
+        # Only jobs whose typeId starts with this, e.g. services.nextcloud.
+        type_prefix: Optional[str] = None,
+    ) -> ApiJobsPage:
+        with tracer.start_as_current_span(
+            "resolve_get_paginated_jobs",
+            attributes={
+                "limit": limit,
+                "cursor": cursor if cursor else "None",
+                "status": status if status else "None",
+                "type_prefix": type_prefix if type_prefix else "None",
+            },
+        ):
+            if limit < 1 or limit > MAX_JOBS_PAGE_SIZE:
+                raise Exception(
+                    f"You can fetch from 1 to {MAX_JOBS_PAGE_SIZE} jobs via single request."
+                )
+            job_status = None
+            if status is not None:
+                try:
+                    job_status = JobStatus(status)
+                except ValueError:
+                    raise Exception(f"Unknown job status: {status}")
+
+            locale = get_locale(info=info)
+            jobs, next_cursor = Jobs.get_jobs_page(
+                limit=limit,
+                cursor=cursor,
+                status=job_status,
+                type_prefix=type_prefix,
+            )
+            return ApiJobsPage(
+                jobs=translate_jobs(map(job_to_api_job, jobs), locale=locale),
+                next_cursor=next_cursor,
+            )
+
+    @strawberry.field
+    async def history(
+        self,
+        info: Info,
+        # Only jobs finished at or after this moment
+        since: Optional[datetime] = None,
+        # Only jobs finished at or before this moment
+        until: Optional[datetime] = None,
+        # Only jobs whose typeId starts with this, e.g. services.nextcloud.backup
+        type_prefix: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[ApiJob]:
+        """Finished jobs kept after their live records expired, newest first"""
+        with tracer.start_as_current_span(
+            "resolve_get_job_history",
+            attributes={
+                "limit": limit,
+                "type_prefix": type_prefix if type_prefix else "None",
+            },
+        ):
+            if limit < 1 or limit > MAX_JOB_HISTORY_SIZE:
+                raise Exception(
+                    f"You can fetch from 1 to {MAX_JOB_HISTORY_SIZE} jobs via single request."
+                )
+            locale = get_locale(info=info)
+            jobs = JobHistory.get_jobs(
+                since=since, until=until, type_prefix=type_prefix, limit=limit
+            )
+            return translate_jobs(map(archived_job_to_api_job, jobs), locale=locale)
@@ -1,5 +1,6 @@
 """System logs"""
 
+import re
 import asyncio
 import typing
 from datetime import datetime
@@ -7,10 +8,20 @@ from datetime import datetime
 import strawberry
 from opentelemetry import trace
 
-from selfprivacy_api.utils.systemd_journal import get_paginated_logs
+from selfprivacy_api.utils.systemd_journal import (
+    JournalEntry,
+    LogFilter,
+    ScanBudget,
+    query_logs,
+)
 
 tracer = trace.get_tracer(__name__)
 
+MAX_LOGS_PAGE_SIZE = 500
+# How much of the journal one page request may read
+MAX_LOGS_SCANNED_ENTRIES = 200_000
+MAX_LOGS_SCAN_SECONDS = 5.0
+
 
 @strawberry.type
 class LogEntry:
@@ -20,29 +31,37 @@ class LogEntry:
     systemd_unit: typing.Optional[str] = strawberry.field()
     systemd_slice: typing.Optional[str] = strawberry.field()
 
-    def __init__(self, journal_entry: typing.Dict):
-        self.entry = journal_entry
-        self.message = journal_entry["MESSAGE"]
-        self.timestamp = journal_entry["__REALTIME_TIMESTAMP"]
-        self.priority = journal_entry.get("PRIORITY")
-        self.systemd_unit = journal_entry.get("_SYSTEMD_UNIT")
-        self.systemd_slice = journal_entry.get("_SYSTEMD_SLICE")
+    def __init__(self, journal_entry: JournalEntry):
+        self._cursor = journal_entry.cursor
+        self.message = journal_entry.message
+        self.timestamp = journal_entry.timestamp
+        self.priority = journal_entry.priority
+        self.systemd_unit = journal_entry.systemd_unit
+        self.systemd_slice = journal_entry.systemd_slice
 
     @strawberry.field()
     def cursor(self) -> str:
-        return self.entry["__CURSOR"]
+        return self._cursor
 
 
 @strawberry.type
 class LogsPageMeta:
     up_cursor: typing.Optional[str] = strawberry.field()
     down_cursor: typing.Optional[str] = strawberry.field()
+    resume_cursor: typing.Optional[str] = strawberry.field(
+        description="Set if the request stopped reading the journal before the page was full. "
+        "Repeat it with this cursor in place of downCursor, or of upCursor if it was given."
+    )
 
     def __init__(
-        self, up_cursor: typing.Optional[str], down_cursor: typing.Optional[str]
+        self,
+        up_cursor: typing.Optional[str],
+        down_cursor: typing.Optional[str],
+        resume_cursor: typing.Optional[str] = None,
     ):
         self.up_cursor = up_cursor
         self.down_cursor = down_cursor
+        self.resume_cursor = resume_cursor
 
 
 @strawberry.type
@@ -60,14 +79,17 @@ class PaginatedEntries:
 
     @staticmethod
     @tracer.start_as_current_span("PaginatedEntries.from_entries")
-    def from_entries(entries: typing.List[LogEntry]):
+    def from_entries(
+        entries: typing.List[LogEntry], resume_cursor: typing.Optional[str] = None
+    ):
         if entries == []:
-            return PaginatedEntries(LogsPageMeta(None, None), [])
+            return PaginatedEntries(LogsPageMeta(None, None, resume_cursor), [])
 
         return PaginatedEntries(
             LogsPageMeta(
                 entries[0].cursor(),
                 entries[-1].cursor(),
+                resume_cursor,
             ),
             entries,
         )
@@ -87,6 +109,18 @@ class Logs:
         filterBySlice: str | None = None,
         # All entries will be from a specific systemd unit
         filterByUnit: str | None = None,
+        # All entries will be from one of these systemd units
+        units: typing.Optional[typing.List[str]] = None,
+        # All entries will be from one of these systemd slices
+        slices: typing.Optional[typing.List[str]] = None,
+        # Only entries with this syslog priority or a more severe one (0 is the most severe)
+        max_priority: typing.Optional[int] = None,
+        since: typing.Optional[datetime] = None,
+        until: typing.Optional[datetime] = None,
+        # Only entries whose message contains this text
+        message_contains: typing.Optional[str] = None,
+        # Only entries whose message matches this regular expression
+        message_regex: typing.Optional[str] = None,
     ) -> PaginatedEntries:
         with tracer.start_as_current_span(
             "resolve_get_paginated_logs",
@@ -98,20 +132,46 @@ class Logs:
                 "filterByUnit": filterByUnit if filterByUnit else "None",
             },
         ):
-            if limit > 50:
+            if limit < 1:
+                raise Exception("You have to fetch at least one entry.")
+            if limit > MAX_LOGS_PAGE_SIZE:
                 raise Exception(
-                    "You can't fetch more than 50 entries via single request."
+                    f"You can't fetch more than {MAX_LOGS_PAGE_SIZE} entries via single request."
                 )
 
+            try:
+                compiled_regex = (
+                    re.compile(message_regex) if message_regex is not None else None
+                )
+            except re.error as error:
+                raise Exception(f"Invalid message regex: {error}")
+
+            log_filter = LogFilter(
+                units=(units or []) + ([filterByUnit] if filterByUnit else []),
+                slices=(slices or []) + ([filterBySlice] if filterBySlice else []),
+                max_priority=max_priority,
+                since=since,
+                until=until,
+                message_contains=message_contains,
+                message_regex=compiled_regex,
+            )
+
+            budget = ScanBudget(
+                max_entries=MAX_LOGS_SCANNED_ENTRIES,
+                max_seconds=MAX_LOGS_SCAN_SECONDS,
+            )
             # Not sure if it's a good idea, but it might help with speed if server is I/O loaded.
             logs = await asyncio.get_running_loop().run_in_executor(
                 None,
-                get_paginated_logs,
+                query_logs,
+                log_filter,
                 limit,
                 up_cursor,
                 down_cursor,
-                filterBySlice,
-                filterByUnit,
+                budget,
             )
 
-            return PaginatedEntries.from_entries(list(map(lambda x: LogEntry(x), logs)))
+            return PaginatedEntries.from_entries(
+                list(map(lambda x: LogEntry(x), logs)),
+                budget.resume_cursor if budget.exhausted else None,
+            )
@@ -1,6 +1,6 @@
 import gettext
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 import strawberry
 from opentelemetry import trace
@@ -13,10 +13,16 @@ from selfprivacy_api.utils.localization import (
     get_locale,
 )
 from selfprivacy_api.utils.monitoring import (
+    DownsampleMethod,
+    MonitoringBatch,
+    MonitoringBatchItem,
+    MonitoringMetricKind,
     MonitoringMetricsResult,
+    MonitoringPackedResult,
     MonitoringQueries,
     MonitoringQueryError,
     MonitoringValuesResult,
+    ServicesResourceUsageResult,
 )
 
 _ = gettext.gettext
@@ -186,3 +192,79 @@ class Monitoring:
         step: int = 60,
     ) -> NetworkMonitoring:
         return NetworkMonitoring(start=start, end=end, step=step)
+
+    @strawberry.field
+    async def batch(
+        self,
+        info: Info,
+        kinds: List[MonitoringMetricKind],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        step: int = 60,
+    ) -> MonitoringBatch:
+        """Get several metrics over one time window in a single request."""
+        locale = get_locale(info=info)
+
+        with tracer.start_as_current_span(
+            "Monitoring.batch",
+            attributes={"kinds": [kind.value for kind in kinds]},
+        ):
+            if await Prometheus().get_status() != ServiceStatus.ACTIVE:
+                error = t.translate(text=PROMETHEUS_IS_NOT_RUNNING, locale=locale)
+                return MonitoringBatch(
+                    items=[
+                        MonitoringBatchItem(
+                            kind=kind,
+                            result=MonitoringQueryError(error=error),
+                            duration_ms=0,
+                        )
+                        for kind in dict.fromkeys(kinds)
+                    ],
+                    duration_ms=0,
+                )
+
+            return await MonitoringQueries.batch(kinds, start, end, step)
+
+    @strawberry.field
+    async def packed_series(
+        self,
+        info: Info,
+        kind: MonitoringMetricKind,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        step: int = 60,
+        max_points: Optional[int] = None,
+        downsample: DownsampleMethod = DownsampleMethod.LTTB,
+    ) -> MonitoringPackedResult:
+        """Get a metric as packed arrays, optionally downsampled to max_points."""
+        locale = get_locale(info=info)
+
+        with tracer.start_as_current_span(
+            "Monitoring.packed_series", attributes={"kind": kind.value}
+        ):
+            if await Prometheus().get_status() != ServiceStatus.ACTIVE:
+                return MonitoringQueryError(
+                    error=t.translate(text=PROMETHEUS_IS_NOT_RUNNING, locale=locale)
+                )
+
+            return await MonitoringQueries.packed_series(
+                kind, start, end, step, max_points, downsample
+            )
+
+    @strawberry.field
+    async def services_usage(
+        self,
+        info: Info,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ServicesResourceUsageResult:
+        """Get average resource usage of all enabled services at once."""
+        locale = get_locale(info=info)
+
+        with tracer.start_as_current_span("Monitoring.services_usage"):
+            if await Prometheus().get_status() != ServiceStatus.ACTIVE:
+                return MonitoringQueryError(
+                    error=t.translate(text=PROMETHEUS_IS_NOT_RUNNING, locale=locale)
+                )
+
+            return await MonitoringQueries.service_resource_usage(start, end)
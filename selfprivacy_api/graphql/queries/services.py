@@ -13,6 +13,7 @@ from selfprivacy_api.graphql.common_types.service import (
     service_to_graphql_service,
 )
 from selfprivacy_api.services import ServiceManager
+from selfprivacy_api.utils.systemd import preload_unit_states
 
 tracer = trace.get_tracer(__name__)
 
@@ -23,6 +24,10 @@ class Services:
     async def all_services(self) -> typing.List[Service]:
         with tracer.start_as_current_span("resolve_all_services") as span:
             services = await ServiceManager.get_all_services()
+            # One ListUnitsByNames call instead of one per service
+            await preload_unit_states(
+                [unit for service in services for unit in service.get_units()]
+            )
             graphql_services = await asyncio.gather(
                 *[service_to_graphql_service(service) for service in services]
             )
@@ -3,7 +3,7 @@
 # pylint: disable=too-few-public-methods
 
 import asyncio
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator, List, Optional
 
 import strawberry
 from strawberry.types import Info
@@ -49,12 +49,16 @@ from selfprivacy_api.graphql.queries.storage import Storage
 from selfprivacy_api.graphql.queries.system import System
 from selfprivacy_api.graphql.queries.users import Users
 from selfprivacy_api.graphql.subscriptions.jobs import (
+    DEFAULT_COALESCE_MS,
     ApiJob,
+    ApiJobDelta,
+    job_deltas as job_delta_generator,
     job_updates as job_update_generator,
 )
 from selfprivacy_api.graphql.subscriptions.logs import log_stream
 from selfprivacy_api.jobs.test import test_job
 from selfprivacy_api.utils.localization import DEFAULT_LOCALE, Localization
+from selfprivacy_api.utils.systemd_journal import LogFilter
 
 
 @strawberry.type
@@ -186,6 +190,15 @@ async def reject_if_unauthenticated(info: Info):
         raise Exception(IsAuthenticated().message)
 
 
+def subscription_locale(info: Info) -> str:
+    connection_params = info.context.get("connection_params")
+    locales_raw = connection_params.get("Accept-Language")
+
+    if locales_raw:
+        return Localization().get_locale(locales_raw)
+    return DEFAULT_LOCALE
+
+
 @strawberry.type
 class Subscription:
     """Root schema for subscriptions.
@@ -196,16 +209,17 @@ class Subscription:
     @strawberry.subscription
     async def job_updates(self, info: Info) -> AsyncGenerator[List[ApiJob], None]:
         await reject_if_unauthenticated(info)
+        return job_update_generator(locale=subscription_locale(info))
 
-        connection_params = info.context.get("connection_params")
-        locales_raw = connection_params.get("Accept-Language")
-
-        if locales_raw:
-            locale = Localization().get_locale(locales_raw)
-        else:
-            locale = DEFAULT_LOCALE
-
-        return job_update_generator(locale=locale)
+    @strawberry.subscription
+    async def job_deltas(
+        self, info: Info, coalesce_ms: int = DEFAULT_COALESCE_MS
+    ) -> AsyncGenerator[List[ApiJobDelta], None]:
+        """All jobs once, then only the jobs that changed, batched per coalesceMs"""
+        await reject_if_unauthenticated(info)
+        return job_delta_generator(
+            locale=subscription_locale(info), coalesce_ms=coalesce_ms
+        )
 
     @strawberry.subscription
     # Used for testing, consider deletion to shrink attack surface
@@ -216,9 +230,21 @@ class Subscription:
             await asyncio.sleep(0.5)
 
     @strawberry.subscription
-    async def log_entries(self, info: Info) -> AsyncGenerator[LogEntry, None]:
+    async def log_entries(
+        self,
+        info: Info,
+        units: Optional[List[str]] = None,
+        slices: Optional[List[str]] = None,
+        max_priority: Optional[int] = None,
+    ) -> AsyncGenerator[LogEntry, None]:
         await reject_if_unauthenticated(info)
-        return log_stream()
+        return log_stream(
+            LogFilter(
+                units=units or [],
+                slices=slices or [],
+                max_priority=max_priority,
+            )
+        )
 
 
 schema = strawberry.Schema(
@@ -1,17 +1,100 @@
 # pylint: disable=too-few-public-methods
 
-from typing import AsyncGenerator, List
+import asyncio
+from contextlib import suppress
+from typing import AsyncGenerator, Iterable, List
 
-from selfprivacy_api.jobs import job_notifications
+from selfprivacy_api.jobs import (
+    JOB_KEY_PREFIX,
+    Jobs,
+    job_notifications,
+    job_uid_from_notification,
+)
+from selfprivacy_api.utils.keyspace_notifications import (
+    KeyspaceNotifications,
+    SlowConsumerError,
+)
 
-from selfprivacy_api.graphql.common_types.jobs import ApiJob
+from selfprivacy_api.graphql.common_types.jobs import ApiJob, ApiJobDelta
 from selfprivacy_api.graphql.queries.jobs import get_all_jobs
 
-from selfprivacy_api.graphql.common_types.jobs import translate_job
+from selfprivacy_api.graphql.common_types.jobs import (
+    job_to_api_job,
+    translate_jobs,
+)
+
+DEFAULT_COALESCE_MS = 250
+MAX_COALESCE_MS = 10_000
 
 
 async def job_updates(locale: str) -> AsyncGenerator[List[ApiJob], None]:
     # Send the complete list of jobs every time anything gets updated
-    async for _ in job_notifications():
-        jobs = await get_all_jobs()
-        yield [translate_job(job=j, locale=locale) for j in jobs]
+    while True:
+        try:
+            async for _ in job_notifications():
+                yield translate_jobs(await get_all_jobs(), locale=locale)
+        except SlowConsumerError:
+            # Some updates were dropped, the full list covers them anyway
+            yield translate_jobs(await get_all_jobs(), locale=locale)
+
+
+def _job_deltas(uids: Iterable[str], locale: str) -> List[ApiJobDelta]:
+    uids = list(uids)
+    translated = translate_jobs(
+        map(job_to_api_job, Jobs.get_jobs_many(uids)), locale=locale
+    )
+    jobs = {job.uid: job for job in translated}
+    return [ApiJobDelta(uid=uid, job=jobs.get(uid)) for uid in uids]
+
+
+async def job_deltas(
+    locale: str, coalesce_ms: int = DEFAULT_COALESCE_MS
+) -> AsyncGenerator[List[ApiJobDelta], None]:
+    """
+    Send a snapshot of all jobs first, then only the jobs that changed.
+    Notifications arriving within coalesce_ms of the first one in a burst
+    are merged into one message, so a job reporting progress in a tight
+    loop is sent at most once per window.
+    """
+    window = min(max(coalesce_ms, 0), MAX_COALESCE_MS) / 1000
+    loop = asyncio.get_running_loop()
+
+    while True:
+        # Subscribe before taking the snapshot so no update falls in between
+        channel = await KeyspaceNotifications().open(JOB_KEY_PREFIX + "*")
+        pending_message = asyncio.ensure_future(channel.get())
+        try:
+            yield [
+                ApiJobDelta(uid=job.uid, job=job)
+                for job in translate_jobs(await get_all_jobs(), locale=locale)
+            ]
+
+            while True:
+                changed: dict[str, None] = {}
+
+                def note(message: dict) -> None:
+                    uid = job_uid_from_notification(message)
+                    if uid is not None:
+                        changed[uid] = None
+
+                note(await pending_message)
+                pending_message = asyncio.ensure_future(channel.get())
+
+                deadline = loop.time() + window
+                while (remaining := deadline - loop.time()) > 0:
+                    done, _ = await asyncio.wait({pending_message}, timeout=remaining)
+                    if not done:
+                        break
+                    note(pending_message.result())
+                    pending_message = asyncio.ensure_future(channel.get())
+
+                if changed:
+                    yield _job_deltas(changed, locale)
+        except SlowConsumerError:
+            # We lost track of what changed, start over with a fresh snapshot
+            continue
+        finally:
+            pending_message.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await pending_message
+            channel.close()
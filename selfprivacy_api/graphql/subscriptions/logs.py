@@ -1,41 +1,21 @@
-from typing import AsyncGenerator
-from systemd import journal
-import asyncio
+from typing import AsyncGenerator, Optional
 
 from selfprivacy_api.graphql.queries.logs import LogEntry
+from selfprivacy_api.utils.fanout import SlowConsumerError
+from selfprivacy_api.utils.journal_tail import JournalTail
+from selfprivacy_api.utils.systemd_journal import LogFilter
 
 
-async def log_stream() -> AsyncGenerator[LogEntry, None]:
-    loop = asyncio.get_event_loop()
-    j = journal.Reader()
-
-    j.seek_tail()
-    j.get_previous()
-
-    queue = asyncio.Queue()
-
-    async def callback():
-        if j.process() != journal.APPEND:
-            return
-        for entry in j:
-            await queue.put(entry)
-
-    loop.add_reader(j, lambda: asyncio.ensure_future(callback()))
-
-    try:
-        try:
-            while True:
-                entry = await queue.get()
-                try:
-                    yield LogEntry(entry)
-                finally:
-                    queue.task_done()
-        except (asyncio.CancelledError, GeneratorExit):
-            pass
-        except Exception:
-            return
-    finally:
+async def log_stream(
+    log_filter: Optional[LogFilter] = None,
+) -> AsyncGenerator[LogEntry, None]:
+    async with JournalTail().subscribe(log_filter) as entries:
         try:
-            loop.remove_reader(j)
-        finally:
-            j.close()
+            async for entry in entries:
+                yield LogEntry(entry)
+        except SlowConsumerError as error:
+            # Entries were lost, the client has to fetch the gap with a query
+            raise Exception(
+                "Log entries were dropped because the client fell behind. "
+                "Fetch the missing ones with the logs query and subscribe again."
+            ) from error
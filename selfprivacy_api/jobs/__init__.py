@@ -16,22 +16,43 @@ A job is a dictionary with the following keys:
 """
 
 import json
+import time
 import typing
 import datetime
+import threading
+from dataclasses import dataclass, field
 from uuid import UUID
 import uuid
 from enum import Enum
 
 from pydantic import BaseModel, field_validator
+from redis.exceptions import WatchError
 
+from selfprivacy_api.jobs.history import archive_job
 from selfprivacy_api.utils.redis_pool import RedisPool
-from selfprivacy_api.utils.redis_model_storage import store_model_as_hash
+from selfprivacy_api.utils.keyspace_notifications import KeyspaceNotifications
+from selfprivacy_api.utils.redis_model_storage import (
+    changed_hash_fields,
+    model_as_hash_mapping,
+    store_model_as_hash,
+)
 
 JOB_EXPIRATION_SECONDS = 10 * 24 * 60 * 60  # ten days
+JOB_UPDATE_MIN_INTERVAL_SECONDS = 1.0
+
+JOB_KEY_PREFIX = "jobs:"
 
 STATUS_LOGS_PREFIX = "jobs_logs:status:"
 PROGRESS_LOGS_PREFIX = "jobs_logs:progress:"
 
+# Secondary indexes. They must not live under "jobs:" because
+# that prefix is scanned and watched for the job hashes themselves.
+INDEX_PREFIX = "jobs_index:"
+UPDATED_AT_INDEX_KEY = INDEX_PREFIX + "updated_at"
+TYPE_OF_INDEX_KEY = INDEX_PREFIX + "type_of"
+STATUS_INDEX_PREFIX = INDEX_PREFIX + "status:"
+TYPE_INDEX_PREFIX = INDEX_PREFIX + "type:"
+
 
 class JobStatus(str, Enum):
     """
@@ -82,6 +103,29 @@ class Job(BaseModel):
         return v
 
 
+@dataclass
+class _PendingWrite:
+    """Changes of a job that are not written to redis yet."""
+
+    fields: dict[str, str] = field(default_factory=dict)
+    status_log: list[JobStatus] = field(default_factory=list)
+    progress_log: list[int] = field(default_factory=list)
+    job: typing.Optional[Job] = None
+    last_flush: float = float("-inf")
+    timer: typing.Optional[threading.Timer] = None
+    # Held across the redis round trip, so that writes of one job
+    # land in order while writes of other jobs are not held up
+    flush_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+# Keyed by job uid. Jobs are updated from huey worker threads
+# and flushed from timer threads, hence the lock. It guards the
+# dict and the pending changes only, never redis I/O.
+# A flush_lock is always taken before _pending_writes_lock.
+_pending_writes: dict[str, _PendingWrite] = {}
+_pending_writes_lock = threading.RLock()
+
+
 class Jobs:
     """
     Jobs class.
@@ -95,7 +139,15 @@ class Jobs:
         jobs = Jobs.get_jobs()
         for job in jobs:
             Jobs.remove(job)
+        with _pending_writes_lock:
+            for pending in _pending_writes.values():
+                if pending.timer is not None:
+                    pending.timer.cancel()
+            _pending_writes.clear()
         Jobs.reset_logs()
+        redis = RedisPool().get_connection()
+        for key in redis.scan_iter(match=INDEX_PREFIX + "*"):
+            redis.delete(key)
 
     @staticmethod
     def add(
@@ -128,7 +180,10 @@ class Jobs:
             result=None,
         )
         redis = RedisPool().get_connection()
-        store_model_as_hash(redis, _redis_key_from_uuid(job.uid), job)
+        pipe = redis.pipeline()
+        store_model_as_hash(pipe, _redis_key_from_uuid(job.uid), job)
+        _index_job(pipe, job)
+        pipe.execute()
         return job
 
     @staticmethod
@@ -143,17 +198,24 @@ class Jobs:
         """
         Remove a job from the jobs list.
         """
+        with _pending_writes_lock:
+            pending = _pending_writes.pop(job_uuid, None)
+            if pending is not None and pending.timer is not None:
+                pending.timer.cancel()
+
         redis = RedisPool().get_connection()
         key = _redis_key_from_uuid(job_uuid)
-        if redis.exists(key):
-            redis.delete(key)
-            return True
-        return False
+        type_id = redis.hget(TYPE_OF_INDEX_KEY, job_uuid)
+        pipe = redis.pipeline()
+        pipe.delete(key)
+        _unindex_job(pipe, job_uuid, type_id)
+        deleted = pipe.execute()[0]
+        return deleted > 0
 
     @staticmethod
     def reset_logs() -> None:
         redis = RedisPool().get_connection()
-        for key in redis.keys(STATUS_LOGS_PREFIX + "*"):
+        for key in redis.scan_iter(match=STATUS_LOGS_PREFIX + "*"):
             redis.delete(key)
 
     @staticmethod
@@ -219,47 +281,101 @@ class Jobs:
         error_args: typing.Optional[dict] = None,
         result: typing.Optional[str] = None,
         result_args: typing.Optional[dict] = None,
+        throttle: bool = False,
     ) -> Job:
         """
         Update a job in the jobs list.
-        """
-        if name is not None:
-            job.name = name
-            job.name_args = name_args
-        if description is not None:
-            job.description = description
-            job.description_args = description_args
-        if status_text is not None:
-            job.status_text = status_text
-            job.status_text_args = status_text_args
-
-        # if it is finished it is 100
-        # unless user says otherwise
-        if status == JobStatus.FINISHED and progress is None:
-            progress = 100
-        if progress is not None and job.progress != progress:
-            job.progress = progress
-            Jobs.log_progress_update(job, progress)
-
-        job.status = status
-        Jobs.log_status_update(job, status)
-        job.updated_at = datetime.datetime.now()
-        job.error = error
-        job.error_args = error_args
-        job.result = result
-        job.result_args = result_args
-        if status in (JobStatus.FINISHED, JobStatus.ERROR):
-            job.finished_at = datetime.datetime.now()
 
-        redis = RedisPool().get_connection()
-        key = _redis_key_from_uuid(job.uid)
-        if redis.exists(key):
-            store_model_as_hash(redis, key, job)
+        Only the fields that changed are written. With throttle=True,
+        writes of a job are coalesced to at most one per
+        JOB_UPDATE_MIN_INTERVAL_SECONDS, the last one is flushed when the
+        interval ends. Updates to FINISHED or ERROR are always written
+        immediately.
+        """
+        flush_now = True
+        with _pending_writes_lock:
+            pending = _pending_writes.setdefault(str(job.uid), _PendingWrite())
+            before = model_as_hash_mapping(job)
+
+            if name is not None:
+                job.name = name
+                job.name_args = name_args
+            if description is not None:
+                job.description = description
+                job.description_args = description_args
+            if status_text is not None:
+                job.status_text = status_text
+                job.status_text_args = status_text_args
+
+            # if it is finished it is 100
+            # unless user says otherwise
+            if status == JobStatus.FINISHED and progress is None:
+                progress = 100
+            if progress is not None and job.progress != progress:
+                job.progress = progress
+                pending.progress_log.append(progress)
+
+            job.status = status
+            pending.status_log.append(status)
+            job.updated_at = datetime.datetime.now()
+            job.error = error
+            job.error_args = error_args
+            job.result = result
+            job.result_args = result_args
             if status in (JobStatus.FINISHED, JobStatus.ERROR):
-                redis.expire(key, JOB_EXPIRATION_SECONDS)
-
+                job.finished_at = datetime.datetime.now()
+
+            pending.fields.update(
+                changed_hash_fields(before, model_as_hash_mapping(job))
+            )
+            pending.job = job
+
+            if throttle and status not in (JobStatus.FINISHED, JobStatus.ERROR):
+                wait = pending.last_flush + JOB_UPDATE_MIN_INTERVAL_SECONDS
+                wait -= time.monotonic()
+                if wait > 0:
+                    if pending.timer is None:
+                        pending.timer = threading.Timer(
+                            wait, Jobs.flush, args=(str(job.uid),)
+                        )
+                        pending.timer.daemon = True
+                        pending.timer.start()
+                    flush_now = False
+
+        if flush_now:
+            Jobs.flush(str(job.uid))
         return job
 
+    @staticmethod
+    def flush(job_uid: str) -> None:
+        """
+        Write the pending throttled changes of a job, if there are any.
+        """
+        with _pending_writes_lock:
+            pending = _pending_writes.get(job_uid)
+        if pending is None:
+            return
+
+        with pending.flush_lock:
+            with _pending_writes_lock:
+                if pending.timer is not None:
+                    pending.timer.cancel()
+                    pending.timer = None
+                job = pending.job
+                fields, pending.fields = pending.fields, {}
+                status_log, pending.status_log = pending.status_log, []
+                progress_log, pending.progress_log = pending.progress_log, []
+                pending.last_flush = time.monotonic()
+                if (
+                    job is not None
+                    and job.status in (JobStatus.FINISHED, JobStatus.ERROR)
+                    and _pending_writes.get(job_uid) is pending
+                ):
+                    del _pending_writes[job_uid]
+
+            if job is not None:
+                _write_job_changes(job, fields, status_log, progress_log)
+
     @staticmethod
     def set_expiration(job: Job, expiration_seconds: int) -> Job:
         redis = RedisPool().get_connection()
@@ -274,10 +390,7 @@ class Jobs:
         Get a job from the jobs list.
         """
         redis = RedisPool().get_connection()
-        key = _redis_key_from_uuid(uid)
-        if redis.exists(key):
-            return _job_from_hash(redis, key)
-        return None
+        return _job_from_hash(redis, _redis_key_from_uuid(uid))
 
     @staticmethod
     def get_jobs() -> typing.List[Job]:
@@ -285,21 +398,145 @@ class Jobs:
         Get the jobs list.
         """
         redis = RedisPool().get_connection()
-        job_keys = redis.keys("jobs:*")
-        jobs = []
-        for job_key in job_keys:
-            job = _job_from_hash(redis, job_key)
-            if job is not None:
-                jobs.append(job)
-        return jobs
+        uids = [
+            job_key[len(JOB_KEY_PREFIX) :]
+            for job_key in redis.scan_iter(match=JOB_KEY_PREFIX + "*", count=1000)
+        ]
+        return Jobs.get_jobs_many(uids)
+
+    @staticmethod
+    def get_jobs_many(uids: typing.Iterable[str]) -> typing.List[Job]:
+        """
+        Get several jobs at once, in one pipelined round trip.
+        Jobs that do not exist are skipped, the order of uids is kept.
+        """
+        redis = RedisPool().get_connection()
+        return [job for job in _jobs_from_hashes(redis, uids) if job is not None]
+
+    @staticmethod
+    def get_jobs_by_status(status: JobStatus) -> typing.List[Job]:
+        """
+        Get the jobs with the given status, using the status index.
+        """
+        redis = RedisPool().get_connection()
+        uids = redis.smembers(_status_index_key(status))
+        return _jobs_from_index(redis, uids)
+
+    @staticmethod
+    def get_jobs_by_type(type_id: str) -> typing.List[Job]:
+        """
+        Get the jobs with the given type_id, using the type index.
+        """
+        redis = RedisPool().get_connection()
+        uids = redis.smembers(_type_index_key(type_id))
+        return _jobs_from_index(redis, uids)
+
+    @staticmethod
+    def get_jobs_page(
+        limit: int,
+        cursor: typing.Optional[str] = None,
+        status: typing.Optional[JobStatus] = None,
+        type_prefix: typing.Optional[str] = None,
+    ) -> typing.Tuple[typing.List[Job], typing.Optional[str]]:
+        """
+        Get up to limit jobs, most recently updated first, that come after
+        the cursor and match the filters. Returns the jobs and the cursor
+        of the next page, which is None when there are no more jobs.
+        """
+        redis = RedisPool().get_connection()
+        max_score: typing.Union[float, str] = "+inf"
+        after_uid = None
+        if cursor is not None:
+            max_score, after_uid = _parse_page_cursor(cursor)
+
+        page: typing.List[Job] = []
+        batch_size = max(limit * 2, 50)
+        offset = 0
+        exhausted = False
+        while len(page) < limit and not exhausted:
+            entries = redis.zrevrangebyscore(
+                UPDATED_AT_INDEX_KEY,
+                max_score,
+                "-inf",
+                start=offset,
+                num=batch_size,
+                withscores=True,
+            )
+            offset += len(entries)
+            exhausted = len(entries) < batch_size
+
+            candidates = [
+                uid
+                for uid, score in entries
+                if after_uid is None or score != max_score or uid < after_uid
+            ]
+            if type_prefix is not None and candidates:
+                type_ids = redis.hmget(TYPE_OF_INDEX_KEY, candidates)
+                candidates = [
+                    uid
+                    for uid, type_id in zip(candidates, type_ids)
+                    if type_id is not None and type_id.startswith(type_prefix)
+                ]
+            if status is not None and candidates:
+                is_member = redis.smismember(_status_index_key(status), candidates)
+                candidates = [
+                    uid for uid, member in zip(candidates, is_member) if member
+                ]
+            page += _jobs_from_index(redis, candidates)
+
+        if len(page) > limit:
+            return page[:limit], _page_cursor(page[limit - 1])
+        if len(page) == limit and not exhausted:
+            return page, _page_cursor(page[-1])
+        return page, None
 
     @staticmethod
     def is_busy() -> bool:
         """
         Check if there is a job running.
         """
+        redis = RedisPool().get_connection()
+        key = _status_index_key(JobStatus.RUNNING)
+        if redis.scard(key) == 0:
+            return False
+        # Running jobs do not normally expire, but a TTL can be set
+        # explicitly, so drop whatever has vanished before answering.
+        _prune_stale_uids(redis, redis.smembers(key))
+        return redis.scard(key) > 0
+
+    @staticmethod
+    def rebuild_indexes() -> None:
+        """
+        Drop the secondary indexes and rebuild them from the job hashes.
+        """
+        redis = RedisPool().get_connection()
+        for key in redis.scan_iter(match=INDEX_PREFIX + "*"):
+            redis.delete(key)
+        pipe = redis.pipeline()
         for job in Jobs.get_jobs():
-            if job.status == JobStatus.RUNNING:
+            _index_job(pipe, job)
+        pipe.execute()
+
+    @staticmethod
+    def repair_indexes() -> int:
+        """
+        Remove index entries of jobs whose hashes have expired.
+        Returns the number of entries removed.
+        """
+        redis = RedisPool().get_connection()
+        uids = redis.zrange(UPDATED_AT_INDEX_KEY, 0, -1)
+        uids += redis.hkeys(TYPE_OF_INDEX_KEY)
+        return _prune_stale_uids(redis, set(uids))
+
+    @staticmethod
+    def has_unindexed_jobs() -> bool:
+        """
+        Check if there are job hashes that the indexes do not know about.
+        """
+        redis = RedisPool().get_connection()
+        for job_key in redis.scan_iter(match=JOB_KEY_PREFIX + "*", count=1000):
+            uid = job_key[len(JOB_KEY_PREFIX) :]
+            if redis.zscore(UPDATED_AT_INDEX_KEY, uid) is None:
                 return True
         return False
 
@@ -315,11 +552,12 @@ def report_progress(progress: int, job: Job, status_text: str) -> None:
         status=JobStatus.RUNNING,
         status_text=status_text,
         progress=progress,
+        throttle=True,
     )
 
 
 def _redis_key_from_uuid(uuid_string) -> str:
-    return "jobs:" + str(uuid_string)
+    return JOB_KEY_PREFIX + str(uuid_string)
 
 
 def _status_log_key_from_uuid(uuid_string) -> str:
@@ -330,31 +568,167 @@ def _progress_log_key_from_uuid(uuid_string) -> str:
     return PROGRESS_LOGS_PREFIX + str(uuid_string)
 
 
+def _status_index_key(status: JobStatus) -> str:
+    return STATUS_INDEX_PREFIX + status.value
+
+
+def _type_index_key(type_id: str) -> str:
+    return TYPE_INDEX_PREFIX + type_id
+
+
+def _write_job_changes(
+    job: Job,
+    fields: dict[str, str],
+    status_log: list[JobStatus],
+    progress_log: list[int],
+) -> None:
+    redis = RedisPool().get_connection()
+    key = _redis_key_from_uuid(job.uid)
+    with redis.pipeline() as pipe:
+        while True:
+            try:
+                # If the job is removed or expires after the check,
+                # the transaction fails instead of leaving a partial hash
+                pipe.watch(key)
+                exists = pipe.exists(key)
+                pipe.multi()
+                if exists and fields:
+                    pipe.hset(key, mapping=fields)
+                    _index_job(pipe, job)
+                    if job.status in (JobStatus.FINISHED, JobStatus.ERROR):
+                        pipe.expire(key, JOB_EXPIRATION_SECONDS)
+                        if "status" in fields:
+                            archive_job(pipe, job)
+                # Logs are written even for removed jobs, like before
+                # updates were batched
+                if status_log:
+                    status_key = _status_log_key_from_uuid(job.uid)
+                    pipe.lpush(status_key, *[s.value for s in status_log])
+                    pipe.expire(status_key, 10)
+                if progress_log:
+                    progress_key = _progress_log_key_from_uuid(job.uid)
+                    pipe.lpush(progress_key, *progress_log)
+                    pipe.expire(progress_key, 10)
+                pipe.execute()
+                return
+            except WatchError:
+                continue
+
+
+def _index_job(pipe, job: Job) -> None:
+    uid = str(job.uid)
+    pipe.zadd(UPDATED_AT_INDEX_KEY, {uid: job.updated_at.timestamp()})
+    for status in JobStatus:
+        if status != job.status:
+            pipe.srem(_status_index_key(status), uid)
+    pipe.sadd(_status_index_key(job.status), uid)
+    pipe.sadd(_type_index_key(job.type_id), uid)
+    pipe.hset(TYPE_OF_INDEX_KEY, uid, job.type_id)
+
+
+def _unindex_job(pipe, uid: str, type_id: typing.Optional[str]) -> None:
+    pipe.zrem(UPDATED_AT_INDEX_KEY, uid)
+    for status in JobStatus:
+        pipe.srem(_status_index_key(status), uid)
+    if type_id is not None:
+        pipe.srem(_type_index_key(type_id), uid)
+    pipe.hdel(TYPE_OF_INDEX_KEY, uid)
+
+
+def _page_cursor(job: Job) -> str:
+    return f"{job.updated_at.timestamp()!r}:{job.uid}"
+
+
+def _parse_page_cursor(cursor: str) -> typing.Tuple[float, str]:
+    score, _, uid = cursor.partition(":")
+    try:
+        return float(score), uid
+    except ValueError as error:
+        raise ValueError("Invalid jobs page cursor: " + cursor) from error
+
+
+def _prune_stale_uids(redis, uids: typing.Iterable[str]) -> int:
+    uids = list(uids)
+    if not uids:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    for uid in uids:
+        pipe.exists(_redis_key_from_uuid(uid))
+    stale = [uid for uid, exists in zip(uids, pipe.execute()) if not exists]
+    if not stale:
+        return 0
+    type_ids = redis.hmget(TYPE_OF_INDEX_KEY, stale)
+    pipe = redis.pipeline()
+    for uid, type_id in zip(stale, type_ids):
+        _unindex_job(pipe, uid, type_id)
+    pipe.execute()
+    return len(stale)
+
+
+def _jobs_from_index(redis, uids: typing.Iterable[str]) -> typing.List[Job]:
+    uids = list(uids)
+    jobs = []
+    stale = []
+    for uid, job in zip(uids, _jobs_from_hashes(redis, uids)):
+        if job is None:
+            stale.append(uid)
+        else:
+            jobs.append(job)
+    if stale:
+        _prune_stale_uids(redis, stale)
+    return jobs
+
+
+_DATE_FIELDS = frozenset(["created_at", "updated_at", "finished_at"])
+
+
+def _decode_job_hash(job_dict: dict) -> Job:
+    decoded: dict[str, typing.Any] = {}
+    for key, value in job_dict.items():
+        if value == "None":
+            decoded[key] = None
+        elif key in _DATE_FIELDS:
+            decoded[key] = datetime.datetime.fromisoformat(value)
+        else:
+            decoded[key] = value
+    return Job(**decoded)
+
+
 def _job_from_hash(redis, redis_key) -> typing.Optional[Job]:
-    if redis.exists(redis_key):
-        job_dict = redis.hgetall(redis_key)
-        for date in [
-            "created_at",
-            "updated_at",
-            "finished_at",
-        ]:
-            if job_dict[date] != "None":
-                job_dict[date] = datetime.datetime.fromisoformat(job_dict[date])
-        for key in job_dict.keys():
-            if job_dict[key] == "None":
-                job_dict[key] = None
-
-        return Job(**job_dict)
-    return None
+    # HGETALL of a missing key is an empty dict, no need to ask EXISTS first
+    job_dict = redis.hgetall(redis_key)
+    if not job_dict:
+        return None
+    return _decode_job_hash(job_dict)
+
+
+def _jobs_from_hashes(
+    redis, uids: typing.Iterable[str]
+) -> typing.List[typing.Optional[Job]]:
+    pipe = redis.pipeline(transaction=False)
+    for uid in uids:
+        pipe.hgetall(_redis_key_from_uuid(uid))
+    return [
+        _decode_job_hash(job_dict) if job_dict else None for job_dict in pipe.execute()
+    ]
+
+
+def job_uid_from_notification(message: dict) -> typing.Optional[str]:
+    """
+    Extract the job uid from a keyspace notification
+    like {"channel": "__keyspace@0__:jobs:<uid>", ...}.
+    """
+    channel = message.get("channel")
+    if not channel:
+        return None
+    _, separator, uid = channel.partition(":" + JOB_KEY_PREFIX)
+    if not separator or not uid:
+        return None
+    return uid
 
 
 async def job_notifications() -> typing.AsyncGenerator[dict, None]:
-    channel = await RedisPool().subscribe_to_keys("jobs:*")
-    while True:
-        try:
-            # we cannot timeout here because we do not know when the next message is supposed to arrive
-            message: dict = await channel.get_message(ignore_subscribe_messages=True, timeout=None)  # type: ignore
-            if message is not None:
-                yield message
-        except GeneratorExit:
-            break
+    async with KeyspaceNotifications().subscribe(JOB_KEY_PREFIX + "*") as channel:
+        # we cannot timeout here because we do not know when the next message is supposed to arrive
+        async for message in channel:
+            yield message
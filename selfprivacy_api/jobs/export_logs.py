@@ -0,0 +1,161 @@
+"""
+A job that writes a range of the journal to a gzip-compressed file
+which can then be downloaded in one request.
+"""
+
+import os
+import dataclasses
+import gzip
+import time
+import gettext
+import typing
+from contextlib import closing
+from datetime import datetime
+
+from selfprivacy_api.jobs import Job, Jobs, JobStatus
+from selfprivacy_api.utils.huey import huey
+from selfprivacy_api.utils.systemd_journal import JournalEntry, LogFilter, iter_logs
+
+_ = gettext.gettext
+
+LOG_EXPORT_TYPE_ID = "logs.export"
+LOG_EXPORT_DIR = "/var/lib/selfprivacy-api/log-exports"
+# Exports older than this are removed when a new one starts
+LOG_EXPORT_RETENTION_SECONDS = 24 * 60 * 60
+# Entries written to the file and counted at once
+EXPORT_CHUNK_ENTRIES = 1000
+
+
+def log_export_path(job_uid: str) -> str:
+    return os.path.join(LOG_EXPORT_DIR, f"{job_uid}.log.gz")
+
+
+def get_log_export_path(job_uid: str) -> typing.Optional[str]:
+    """
+    Path of a finished export, None if there is no such export.
+    """
+    job = Jobs.get_job(job_uid)
+    if job is None or job.type_id != LOG_EXPORT_TYPE_ID:
+        return None
+    if job.status != JobStatus.FINISHED:
+        return None
+    path = log_export_path(job_uid)
+    if not os.path.isfile(path):
+        return None
+    return path
+
+
+def format_entry(entry: JournalEntry) -> str:
+    priority = entry.priority if entry.priority is not None else "-"
+    return (
+        f"{entry.timestamp.isoformat()} {entry.systemd_unit or '-'} "
+        f"[{priority}] {entry.message}\n"
+    )
+
+
+def remove_stale_exports() -> None:
+    if not os.path.isdir(LOG_EXPORT_DIR):
+        return
+    oldest_kept = time.time() - LOG_EXPORT_RETENTION_SECONDS
+    for name in os.listdir(LOG_EXPORT_DIR):
+        path = os.path.join(LOG_EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < oldest_kept:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def export_logs(job: Job, log_filter: LogFilter) -> None:
+    """
+    Stream the filtered journal range to the export file.
+    Progress is the share of the time range written so far.
+    """
+    Jobs.update(
+        job=job,
+        status=JobStatus.RUNNING,
+        status_text=_("Exporting logs..."),
+        progress=0,
+    )
+    os.makedirs(LOG_EXPORT_DIR, mode=0o700, exist_ok=True)
+    path = log_export_path(job.uid)
+    partial_path = path + ".part"
+
+    if log_filter.until is None:
+        # Do not chase entries written while exporting
+        log_filter = dataclasses.replace(log_filter, until=datetime.now())
+    assert log_filter.until is not None
+    range_end = int(log_filter.until.timestamp() * 1_000_000)
+    range_start = (
+        int(log_filter.since.timestamp() * 1_000_000)
+        if log_filter.since is not None
+        else None
+    )
+
+    written = 0
+    try:
+        with gzip.open(partial_path, "wt", encoding="utf-8") as file, closing(
+            iter_logs(log_filter)
+        ) as entries:
+            chunk: typing.List[str] = []
+            for entry in entries:
+                if range_start is None:
+                    range_start = entry.realtime
+                chunk.append(format_entry(entry))
+                if len(chunk) < EXPORT_CHUNK_ENTRIES:
+                    continue
+
+                file.writelines(chunk)
+                written += len(chunk)
+                chunk = []
+                progress = (
+                    (entry.realtime - range_start)
+                    * 100
+                    // max(range_end - range_start, 1)
+                )
+                Jobs.update(
+                    job=job,
+                    status=JobStatus.RUNNING,
+                    progress=min(99, progress),
+                    status_text=_("Exported %(count)s log entries"),
+                    status_text_args={"count": written},
+                    throttle=True,
+                )
+            file.writelines(chunk)
+            written += len(chunk)
+        os.replace(partial_path, path)
+    except Exception as error:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        Jobs.update(
+            job=job,
+            status=JobStatus.ERROR,
+            error=type(error).__name__ + ": " + str(error),
+        )
+        return
+
+    Jobs.update(
+        job=job,
+        status=JobStatus.FINISHED,
+        progress=100,
+        status_text=_("Logs exported"),
+        result=_("Exported %(count)s log entries"),
+        result_args={"count": written},
+    )
+
+
+@huey.task()
+def export_logs_task(job: Job, log_filter: LogFilter) -> bool:
+    export_logs(job, log_filter)
+    return True
+
+
+def start_log_export(log_filter: LogFilter) -> Job:
+    remove_stale_exports()
+    job = Jobs.add(
+        type_id=LOG_EXPORT_TYPE_ID,
+        name=_("Export logs"),
+        description=_("Writing system logs to a compressed file"),
+    )
+    export_logs_task(job=job, log_filter=log_filter)
+    return job
@@ -0,0 +1,149 @@
+"""
+Append-only archive of finished jobs.
+
+Live job hashes expire after JOB_EXPIRATION_SECONDS. When a job reaches
+FINISHED or ERROR it is also appended to a Redis stream with only the
+fields worth keeping, so months of backup and rebuild history stay
+queryable without keeping the job hashes around.
+Stream entry IDs are the archival time in milliseconds, which is what
+time range queries seek on.
+"""
+
+import json
+import typing
+import datetime
+
+from pydantic import BaseModel, field_validator
+
+from selfprivacy_api.utils.redis_pool import RedisPool
+from selfprivacy_api.utils.redis_model_storage import hash_value
+
+HISTORY_STREAM_KEY = "jobs_history"
+HISTORY_RETENTION_DAYS = 180
+
+ARCHIVED_FIELDS = (
+    "uid",
+    "type_id",
+    "name",
+    "name_args",
+    "description",
+    "description_args",
+    "status",
+    "error",
+    "error_args",
+    "result",
+    "result_args",
+    "created_at",
+    "finished_at",
+)
+
+
+class ArchivedJob(BaseModel):
+    """
+    A finished job as kept in the history.
+    """
+
+    uid: str
+    type_id: str
+    name: str
+    name_args: typing.Optional[dict] = None
+    description: str
+    description_args: typing.Optional[dict] = None
+    status: str
+    error: typing.Optional[str] = None
+    error_args: typing.Optional[dict] = None
+    result: typing.Optional[str] = None
+    result_args: typing.Optional[dict] = None
+    created_at: datetime.datetime
+    finished_at: datetime.datetime
+
+    @field_validator(
+        "name_args",
+        "description_args",
+        "error_args",
+        "result_args",
+        mode="before",
+    )
+    @classmethod
+    def _parse_json_dict(cls, v: typing.Any) -> typing.Any:
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+
+def archive_job(pipe, job: BaseModel) -> None:
+    """
+    Queue appending a finished job to the history on a redis pipeline.
+    None values and empty args are left out to keep entries small.
+    """
+    mapping = {}
+    for field in ARCHIVED_FIELDS:
+        value = getattr(job, field)
+        if value is None or value == {}:
+            continue
+        mapping[field] = hash_value(value)
+    oldest_kept = datetime.datetime.now() - datetime.timedelta(
+        days=HISTORY_RETENTION_DAYS
+    )
+    pipe.xadd(
+        HISTORY_STREAM_KEY,
+        mapping,
+        minid=_stream_id(oldest_kept),
+        approximate=True,
+    )
+
+
+class JobHistory:
+    """
+    Queries over the archive of finished jobs.
+    """
+
+    @staticmethod
+    def get_jobs(
+        since: typing.Optional[datetime.datetime] = None,
+        until: typing.Optional[datetime.datetime] = None,
+        type_prefix: typing.Optional[str] = None,
+        limit: int = 100,
+    ) -> typing.List[ArchivedJob]:
+        """
+        Get up to limit archived jobs finished between since and until,
+        newest first.
+        """
+        redis = RedisPool().get_connection()
+        newest = _stream_id(until) if until is not None else "+"
+        oldest = _stream_id(since) if since is not None else "-"
+
+        result: typing.List[ArchivedJob] = []
+        while len(result) < limit:
+            entries = redis.xrevrange(
+                HISTORY_STREAM_KEY, max=newest, min=oldest, count=max(limit, 50)
+            )
+            if not entries:
+                break
+            for _, fields in entries:
+                if type_prefix is not None and not fields["type_id"].startswith(
+                    type_prefix
+                ):
+                    continue
+                result.append(ArchivedJob(**fields))
+                if len(result) == limit:
+                    break
+            newest = "(" + entries[-1][0]
+        return result
+
+    @staticmethod
+    def count() -> int:
+        redis = RedisPool().get_connection()
+        return redis.xlen(HISTORY_STREAM_KEY)
+
+    @staticmethod
+    def reset() -> None:
+        """
+        Forget all history.
+        """
+        redis = RedisPool().get_connection()
+        redis.delete(HISTORY_STREAM_KEY)
+
+
+def _stream_id(moment: datetime.datetime) -> str:
+    return str(int(moment.timestamp() * 1000))
@@ -0,0 +1,16 @@
+from huey import crontab
+
+from selfprivacy_api.jobs import Jobs
+from selfprivacy_api.utils.huey import huey
+
+REPAIR_JOB_INDEXES_EVERY_HOURS = 6
+
+
+@huey.periodic_task(
+    crontab(hour="*/" + str(REPAIR_JOB_INDEXES_EVERY_HOURS), minute="15")
+)
+def repair_job_indexes():
+    """
+    Expired job hashes leave their index entries behind, sweep them out.
+    """
+    Jobs.repair_indexes()
@@ -7,10 +7,10 @@ status accordingly.
 import asyncio
 import gettext
 
-from systemd import journal
-
 from selfprivacy_api.jobs import Job, Jobs, JobStatus
+from selfprivacy_api.utils.fanout import SlowConsumerError
 from selfprivacy_api.utils.huey import huey, huey_async_helper
+from selfprivacy_api.utils.journal_tail import JournalTail
 from selfprivacy_api.utils.systemd import (
     ServiceStatus,
     get_last_log_lines,
@@ -18,6 +18,7 @@ from selfprivacy_api.utils.systemd import (
     start_unit,
     wait_for_unit_state,
 )
+from selfprivacy_api.utils.systemd_journal import LogFilter
 
 _ = gettext.gettext
 
@@ -26,36 +27,23 @@ RUN_TIMEOUT = 60 * 60
 
 
 async def report_active_rebuild_log(job: Job, unit_name: str):
-    loop = asyncio.get_event_loop()
-    j = journal.Reader()
-
-    j.add_match(_SYSTEMD_UNIT=unit_name)
-    j.seek_tail()
-    j.get_previous()
-
-    log_queue = asyncio.Queue()
-
-    async def callback():
-        if j.process() != journal.APPEND:
-            return
-        for entry in j:
-            await log_queue.put(entry)
-
-    loop.add_reader(j, lambda: asyncio.ensure_future(callback()))
-
+    log_filter = LogFilter(units=[unit_name])
     try:
         while True:
-            log_entry = await log_queue.get()
-            Jobs.update(
-                job=job,
-                status=JobStatus.RUNNING,
-                status_text=log_entry["MESSAGE"],
-            )
+            async with JournalTail().subscribe(log_filter) as entries:
+                try:
+                    async for log_entry in entries:
+                        Jobs.update(
+                            job=job,
+                            status=JobStatus.RUNNING,
+                            status_text=log_entry.message,
+                            throttle=True,
+                        )
+                except SlowConsumerError:
+                    # Only the latest line is shown, skipping some is fine
+                    continue
     except (asyncio.CancelledError, GeneratorExit):
         pass
-    finally:
-        loop.remove_reader(j)
-        j.close()
 
 
 async def rebuild_system(job: Job, upgrade: bool = False):
@@ -14,6 +14,7 @@ import traceback
 
 from selfprivacy_api.utils import ReadUserData, UserDataFiles
 from selfprivacy_api.migrations.write_token_to_redis import WriteTokenToRedis
+from selfprivacy_api.migrations.index_jobs import IndexJobs
 from selfprivacy_api.migrations.check_for_system_rebuild_jobs import (
     CheckForSystemRebuildJobs,
 )
@@ -34,6 +35,7 @@ logger = logging.getLogger(__name__)
 
 migrations = [
     WriteTokenToRedis(),
+    IndexJobs(),
     CheckForSystemRebuildJobs(),
     MergeSpModulesFlake(),
     MigrateUsersFromJson(),
@@ -1,5 +1,5 @@
 from selfprivacy_api.migrations.migration import Migration
-from selfprivacy_api.jobs import JobStatus, Jobs
+from selfprivacy_api.jobs import Job, JobStatus, Jobs
 
 
 class CheckForSystemRebuildJobs(Migration):
@@ -13,36 +13,23 @@ class CheckForSystemRebuildJobs(Migration):
 
     async def is_migration_needed(self) -> bool:
         # Check if there are any unfinished system rebuild jobs
-        for job in Jobs.get_jobs():
-            if (
-                job.type_id
-                in [
-                    "system.nixos.rebuild",
-                    "system.nixos.upgrade",
-                ]
-            ) and job.status in [
-                JobStatus.CREATED,
-                JobStatus.RUNNING,
-            ]:
-                return True
-        return False
+        return len(_unfinished_system_jobs()) > 0
 
     async def migrate(self) -> None:
         # As the API is restarted, we assume that the jobs are finished
-        for job in Jobs.get_jobs():
-            if (
-                job.type_id
-                in [
-                    "system.nixos.rebuild",
-                    "system.nixos.upgrade",
-                ]
-            ) and job.status in [
-                JobStatus.CREATED,
-                JobStatus.RUNNING,
-            ]:
-                Jobs.update(
-                    job=job,
-                    status=JobStatus.FINISHED,
-                    result="System rebuilt.",
-                    progress=100,
-                )
+        for job in _unfinished_system_jobs():
+            Jobs.update(
+                job=job,
+                status=JobStatus.FINISHED,
+                result="System rebuilt.",
+                progress=100,
+            )
+
+
+def _unfinished_system_jobs() -> list[Job]:
+    return [
+        job
+        for type_id in ["system.nixos.rebuild", "system.nixos.upgrade"]
+        for job in Jobs.get_jobs_by_type(type_id)
+        if job.status in [JobStatus.CREATED, JobStatus.RUNNING]
+    ]
@@ -0,0 +1,18 @@
+from selfprivacy_api.migrations.migration import Migration
+from selfprivacy_api.jobs import Jobs
+
+
+class IndexJobs(Migration):
+    """Build secondary indexes for jobs created before they existed"""
+
+    def get_migration_name(self) -> str:
+        return "index_jobs"
+
+    def get_migration_description(self) -> str:
+        return "Build secondary indexes for jobs created before they existed"
+
+    async def is_migration_needed(self) -> bool:
+        return Jobs.has_unindexed_jobs()
+
+    async def migrate(self) -> None:
+        Jobs.rebuild_indexes()
@@ -1,54 +1,560 @@
-"""Generic size counter using pathlib"""
+"""
+Generic size counter.
+
+Sizes are kept in a per-directory tree which is saved to disk between
+runs. A directory whose mtime has not changed still has the same
+entries, so it is not listed again: its known files are stat'ed by name,
+which catches files grown or shrunk in place, and its known
+subdirectories are checked in turn. The whole tree is still rescanned
+now and then, in case a change was missed.
+
+Measurements are kept in Redis with their time. Readers get the last
+one at once, and a stale one is refreshed by a queued task.
+"""
 
 import asyncio
-import os
-import pathlib
+import gzip
+import hashlib
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from datetime import datetime
+from queue import Queue
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+
+from selfprivacy_api.utils.huey import huey, huey_async_helper
 from selfprivacy_api.utils.redis_pool import RedisPool
 
 logger = logging.getLogger(__name__)
 
+# {event loop -> {device -> semaphore}}; entries die with the loop
+_device_semaphores: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[int, asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
+
+SIZE_TREE_DIR = "/var/lib/selfprivacy-api/size-trees"
+# Older measurements are still served, but refreshed in the background
+USAGE_FRESH_SECONDS = 15 * 60
+# Measurements not refreshed for this long are forgotten
+USAGE_KEEP_SECONDS = 7 * 24 * 60 * 60
+# Catches changes which directory mtimes missed
+FULL_RESCAN_SECONDS = 24 * 60 * 60
+# Directories changed this recently may change again within the same
+# mtime tick, so their listing is not trusted next time
+MTIME_SETTLE_NS = 2 * 1_000_000_000
+# A scan renews its lock this often, so that however long it takes,
+# the lock outlives it only by this much if the scanning process dies
+SCAN_LOCK_SECONDS = 2 * 60
+# Saved trees of another version are rebuilt from scratch
+SIZE_TREE_VERSION = 2
+
 
-def get_storage_usage_blocking(path: str) -> int:
+@dataclass(frozen=True)
+class ScanOptions:
     """
-    Calculate the real storage usage of path and all subdirectories.
-    Calculate using pathlib.
-    Do not follow symlinks.
+    How a directory tree is scanned.
+
+    Args:
+        threads: Directories listed at once. Solid state drives answer
+            concurrent metadata reads much faster, spinning disks seek.
+        count_blocks: Count space allocated on disk (st_blocks) instead
+            of apparent file sizes.
+        concurrent_scans: Trees of the same device scanned at once.
     """
-    storage_usage = 0
-    for iter_path in pathlib.Path(path).rglob("**/*"):
-        if iter_path.is_dir():
+
+    threads: int = 1
+    count_blocks: bool = False
+    concurrent_scans: int = 1
+
+
+SOLID_STATE_SCAN_OPTIONS = ScanOptions(threads=8, concurrent_scans=2)
+ROTATIONAL_SCAN_OPTIONS = ScanOptions(threads=1, concurrent_scans=1)
+
+
+def _is_rotational(device: int) -> bool:
+    device_dir = os.path.realpath(
+        f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+    )
+    # Partitions take the flag of their disk
+    for candidate in (device_dir, os.path.dirname(device_dir)):
+        try:
+            with open(os.path.join(candidate, "queue", "rotational")) as file:
+                return file.read().strip() == "1"
+        except OSError:
             continue
+    return False
+
+
+def get_scan_options(path: str) -> ScanOptions:
+    """
+    Scan options for the volume path lives on.
+    Volumes on spinning disks are scanned on one thread.
+    """
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        return ROTATIONAL_SCAN_OPTIONS
+    if _is_rotational(device):
+        return ROTATIONAL_SCAN_OPTIONS
+    return SOLID_STATE_SCAN_OPTIONS
+
+
+class SizeTreeNode:
+    """
+    A directory: its mtime when it was listed, the names and total size
+    of the files directly in it, and its subdirectories by name. Files
+    with several hard links are kept apart by (device, inode), so that
+    they are counted once however many directories link them.
+    """
+
+    __slots__ = ("mtime_ns", "files", "files_size", "linked", "children")
+
+    def __init__(
+        self,
+        mtime_ns: int,
+        files: Optional[List[str]] = None,
+        files_size: int = 0,
+        linked: Optional[List[List[int]]] = None,
+        children: Optional[Dict[str, "SizeTreeNode"]] = None,
+    ):
+        self.mtime_ns = mtime_ns
+        self.files: List[str] = files or []
+        self.files_size = files_size
+        # [device, inode, size] of each hard-linked file
+        self.linked: List[List[int]] = linked or []
+        self.children: Dict[str, SizeTreeNode] = children or {}
+
+    def add_file(self, name: str, stat: os.stat_result, options: "ScanOptions"):
+        self.files.append(name)
+        size = stat.st_blocks * 512 if options.count_blocks else stat.st_size
+        if stat.st_nlink > 1:
+            self.linked.append([stat.st_dev, stat.st_ino, size])
+        else:
+            self.files_size += size
+
+    def total(self) -> int:
+        size = 0
+        linked: Dict[Tuple[int, int], int] = {}
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            size += node.files_size
+            for device, inode, file_size in node.linked:
+                linked[(device, inode)] = file_size
+            nodes.extend(node.children.values())
+        return size + sum(linked.values())
+
+    def to_json(self) -> list:
+        return [
+            self.mtime_ns,
+            self.files,
+            self.files_size,
+            self.linked,
+            {name: child.to_json() for name, child in self.children.items()},
+        ]
+
+    @staticmethod
+    def from_json(data: list) -> "SizeTreeNode":
+        mtime_ns, files, files_size, linked, children = data
+        return SizeTreeNode(
+            mtime_ns,
+            files,
+            files_size,
+            linked,
+            {name: SizeTreeNode.from_json(child) for name, child in children.items()},
+        )
+
+
+class SizeTreeStats:
+    """How much work a refresh did."""
+
+    def __init__(self):
+        self.listed = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def count(self, listed: bool) -> None:
+        with self._lock:
+            if listed:
+                self.listed += 1
+            else:
+                self.reused += 1
+
+
+# A directory to bring up to date: its path, its new node, its old node
+_Work = Tuple[str, SizeTreeNode, Optional[SizeTreeNode]]
+
+
+def _refresh_node(
+    path: str,
+    node: SizeTreeNode,
+    previous: Optional[SizeTreeNode],
+    options: ScanOptions,
+    stats: SizeTreeStats,
+) -> List[_Work]:
+    """
+    Fill in the files of one directory and return its subdirectories,
+    which are to be refreshed next.
+    """
+    subdirectories: List[_Work] = []
+
+    if previous is not None and previous.mtime_ns == node.mtime_ns:
+        stats.count(listed=False)
+        # Files may have been rewritten without changing the directory
+        for name in previous.files:
+            try:
+                node.add_file(name, os.lstat(os.path.join(path, name)), options)
+            except FileNotFoundError:
+                # Removed since, which would have changed our mtime too
+                pass
+            except Exception as error:
+                logger.error(error)
+        for name, old_child in previous.children.items():
+            child_path = os.path.join(path, name)
+            try:
+                child_mtime_ns = os.lstat(child_path).st_mtime_ns
+            except FileNotFoundError:
+                # Removed since, which would have changed our mtime too
+                continue
+            child = SizeTreeNode(child_mtime_ns)
+            node.children[name] = child
+            subdirectories.append((child_path, child, old_child))
+        return subdirectories
+
+    stats.count(listed=True)
+    if time.time_ns() - node.mtime_ns <= MTIME_SETTLE_NS:
+        node.mtime_ns = 0
+    old_children = previous.children if previous is not None else {}
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    if entry.is_dir(follow_symlinks=False):
+                        child = SizeTreeNode(stat.st_mtime_ns)
+                        node.children[entry.name] = child
+                        subdirectories.append(
+                            (entry.path, child, old_children.get(entry.name))
+                        )
+                        continue
+                    node.add_file(entry.name, stat, options)
+                except FileNotFoundError:
+                    pass
+                except Exception as error:
+                    logger.error(error)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    except Exception as error:
+        logger.error(error)
+    return subdirectories
+
+
+def refresh_size_tree(
+    path: str,
+    mtime_ns: int,
+    previous: Optional[SizeTreeNode],
+    stats: Optional[SizeTreeStats] = None,
+    options: ScanOptions = ScanOptions(),
+) -> SizeTreeNode:
+    """
+    Bring the tree of path up to date, listing only the directories
+    which changed since previous was built. Symlinks are not followed.
+
+    With several threads, every thread takes the next directory from a
+    shared queue and queues the subdirectories it finds, so a thread
+    done with a small subtree moves on to parts of a large one.
+    """
+    if stats is None:
+        stats = SizeTreeStats()
+    root = SizeTreeNode(mtime_ns)
+
+    if options.threads <= 1:
+        work: List[_Work] = [(path, root, previous)]
+        while work:
+            work.extend(_refresh_node(*work.pop(), options, stats))
+        return root
+
+    queue: Queue[Optional[_Work]] = Queue()
+    queue.put((path, root, previous))
+
+    def worker() -> None:
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            try:
+                for subdirectory in _refresh_node(*item, options, stats):
+                    queue.put(subdirectory)
+            finally:
+                queue.task_done()
+
+    threads = [
+        threading.Thread(target=worker, name="size-counter", daemon=True)
+        for _ in range(options.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    queue.join()
+    for _ in threads:
+        queue.put(None)
+    for thread in threads:
+        thread.join()
+    return root
+
+
+def size_tree_path(path: str, options: ScanOptions) -> str:
+    digest = hashlib.sha256(path.encode()).hexdigest()[:32]
+    kind = "blocks" if options.count_blocks else "bytes"
+    return os.path.join(SIZE_TREE_DIR, f"{digest}.{kind}.json.gz")
+
+
+def load_size_tree(
+    path: str, options: ScanOptions = ScanOptions()
+) -> Optional[Tuple[SizeTreeNode, float]]:
+    """
+    The saved tree of path and the time of its last full scan.
+    None if there is none or it is due for a full rescan.
+    """
+    try:
+        with gzip.open(size_tree_path(path, options), "rt", encoding="utf-8") as file:
+            saved = json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as error:
+        logger.warning(f"Ignoring unreadable size tree of {path}: {error}")
+        return None
+
+    if saved.get("version") != SIZE_TREE_VERSION or saved["path"] != path:
+        return None
+    if time.time() - saved["scanned_at"] > FULL_RESCAN_SECONDS:
+        return None
+    return SizeTreeNode.from_json(saved["tree"]), saved["scanned_at"]
+
+
+def save_size_tree(
+    path: str,
+    tree: SizeTreeNode,
+    scanned_at: float,
+    options: ScanOptions = ScanOptions(),
+) -> None:
+    tree_path = size_tree_path(path, options)
+    partial_path = None
+    try:
+        os.makedirs(SIZE_TREE_DIR, mode=0o700, exist_ok=True)
+        # Every save writes its own file, so concurrent saves of the
+        # same tree never mix their output
+        descriptor, partial_path = tempfile.mkstemp(
+            dir=SIZE_TREE_DIR, prefix=os.path.basename(tree_path), suffix=".part"
+        )
+        with os.fdopen(descriptor, "wb") as raw_file:
+            with gzip.open(raw_file, "wt", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "version": SIZE_TREE_VERSION,
+                        "path": path,
+                        "scanned_at": scanned_at,
+                        "tree": tree.to_json(),
+                    },
+                    file,
+                )
+        os.replace(partial_path, tree_path)
+    except Exception as error:
+        logger.warning(f"Could not save size tree of {path}: {error}")
+        if partial_path is not None:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+
+
+def get_storage_usage_blocking(path: str, options: Optional[ScanOptions] = None) -> int:
+    """
+    Calculate the real storage usage of path and all subdirectories.
+    Only directories changed since the last calculation are listed.
+    Hard-linked files are counted once. Do not follow symlinks.
+
+    Args:
+        options: Defaults to the options for the volume of path.
+    """
+    if options is None:
+        options = get_scan_options(path)
+    try:
+        mtime_ns = os.lstat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+    saved = load_size_tree(path, options)
+    if saved is None:
+        previous, scanned_at = None, time.time()
+    else:
+        previous, scanned_at = saved
+
+    tree = refresh_size_tree(path, mtime_ns, previous, options=options)
+    save_size_tree(path, tree, scanned_at, options)
+    return tree.total()
+
+
+@dataclass(frozen=True)
+class StorageUsageMeasurement:
+    usage: int
+    # None if nothing was measured
+    measured_at: Optional[datetime]
+
+    @staticmethod
+    def combine(
+        measurements: Iterable["StorageUsageMeasurement"],
+    ) -> "StorageUsageMeasurement":
+        """Add up usages. The result is as old as its oldest part."""
+        measurements = list(measurements)
+        times = [m.measured_at for m in measurements if m.measured_at is not None]
+        return StorageUsageMeasurement(
+            usage=sum(m.usage for m in measurements),
+            measured_at=min(times) if times else None,
+        )
+
+
+def _usage_key(path: str) -> str:
+    return f"sizecounter:usage:{path}"
+
+
+def _device_semaphore(path: str, options: ScanOptions) -> asyncio.Semaphore:
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        device = -1
+    semaphores = _device_semaphores.setdefault(asyncio.get_running_loop(), {})
+    if device not in semaphores:
+        semaphores[device] = asyncio.Semaphore(options.concurrent_scans)
+    return semaphores[device]
+
+
+async def _keep_lock(lock: Lock) -> None:
+    """Renew lock until cancelled."""
+    while True:
+        await asyncio.sleep(SCAN_LOCK_SECONDS / 3)
         try:
-            storage_usage += iter_path.stat().st_size
-        except FileNotFoundError:
-            pass
-        except Exception as error:
-            logging.error(error)
-    return storage_usage
+            await lock.reacquire()
+        except LockError as error:
+            logger.warning(f"Lost the lock {lock.name!r}: {error}")
+            return
 
 
-async def get_storage_usage(path: str) -> int:
+async def measure_storage_usage(path: str) -> StorageUsageMeasurement:
+    """
+    Measure path now and remember the result.
+    Scans of one device wait for each other beyond its concurrent_scans.
+    """
     path = os.path.abspath(path)
+    options = get_scan_options(path)
+    redis_conn = await RedisPool().get_connection_async()
 
+    lock = redis_conn.lock(
+        f"sizecounter:calculatelock:{path}", timeout=SCAN_LOCK_SECONDS
+    )
+    async with lock:
+        # Large trees take longer than the lock timeout to scan
+        keeper = asyncio.create_task(_keep_lock(lock))
+        try:
+            async with _device_semaphore(path, options):
+                usage = await asyncio.get_running_loop().run_in_executor(
+                    None, get_storage_usage_blocking, path, options
+                )
+        finally:
+            keeper.cancel()
+        measured_at = time.time()
+        await redis_conn.hset(
+            _usage_key(path), mapping={"usage": usage, "measured_at": measured_at}
+        )
+        await redis_conn.expire(_usage_key(path), USAGE_KEEP_SECONDS)
+
+    return StorageUsageMeasurement(usage, datetime.fromtimestamp(measured_at))
+
+
+async def get_storage_usage_measured_at(path: str) -> Optional[float]:
+    """When path was last measured, as a Unix timestamp."""
     redis_conn = await RedisPool().get_connection_async()
+    value = await redis_conn.hget(_usage_key(os.path.abspath(path)), "measured_at")
+    return float(value) if value is not None else None
+
+
+async def measure_folders_storage_usage(folders: Iterable[str]) -> int:
+    """
+    Measure folders now, concurrently, and add up their usage.
+    For checks which must not act on an old measurement.
+    """
+    measurements = await asyncio.gather(
+        *[measure_storage_usage(folder) for folder in dict.fromkeys(folders)]
+    )
+    return sum(measurement.usage for measurement in measurements)
 
-    if redis_conn is not None:
-        value = await redis_conn.get(f"sizecounter:path:{path}")
 
-        if value is not None:
-            return int(value)
+async def refresh_storage_usage_if_older(path: str, queued_at: float) -> None:
+    """
+    Measure path unless it was measured since queued_at.
+    Errors are logged, there is no one to report them to.
+    """
+    try:
+        measured_at = await get_storage_usage_measured_at(path) or 0
+        if measured_at >= queued_at:
+            return
+        await measure_storage_usage(path)
+    except Exception as error:
+        logger.error(f"Could not refresh storage usage of {path}: {error}")
 
-        async with redis_conn.lock(f"sizecounter:calculatelock:{path}", timeout=2 * 60):
-            usage = await asyncio.get_running_loop().run_in_executor(
-                None, get_storage_usage_blocking, path
-            )
 
-            await redis_conn.set(f"sizecounter:path:{path}", usage, ex=15 * 60)
+# huey tasks need to return something
+@huey.task()
+def refresh_folder_storage_usage(path: str, queued_at: float) -> bool:
+    huey_async_helper.run_async(refresh_storage_usage_if_older(path, queued_at))
+    return True
 
-        return usage
 
-    return await asyncio.get_running_loop().run_in_executor(
-        None, get_storage_usage_blocking, path
+async def get_storage_usage_measurement(path: str) -> StorageUsageMeasurement:
+    """
+    Get the last measured usage of path without waiting for a scan.
+    A stale measurement is returned as is and a refresh is queued.
+    Only a path which was never measured is measured right away.
+    """
+    path = os.path.abspath(path)
+    redis_conn = await RedisPool().get_connection_async()
+
+    saved = await redis_conn.hgetall(_usage_key(path))
+    if not saved:
+        return await measure_storage_usage(path)
+
+    measured_at = float(saved["measured_at"])
+    if time.time() - measured_at > USAGE_FRESH_SECONDS:
+        # One refresh at a time, wherever it was asked for
+        if await redis_conn.set(
+            f"sizecounter:revalidating:{path}", 1, nx=True, ex=2 * 60
+        ):
+            refresh_folder_storage_usage(path, time.time())
+
+    return StorageUsageMeasurement(
+        int(saved["usage"]), datetime.fromtimestamp(measured_at)
+    )
+
+
+async def get_storage_usage(path: str) -> int:
+    return (await get_storage_usage_measurement(path)).usage
+
+
+async def get_folders_storage_usage(
+    folders: Iterable[str],
+) -> Dict[str, StorageUsageMeasurement]:
+    """
+    Get usage of several folders at once, by folder.
+    """
+    folders = list(dict.fromkeys(folders))
+    measurements = await asyncio.gather(
+        *[get_storage_usage_measurement(folder) for folder in folders]
     )
+    return dict(zip(folders, measurements))
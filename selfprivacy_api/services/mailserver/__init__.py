@@ -68,6 +68,10 @@ class MailServer(Service):
     def is_enabled() -> bool:
         return True
 
+    @staticmethod
+    def get_units() -> List[str]:
+        return [DOVECOT_UNIT, POSTFIX_UNIT]
+
     @staticmethod
     async def get_status() -> ServiceStatus:
         return await get_service_status_from_several_units([DOVECOT_UNIT, POSTFIX_UNIT])
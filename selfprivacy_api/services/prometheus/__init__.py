@@ -67,6 +67,10 @@ class Prometheus(Service):
     def get_backup_description() -> str:
         return "Backups are not available for Prometheus."
 
+    @staticmethod
+    def get_units() -> List[str]:
+        return ["prometheus.service"]
+
     @staticmethod
     async def get_status() -> ServiceStatus:
         return await get_service_status("prometheus.service")
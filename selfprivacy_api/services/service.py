@@ -3,7 +3,7 @@
 from abc import ABC, abstractmethod
 import asyncio
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from os.path import exists
 
 from selfprivacy_api import utils
@@ -21,7 +21,11 @@ from selfprivacy_api.models.services import (
     ServiceDnsRecord,
     SupportLevel,
 )
-from selfprivacy_api.services.generic_size_counter import get_storage_usage
+from selfprivacy_api.services.generic_size_counter import (
+    StorageUsageMeasurement,
+    get_folders_storage_usage,
+    measure_folders_storage_usage,
+)
 from selfprivacy_api.services.owned_path import OwnedPath, Bind
 from selfprivacy_api.services.moving import (
     check_binds,
@@ -213,6 +217,12 @@ class Service(ABC):
         """
         return None
 
+    def get_units(self) -> List[str]:
+        """
+        The systemd units which make up the status of the service.
+        """
+        return []
+
     @staticmethod
     @abstractmethod
     async def get_status() -> ServiceStatus:
@@ -285,14 +295,28 @@ class Service(ABC):
     @classmethod
     async def get_storage_usage(cls) -> int:
         """
-        Calculate the real storage usage of folders occupied by service
-        Calculate using pathlib.
-        Do not follow symlinks.
+        Measure the storage usage of folders occupied by service now.
+        Do not follow symlinks. For a quick, possibly old value, use
+        get_storage_usage_measurement.
         """
-        storage_used = 0
-        for folder in cls.get_folders():
-            storage_used += await get_storage_usage(folder)
-        return storage_used
+        return await measure_folders_storage_usage(cls.get_folders())
+
+    @classmethod
+    async def get_storage_usage_measurement(cls) -> StorageUsageMeasurement:
+        """
+        Last measured storage usage of folders occupied by service,
+        as old as the oldest folder measurement.
+        """
+        by_folder = await cls.get_storage_usage_by_folder()
+        return StorageUsageMeasurement.combine(by_folder.values())
+
+    @classmethod
+    async def get_storage_usage_by_folder(cls) -> Dict[str, StorageUsageMeasurement]:
+        """
+        Last measured storage usage of each folder occupied by service.
+        Folders are measured concurrently.
+        """
+        return await get_folders_storage_usage(cls.get_folders())
 
     @classmethod
     def has_folders(cls) -> int:
@@ -1,12 +1,20 @@
+import time
+
 from huey import crontab
 
-from selfprivacy_api.services import Service
+from selfprivacy_api.services import Service, ServiceManager
+from selfprivacy_api.services.generic_size_counter import (
+    USAGE_FRESH_SECONDS,
+    get_storage_usage_measured_at,
+    refresh_folder_storage_usage,
+)
 from selfprivacy_api.services.suggested import SuggestedServices
 from selfprivacy_api.utils.block_devices import BlockDevice
 from selfprivacy_api.utils.huey import huey, huey_async_helper
 from selfprivacy_api.jobs import Job, Jobs, JobStatus
 
 SUGGESTED_SERVICES_SYNC_EVERY_HOURS = 12
+STORAGE_USAGE_REFRESH_EVERY_MINUTES = 5
 
 
 @huey.periodic_task(
@@ -16,6 +24,37 @@ def suggested_services_sync():
     huey_async_helper.run_async(SuggestedServices.sync())
 
 
+async def refresh_stale_storage_usage() -> None:
+    """
+    Queue a measurement of every folder of enabled services which would
+    go stale before the next run, least recently measured first.
+    Each folder is measured by a task of its own, so that other tasks
+    get the worker between folders.
+    """
+    now = time.time()
+    # Refresh early enough that readers never see a stale value
+    refresh_older_than = now - (
+        USAGE_FRESH_SECONDS - STORAGE_USAGE_REFRESH_EVERY_MINUTES * 60
+    )
+    folders = {
+        folder
+        for service in await ServiceManager.get_enabled_services()
+        for folder in service.get_folders()
+    }
+    measured_at = {
+        folder: await get_storage_usage_measured_at(folder) or 0 for folder in folders
+    }
+    for folder in sorted(folders, key=measured_at.__getitem__):
+        if measured_at[folder] > refresh_older_than:
+            break
+        refresh_folder_storage_usage(folder, now)
+
+
+@huey.periodic_task(crontab(minute="*/" + str(STORAGE_USAGE_REFRESH_EVERY_MINUTES)))
+def refresh_storage_usage():
+    huey_async_helper.run_async(refresh_stale_storage_usage())
+
+
 @huey.task()
 def move_service(service: Service, new_volume: BlockDevice, job: Job) -> bool:
     """
@@ -5,7 +5,7 @@ import base64
 import logging
 import json
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from os.path import join, exists
 from os import mkdir, remove
 from opentelemetry import trace
@@ -23,7 +23,11 @@ from selfprivacy_api.services.flake_service_manager import (
     FlakeServiceManager,
     get_sp_module_url,
 )
-from selfprivacy_api.services.generic_size_counter import get_storage_usage
+from selfprivacy_api.services.generic_size_counter import (
+    StorageUsageMeasurement,
+    get_folders_storage_usage,
+    measure_folders_storage_usage,
+)
 from selfprivacy_api.services.owned_path import OwnedPath
 from selfprivacy_api.services.service import Service
 from selfprivacy_api.utils import ReadUserData, WriteUserData, get_domain
@@ -254,6 +258,9 @@ class TemplatedService(Service):
             return None
         return self.meta.sso.admin_group
 
+    def get_units(self) -> List[str]:
+        return self.meta.systemd_services
+
     async def get_status(self) -> ServiceStatus:
         if not self.meta.systemd_services:
             return ServiceStatus.INACTIVE
@@ -347,14 +354,26 @@ class TemplatedService(Service):
 
     async def get_storage_usage(self) -> int:
         """
-        Calculate the real storage usage of folders occupied by service
-        Calculate using pathlib.
-        Do not follow symlinks.
+        Measure the storage usage of folders occupied by service now.
+        Do not follow symlinks. For a quick, possibly old value, use
+        get_storage_usage_measurement.
         """
-        storage_used = 0
-        for folder in self.get_folders():
-            storage_used += await get_storage_usage(folder)
-        return storage_used
+        return await measure_folders_storage_usage(self.get_folders())
+
+    async def get_storage_usage_measurement(self) -> StorageUsageMeasurement:
+        """
+        Last measured storage usage of folders occupied by service,
+        as old as the oldest folder measurement.
+        """
+        by_folder = await self.get_storage_usage_by_folder()
+        return StorageUsageMeasurement.combine(by_folder.values())
+
+    async def get_storage_usage_by_folder(self) -> Dict[str, StorageUsageMeasurement]:
+        """
+        Last measured storage usage of each folder occupied by service.
+        Folders are measured concurrently.
+        """
+        return await get_folders_storage_usage(self.get_folders())
 
     def has_folders(self) -> int:
         """
@@ -2,8 +2,10 @@
 
 import base64
 import asyncio
+from datetime import datetime
 
 from selfprivacy_api.jobs import Job
+from selfprivacy_api.services.generic_size_counter import StorageUsageMeasurement
 from selfprivacy_api.services.service import Service, ServiceStatus
 from selfprivacy_api.utils.block_devices import BlockDevice
 from selfprivacy_api.utils.observable import Observable
@@ -162,6 +164,13 @@ class DummyService(Service):
     async def get_storage_usage() -> int:
         return 0
 
+    @classmethod
+    async def get_storage_usage_by_folder(cls) -> dict[str, StorageUsageMeasurement]:
+        return {
+            folder: StorageUsageMeasurement(usage=0, measured_at=datetime.now())
+            for folder in cls.get_folders()
+        }
+
     @classmethod
     def get_drive(cls) -> str:
         return cls.drive
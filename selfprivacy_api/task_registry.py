@@ -22,7 +22,9 @@ from opentelemetry.sdk.trace.export import BatchSpanProcessor
 
 from selfprivacy_api.backup.tasks import *
 from selfprivacy_api.dependencies import get_api_version
+from selfprivacy_api.jobs.export_logs import export_logs_task
 from selfprivacy_api.jobs.nix_collect_garbage import nix_collect_garbage_task
+from selfprivacy_api.jobs.tasks import repair_job_indexes
 from selfprivacy_api.jobs.test import test_job
 from selfprivacy_api.jobs.upgrade_system import rebuild_system_task
 from selfprivacy_api.services.tasks import move_service
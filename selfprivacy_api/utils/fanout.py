@@ -0,0 +1,84 @@
+"""
+Bounded per-subscriber queues for in-process fan-out feeds.
+
+A feed reads each message once and hands it to every subscriber.
+A subscriber that lets its queue fill up is dropped instead of
+slowing down or blocking the others.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Generic, Optional, Protocol, TypeVar
+
+T = TypeVar("T")
+
+_WAKEUP = object()
+
+
+class SlowConsumerError(Exception):
+    """The subscriber fell too far behind and was unsubscribed."""
+
+
+class Feed(Protocol):
+    def remove(self, subscription: Any) -> None: ...
+
+
+class Subscription(Generic[T]):
+    """
+    One subscriber's view of a shared feed.
+    Messages are shared between subscribers and must not be mutated.
+    """
+
+    def __init__(self, feed: Feed, buffer_size: int):
+        self._feed: Optional[Feed] = feed
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self._error: Optional[Exception] = None
+
+    @property
+    def closed(self) -> bool:
+        return self._feed is None
+
+    async def get(self) -> T:
+        """
+        Wait for the next message. Raises SlowConsumerError once the
+        buffered messages are drained if this subscriber was dropped.
+        """
+        if self._error is not None and self._queue.empty():
+            raise self._error
+        message = await self._queue.get()
+        if message is _WAKEUP:
+            assert self._error is not None
+            raise self._error
+        return message
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        return await self.get()
+
+    def close(self) -> None:
+        if self._feed is not None:
+            self._feed.remove(self)
+            self._feed = None
+
+    def _deliver(self, message: T) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._fail(
+                SlowConsumerError(
+                    f"More than {self._queue.maxsize} messages left unread"
+                )
+            )
+
+    def _fail(self, error: Exception) -> None:
+        if self._error is not None:
+            return
+        self._error = error
+        self.close()
+        # A reader blocked on an empty queue needs a nudge,
+        # a reader with a full queue will see the error after draining it.
+        try:
+            self._queue.put_nowait(_WAKEUP)
+        except asyncio.QueueFull:
+            pass
@@ -0,0 +1,158 @@
+"""
+Process-wide tail of the systemd journal.
+
+Log subscribers in an event loop whose filters have the same units,
+slices and priority share one journal reader with those as journal
+matches, so journald skips other entries itself. Every new entry is
+read and decoded once into a JournalEntry, then handed to each
+subscriber of the reader whose message filter matches it. Subscribers
+have bounded queues, and one that falls behind is dropped with
+SlowConsumerError.
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from systemd import journal
+
+from selfprivacy_api.utils.fanout import Subscription
+from selfprivacy_api.utils.singleton_metaclass import SingletonMetaclass
+from selfprivacy_api.utils.systemd_journal import (
+    JournalEntry,
+    LogFilter,
+    open_journal,
+    read_entries,
+)
+
+DEFAULT_TAIL_BUFFER = 1024
+
+# Units, slices and priority of a filter: what a reader matches on
+_MatchKey = Tuple[Tuple[str, ...], Tuple[str, ...], Optional[int]]
+
+
+def _match_key(log_filter: LogFilter) -> _MatchKey:
+    return (
+        tuple(sorted(set(log_filter.units))),
+        tuple(sorted(set(log_filter.slices))),
+        log_filter.max_priority,
+    )
+
+
+class JournalSubscription(Subscription[JournalEntry]):
+    """
+    A subscription to new journal entries matching a filter.
+    """
+
+    def __init__(self, feed: "_JournalFeed", log_filter: LogFilter, buffer_size: int):
+        super().__init__(feed, buffer_size)
+        self.log_filter = log_filter
+
+
+class _JournalFeed:
+    def __init__(self, log_filter: LogFilter, on_empty):
+        self.subscribers: set[JournalSubscription] = set()
+        self._on_empty = on_empty
+        self._loop = asyncio.get_running_loop()
+        self._reader = open_journal(log_filter)
+        self._reader.seek_tail()
+        self._reader._previous()
+        self._loop.add_reader(self._reader, self._read)
+
+    def remove(self, subscription: JournalSubscription) -> None:
+        self.subscribers.discard(subscription)
+        if not self.subscribers and self._reader is not None:
+            self._on_empty(self)
+            self._close()
+
+    def _close(self) -> None:
+        if self._reader is None:
+            return
+        try:
+            self._loop.remove_reader(self._reader)
+        finally:
+            self._reader.close()
+            self._reader = None
+
+    def _read(self) -> None:
+        assert self._reader is not None
+        try:
+            if self._reader.process() == journal.NOP:
+                return
+            for entry in read_entries(self._reader):
+                for subscription in list(self.subscribers):
+                    # Units, slices and priority are matched by the reader
+                    if subscription.log_filter.matches_message(entry.message):
+                        subscription._deliver(entry)
+        except Exception as error:
+            self._on_empty(self)
+            self._close()
+            for subscription in list(self.subscribers):
+                subscription._fail(error)
+
+
+class JournalTail(metaclass=SingletonMetaclass):
+    """
+    Journal tail hub singleton.
+    """
+
+    def __init__(self):
+        # {event loop -> {match key -> feed}}; entries die with the loop
+        self._feeds: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[_MatchKey, _JournalFeed]
+        ] = weakref.WeakKeyDictionary()
+
+    def _feed(self, log_filter: LogFilter) -> _JournalFeed:
+        feeds = self._feeds.setdefault(asyncio.get_running_loop(), {})
+        key = _match_key(log_filter)
+        feed = feeds.get(key)
+        if feed is None:
+
+            def forget(dead: _JournalFeed) -> None:
+                if feeds.get(key) is dead:
+                    del feeds[key]
+
+            feed = _JournalFeed(log_filter, forget)
+            feeds[key] = feed
+        return feed
+
+    def open(
+        self,
+        log_filter: Optional[LogFilter] = None,
+        buffer_size: int = DEFAULT_TAIL_BUFFER,
+    ) -> JournalSubscription:
+        """
+        Subscribe to journal entries added from now on.
+        The caller must close() the subscription.
+        """
+        if log_filter is None:
+            log_filter = LogFilter()
+        feed = self._feed(log_filter)
+        subscription = JournalSubscription(feed, log_filter, buffer_size)
+        feed.subscribers.add(subscription)
+        return subscription
+
+    @asynccontextmanager
+    async def subscribe(
+        self,
+        log_filter: Optional[LogFilter] = None,
+        buffer_size: int = DEFAULT_TAIL_BUFFER,
+    ) -> AsyncIterator[JournalSubscription]:
+        subscription = self.open(log_filter, buffer_size)
+        try:
+            yield subscription
+        finally:
+            subscription.close()
+
+    def subscriber_count(self) -> int:
+        feeds = self._feeds.get(asyncio.get_running_loop(), {})
+        return sum(len(feed.subscribers) for feed in feeds.values())
+
+    def reader_count(self) -> int:
+        return len(self._feeds.get(asyncio.get_running_loop(), {}))
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the singleton instance (test-isolation helper)."""
+        SingletonMetaclass._instances.pop(cls, None)
@@ -0,0 +1,137 @@
+"""
+Process-wide fan-out of Redis keyspace notifications.
+
+Every subscriber to the same key pattern shares one pubsub connection
+per event loop. Messages are read once and handed to each subscriber's
+bounded queue. A subscriber that lets its queue fill up is dropped
+instead of slowing down or blocking the others.
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from redis.asyncio.client import PubSub
+
+from selfprivacy_api.utils.fanout import SlowConsumerError  # noqa: F401
+from selfprivacy_api.utils.fanout import Subscription
+from selfprivacy_api.utils.redis_pool import RedisPool
+from selfprivacy_api.utils.singleton_metaclass import SingletonMetaclass
+
+DEFAULT_SUBSCRIBER_BUFFER = 256
+
+
+class KeyspaceSubscription(Subscription[dict]):
+    """
+    A subscription to the keyspace notifications of one key pattern.
+    """
+
+
+class _PatternFeed:
+    def __init__(self, pattern: str, pubsub: PubSub, on_empty):
+        self.pattern = pattern
+        self.subscribers: set[KeyspaceSubscription] = set()
+        self._pubsub = pubsub
+        self._on_empty = on_empty
+        self._closed = False
+        self._reader = asyncio.create_task(self._read())
+
+    def remove(self, subscription: KeyspaceSubscription) -> None:
+        self.subscribers.discard(subscription)
+        if not self.subscribers and not self._closed:
+            self._closed = True
+            self._on_empty(self)
+            self._reader.cancel()
+
+    async def _read(self) -> None:
+        try:
+            while True:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=None
+                )
+                if message is None:
+                    continue
+                for subscription in list(self.subscribers):
+                    subscription._deliver(message)
+        except asyncio.CancelledError:
+            pass
+        except Exception as error:
+            self._closed = True
+            self._on_empty(self)
+            for subscription in list(self.subscribers):
+                subscription._fail(error)
+        finally:
+            await self._pubsub.aclose()
+
+
+class KeyspaceNotifications(metaclass=SingletonMetaclass):
+    """
+    Keyspace notification hub singleton.
+    """
+
+    def __init__(self):
+        # {event loop -> {pattern -> feed}}; entries die with the loop
+        self._feeds: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, _PatternFeed]
+        ] = weakref.WeakKeyDictionary()
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    def _loop_feeds(self) -> dict[str, _PatternFeed]:
+        loop = asyncio.get_running_loop()
+        feeds = self._feeds.get(loop)
+        if feeds is None:
+            feeds = {}
+            self._feeds[loop] = feeds
+            self._locks[loop] = asyncio.Lock()
+        return feeds
+
+    async def _feed_for(self, pattern: str) -> _PatternFeed:
+        feeds = self._loop_feeds()
+        async with self._locks[asyncio.get_running_loop()]:
+            feed = feeds.get(pattern)
+            if feed is None:
+                pubsub = await RedisPool().subscribe_to_keys(pattern)
+
+                def forget(dead: _PatternFeed) -> None:
+                    if feeds.get(pattern) is dead:
+                        del feeds[pattern]
+
+                feed = _PatternFeed(pattern, pubsub, forget)
+                feeds[pattern] = feed
+            return feed
+
+    async def open(
+        self, pattern: str, buffer_size: int = DEFAULT_SUBSCRIBER_BUFFER
+    ) -> KeyspaceSubscription:
+        """
+        Subscribe to notifications for keys matching pattern.
+        The caller must close() the subscription.
+        """
+        feed = await self._feed_for(pattern)
+        subscription = KeyspaceSubscription(feed, buffer_size)
+        feed.subscribers.add(subscription)
+        return subscription
+
+    @asynccontextmanager
+    async def subscribe(
+        self, pattern: str, buffer_size: int = DEFAULT_SUBSCRIBER_BUFFER
+    ) -> AsyncIterator[KeyspaceSubscription]:
+        subscription = await self.open(pattern, buffer_size)
+        try:
+            yield subscription
+        finally:
+            subscription.close()
+
+    def subscriber_count(self, pattern: str) -> int:
+        feed = self._loop_feeds().get(pattern)
+        if feed is None:
+            return 0
+        return len(feed.subscribers)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the singleton instance (test-isolation helper)."""
+        SingletonMetaclass._instances.pop(cls, None)
@@ -9,6 +9,7 @@ The locales are loaded into the memory at the api startup and kept in a singleto
 """
 
 from abc import ABC, abstractmethod
+import functools
 import gettext
 from pathlib import Path
 from typing import Optional
@@ -32,6 +33,8 @@ class Localization(metaclass=SingletonMetaclass):
         self.supported_locales = [
             p.name for p in Path(str(_LOCALE_DIR)).iterdir() if p.is_dir()
         ]
+        for locale in self.supported_locales:
+            _catalog(locale)
 
     def get_locale(self, locale: Optional[str]) -> str:
         if not locale:
@@ -53,13 +56,23 @@ class Translation(ABC):
         ...
 
 
+@functools.lru_cache(maxsize=32)
+def _catalog(locale: str) -> gettext.NullTranslations:
+    return gettext.translation(
+        _DOMAIN, localedir=str(_LOCALE_DIR), languages=[locale], fallback=True
+    )
+
+
+# Bounded because some messages are dynamic, like journal lines in job statuses
+@functools.lru_cache(maxsize=4096)
+def _translate_cached(locale: str, text: str) -> str:
+    return _catalog(locale).gettext(text)
+
+
 class TranslateSystemMessage(Translation):
     @staticmethod
     def translate(locale: str, text: str) -> str:
-        t = gettext.translation(
-            _DOMAIN, localedir=str(_LOCALE_DIR), languages=[locale], fallback=True
-        )
-        return t.gettext(text)
+        return _translate_cached(locale, text)
 
 
 def get_locale(info):
@@ -1,15 +1,28 @@
 """Prometheus monitoring queries."""
 
 # pylint: disable=too-few-public-methods
-import httpx
+import time
+import math
+import asyncio
+from enum import Enum
 
 import strawberry
 
 from dataclasses import dataclass
-from typing import Optional, Annotated, Union, List, Tuple
+from typing import Optional, Annotated, Union, List, Tuple, Dict
 from datetime import datetime, timedelta
 
-PROMETHEUS_URL = "http://localhost:9001"
+from selfprivacy_api.services import ServiceManager
+from selfprivacy_api.utils.monitoring_cache import RangeQueryCache
+from selfprivacy_api.utils.monitoring_series import (
+    MIN_LTTB_POINTS,
+    columns_from_values,
+    downsample_buckets,
+    downsample_lttb,
+    pack_float64,
+    pack_int64,
+)
+from selfprivacy_api.utils.prometheus_client import PrometheusClient
 
 
 @strawberry.type
@@ -53,23 +66,197 @@ MonitoringMetricsResult = Annotated[
 ]
 
 
+MonitoringResult = Annotated[
+    Union[MonitoringValues, MonitoringMetrics, MonitoringQueryError],
+    strawberry.union("MonitoringResult"),
+]
+
+
+@strawberry.enum
+class MonitoringMetricKind(Enum):
+    CPU_USAGE_OVERALL = "CPU_USAGE_OVERALL"
+    MEMORY_USAGE_OVERALL = "MEMORY_USAGE_OVERALL"
+    SWAP_USAGE_OVERALL = "SWAP_USAGE_OVERALL"
+    MEMORY_USAGE_MAX_BY_SLICE = "MEMORY_USAGE_MAX_BY_SLICE"
+    MEMORY_USAGE_AVERAGE_BY_SLICE = "MEMORY_USAGE_AVERAGE_BY_SLICE"
+    DISK_USAGE_OVERALL = "DISK_USAGE_OVERALL"
+    NETWORK_USAGE_OVERALL = "NETWORK_USAGE_OVERALL"
+
+
+@strawberry.type
+@dataclass
+class MonitoringBatchItem:
+    kind: MonitoringMetricKind
+    result: MonitoringResult
+    duration_ms: float = strawberry.field(
+        description="Time spent waiting for this metric."
+    )
+
+
+@strawberry.type
+@dataclass
+class MonitoringBatch:
+    items: List[MonitoringBatchItem]
+    duration_ms: float = strawberry.field(
+        description="Time spent on the whole batch. Metrics are queried concurrently."
+    )
+
+
+@strawberry.enum
+class DownsampleMethod(Enum):
+    LTTB = "LTTB"
+    MIN = "MIN"
+    MAX = "MAX"
+    AVG = "AVG"
+
+
+@strawberry.type
+@dataclass
+class MonitoringPackedSeries:
+    metric_id: str
+    count: int
+    timestamps: str = strawberry.field(
+        description="Base64 of little-endian int64 Unix timestamps in seconds."
+    )
+    values: str = strawberry.field(
+        description="Base64 of little-endian float64 values."
+    )
+
+
+@strawberry.type
+@dataclass
+class MonitoringPackedMetrics:
+    series: List[MonitoringPackedSeries]
+
+
+MonitoringPackedResult = Annotated[
+    Union[MonitoringPackedMetrics, MonitoringQueryError],
+    strawberry.union("MonitoringPackedResult"),
+]
+
+
+@strawberry.type
+@dataclass
+class ServiceResourceUsage:
+    service_id: str
+    display_name: str
+    cpu_usage: Optional[float] = strawberry.field(
+        default=None, description="Average CPU usage in percent of one core."
+    )
+    memory_usage: Optional[float] = strawberry.field(
+        default=None, description="Average memory and swap usage in bytes."
+    )
+    disk_read: Optional[float] = strawberry.field(
+        default=None, description="Average disk read rate in bytes per second."
+    )
+    disk_write: Optional[float] = strawberry.field(
+        default=None, description="Average disk write rate in bytes per second."
+    )
+    network_receive: Optional[float] = strawberry.field(
+        default=None, description="Average receive rate in bytes per second."
+    )
+    network_transmit: Optional[float] = strawberry.field(
+        default=None, description="Average transmit rate in bytes per second."
+    )
+
+
+@strawberry.type
+@dataclass
+class ServicesResourceUsage:
+    services: List[ServiceResourceUsage]
+    errors: List[str] = strawberry.field(
+        description="Metrics which could not be queried. They are null above."
+    )
+
+
+ServicesResourceUsageResult = Annotated[
+    Union[ServicesResourceUsage, MonitoringQueryError],
+    strawberry.union("ServicesResourceUsageResult"),
+]
+
+
+CPU_USAGE_OVERALL_QUERY = (
+    '100 - (avg by (instance) (rate(node_cpu_seconds_total{mode="idle"}[5m])) * 100)'
+)
+MEMORY_USAGE_OVERALL_QUERY = (
+    "100 - (100 * (node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes))"
+)
+SWAP_USAGE_OVERALL_QUERY = (
+    "100 - (100 * (node_memory_SwapFree_bytes / node_memory_SwapTotal_bytes))"
+)
+DISK_USAGE_OVERALL_QUERY = """100 - (100 * sum by (device) (node_filesystem_avail_bytes{fstype!="rootfs",fstype!="ramfs",fstype!="tmpfs",mountpoint!="/efi"}) / sum by (device) (node_filesystem_size_bytes{fstype!="rootfs",fstype!="ramfs",fstype!="tmpfs",mountpoint!="/efi"}))"""
+NETWORK_USAGE_OVERALL_QUERY = """
+            label_replace(rate(node_network_receive_bytes_total{device!="lo"}[5m]), "direction", "receive", "device", ".*")
+            or
+            label_replace(rate(node_network_transmit_bytes_total{device!="lo"}[5m]), "direction", "transmit", "device", ".*")
+        """
+
+# Top-level systemd slices. Every service runs in a slice named after its id.
+SLICE_SELECTOR = 'id!~".*slice.*slice", id=~".*slice"'
+# ServiceResourceUsage field -> expression giving one series per slice
+SERVICE_RESOURCE_QUERIES: Dict[str, str] = {
+    "cpu_usage": f"sum by (id) (rate(container_cpu_usage_seconds_total{{{SLICE_SELECTOR}}}[5m])) * 100",
+    "memory_usage": f"sum by (id) (container_memory_rss{{{SLICE_SELECTOR}}} + container_memory_swap{{{SLICE_SELECTOR}}})",
+    "disk_read": f"sum by (id) (rate(container_fs_reads_bytes_total{{{SLICE_SELECTOR}}}[5m]))",
+    "disk_write": f"sum by (id) (rate(container_fs_writes_bytes_total{{{SLICE_SELECTOR}}}[5m]))",
+    "network_receive": f"sum by (id) (rate(container_network_receive_bytes_total{{{SLICE_SELECTOR}}}[5m]))",
+    "network_transmit": f"sum by (id) (rate(container_network_transmit_bytes_total{{{SLICE_SELECTOR}}}[5m]))",
+}
+
+# Metrics which are time series, with the label their series are told apart by
+RANGE_QUERIES: Dict[MonitoringMetricKind, Tuple[str, Optional[str]]] = {
+    MonitoringMetricKind.CPU_USAGE_OVERALL: (CPU_USAGE_OVERALL_QUERY, None),
+    MonitoringMetricKind.MEMORY_USAGE_OVERALL: (MEMORY_USAGE_OVERALL_QUERY, None),
+    MonitoringMetricKind.SWAP_USAGE_OVERALL: (SWAP_USAGE_OVERALL_QUERY, None),
+    MonitoringMetricKind.DISK_USAGE_OVERALL: (DISK_USAGE_OVERALL_QUERY, "device"),
+    MonitoringMetricKind.NETWORK_USAGE_OVERALL: (
+        NETWORK_USAGE_OVERALL_QUERY,
+        "direction",
+    ),
+}
+
+
 class MonitoringQueries:
     @staticmethod
     async def _send_range_query(
         query: str, start: int, end: int, step: int, result_type: Optional[str] = None
+    ) -> Union[dict, MonitoringQueryError]:
+        """
+        Run a range query through the cache. The range is aligned to
+        step boundaries, so returned timestamps are multiples of step.
+        """
+        if step <= 0:
+            return MonitoringQueryError(
+                error="Step must be a positive number of seconds"
+            )
+
+        async def fetch(
+            query: str, start: int, end: int, step: int
+        ) -> Union[dict, MonitoringQueryError]:
+            return await MonitoringQueries._fetch_range_query(
+                query, start, end, step, result_type
+            )
+
+        return await RangeQueryCache().query(query, start, end, step, fetch)
+
+    @staticmethod
+    async def _fetch_range_query(
+        query: str, start: int, end: int, step: int, result_type: Optional[str] = None
     ) -> Union[dict, MonitoringQueryError]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{PROMETHEUS_URL}/api/v1/query_range",
+            response = (
+                await PrometheusClient()
+                .get_client()
+                .get(
+                    "/api/v1/query_range",
                     params={
                         "query": query,
                         "start": start,
                         "end": end,
                         "step": step,
                     },
-                    timeout=0.8,
                 )
+            )
 
             if response.status_code != 200:
                 return MonitoringQueryError(
@@ -91,14 +278,16 @@ class MonitoringQueries:
         query: str, result_type: Optional[str] = None
     ) -> Union[dict, MonitoringQueryError]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{PROMETHEUS_URL}/api/v1/query",
+            response = (
+                await PrometheusClient()
+                .get_client()
+                .get(
+                    "/api/v1/query",
                     params={
                         "query": query,
                     },
-                    timeout=0.8,
                 )
+            )
             if response.status_code != 200:
                 return MonitoringQueryError(
                     error=f"Prometheus returned unexpected HTTP status code. Error: {response.text}. The query was {query}"
@@ -215,7 +404,7 @@ class MonitoringQueries:
         start_timestamp = int(start.timestamp())
         end_timestamp = int(end.timestamp())
 
-        query = '100 - (avg by (instance) (rate(node_cpu_seconds_total{mode="idle"}[5m])) * 100)'
+        query = CPU_USAGE_OVERALL_QUERY
 
         data = await MonitoringQueries._send_range_query(
             query, start_timestamp, end_timestamp, step, result_type="matrix"
@@ -255,7 +444,7 @@ class MonitoringQueries:
         start_timestamp = int(start.timestamp())
         end_timestamp = int(end.timestamp())
 
-        query = "100 - (100 * (node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes))"
+        query = MEMORY_USAGE_OVERALL_QUERY
 
         data = await MonitoringQueries._send_range_query(
             query, start_timestamp, end_timestamp, step, result_type="matrix"
@@ -295,9 +484,7 @@ class MonitoringQueries:
         start_timestamp = int(start.timestamp())
         end_timestamp = int(end.timestamp())
 
-        query = (
-            "100 - (100 * (node_memory_SwapFree_bytes / node_memory_SwapTotal_bytes))"
-        )
+        query = SWAP_USAGE_OVERALL_QUERY
 
         data = await MonitoringQueries._send_range_query(
             query, start_timestamp, end_timestamp, step, result_type="matrix"
@@ -407,7 +594,7 @@ class MonitoringQueries:
         start_timestamp = int(start.timestamp())
         end_timestamp = int(end.timestamp())
 
-        query = """100 - (100 * sum by (device) (node_filesystem_avail_bytes{fstype!="rootfs",fstype!="ramfs",fstype!="tmpfs",mountpoint!="/efi"}) / sum by (device) (node_filesystem_size_bytes{fstype!="rootfs",fstype!="ramfs",fstype!="tmpfs",mountpoint!="/efi"}))"""
+        query = DISK_USAGE_OVERALL_QUERY
 
         data = await MonitoringQueries._send_range_query(
             query, start_timestamp, end_timestamp, step, result_type="matrix"
@@ -444,11 +631,7 @@ class MonitoringQueries:
         start_timestamp = int(start.timestamp())
         end_timestamp = int(end.timestamp())
 
-        query = """
-            label_replace(rate(node_network_receive_bytes_total{device!="lo"}[5m]), "direction", "receive", "device", ".*")
-            or
-            label_replace(rate(node_network_transmit_bytes_total{device!="lo"}[5m]), "direction", "transmit", "device", ".*")
-        """
+        query = NETWORK_USAGE_OVERALL_QUERY
 
         data = await MonitoringQueries._send_range_query(
             query, start_timestamp, end_timestamp, step, result_type="matrix"
@@ -462,3 +645,218 @@ class MonitoringQueries:
                 data, "direction"
             )
         )
+
+    @staticmethod
+    async def _timed(
+        kind: MonitoringMetricKind,
+        start: datetime,
+        end: datetime,
+        step: int,
+    ) -> MonitoringBatchItem:
+        began = time.perf_counter()
+        result: Union[MonitoringValues, MonitoringMetrics, MonitoringQueryError]
+        try:
+            if kind == MonitoringMetricKind.CPU_USAGE_OVERALL:
+                result = await MonitoringQueries.cpu_usage_overall(start, end, step)
+            elif kind == MonitoringMetricKind.MEMORY_USAGE_OVERALL:
+                result = await MonitoringQueries.memory_usage_overall(start, end, step)
+            elif kind == MonitoringMetricKind.SWAP_USAGE_OVERALL:
+                result = await MonitoringQueries.swap_usage_overall(start, end, step)
+            elif kind == MonitoringMetricKind.MEMORY_USAGE_MAX_BY_SLICE:
+                result = await MonitoringQueries.memory_usage_max_by_slice(start, end)
+            elif kind == MonitoringMetricKind.MEMORY_USAGE_AVERAGE_BY_SLICE:
+                result = await MonitoringQueries.memory_usage_average_by_slice(
+                    start, end
+                )
+            elif kind == MonitoringMetricKind.DISK_USAGE_OVERALL:
+                result = await MonitoringQueries.disk_usage_overall(start, end, step)
+            else:
+                result = await MonitoringQueries.network_usage_overall(start, end, step)
+        except Exception as error:
+            # One failing metric must not fail the whole batch
+            result = MonitoringQueryError(
+                error=f"Failed to get {kind.value}: {str(error)}"
+            )
+        return MonitoringBatchItem(
+            kind=kind,
+            result=result,
+            duration_ms=(time.perf_counter() - began) * 1000,
+        )
+
+    @staticmethod
+    async def batch(
+        kinds: List[MonitoringMetricKind],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        step: int = 60,  # seconds
+    ) -> MonitoringBatch:
+        """
+        Get several metrics over the same time window at once.
+        The queries run concurrently over the shared Prometheus client,
+        so the batch takes about as long as its slowest metric.
+
+        Args:
+            kinds: The metrics to get. Repeated kinds are queried once.
+            start (datetime, optional): The start time.
+                Defaults to 20 minutes ago if not provided.
+            end (datetime, optional): The end time.
+                Defaults to current time if not provided.
+            step (int): Interval in seconds between values.
+        """
+
+        start, end = MonitoringQueries._get_time_range(start, end)
+
+        began = time.perf_counter()
+        items = await asyncio.gather(
+            *[
+                MonitoringQueries._timed(kind, start, end, step)
+                for kind in dict.fromkeys(kinds)
+            ]
+        )
+        return MonitoringBatch(
+            items=list(items),
+            duration_ms=(time.perf_counter() - began) * 1000,
+        )
+
+    @staticmethod
+    async def packed_series(
+        kind: MonitoringMetricKind,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        step: int = 60,  # seconds
+        max_points: Optional[int] = None,
+        downsample: DownsampleMethod = DownsampleMethod.LTTB,
+    ) -> MonitoringPackedResult:
+        """
+        Get a metric as packed columns instead of a value object per sample.
+
+        Args:
+            kind: A time series metric. Per-slice memory is not one.
+            start (datetime, optional): The start time.
+                Defaults to 20 minutes ago if not provided.
+            end (datetime, optional): The end time.
+                Defaults to current time if not provided.
+            step (int): Interval in seconds between values.
+            max_points (int, optional): Downsample each series to at most
+                this many points.
+            downsample: How points are picked or merged when downsampling.
+        """
+
+        if kind not in RANGE_QUERIES:
+            return MonitoringQueryError(error=f"{kind.value} is not a time series")
+        query, id_key = RANGE_QUERIES[kind]
+
+        if max_points is not None:
+            min_points = MIN_LTTB_POINTS if downsample == DownsampleMethod.LTTB else 1
+            if max_points < min_points:
+                return MonitoringQueryError(
+                    error=f"Downsampling with {downsample.value} needs at least {min_points} points"
+                )
+
+        start, end = MonitoringQueries._get_time_range(start, end)
+
+        data = await MonitoringQueries._send_range_query(
+            query, int(start.timestamp()), int(end.timestamp()), step, "matrix"
+        )
+
+        if isinstance(data, MonitoringQueryError):
+            return data
+
+        series = []
+        for item in data["result"]:
+            timestamps, values = columns_from_values(item["values"])
+            if max_points is not None:
+                if downsample == DownsampleMethod.LTTB:
+                    timestamps, values = downsample_lttb(timestamps, values, max_points)
+                else:
+                    timestamps, values = downsample_buckets(
+                        timestamps, values, max_points, downsample.value.lower()
+                    )
+            series.append(
+                MonitoringPackedSeries(
+                    metric_id=(
+                        item["metric"].get(id_key, "unknown")
+                        if id_key is not None
+                        else kind.value.lower()
+                    ),
+                    count=len(timestamps),
+                    timestamps=pack_int64(timestamps),
+                    values=pack_float64(values),
+                )
+            )
+        return MonitoringPackedMetrics(series=series)
+
+    @staticmethod
+    async def _average_by_slice(
+        expression: str, offset: int, duration: int
+    ) -> Union[Dict[str, float], MonitoringQueryError]:
+        if offset == 0:
+            query = f"avg_over_time(({expression})[{duration}s:])"
+        else:
+            query = f"avg_over_time(({expression})[{duration}s:] offset {offset}s)"
+
+        data = await MonitoringQueries._send_query(query, result_type="vector")
+
+        if isinstance(data, MonitoringQueryError):
+            return data
+
+        averages = {}
+        for item in data["result"]:
+            value = float(item["value"][1])
+            # NaN and infinities cannot be sent as GraphQL floats
+            if math.isfinite(value):
+                slice_id = MonitoringQueries._clean_slice_id(
+                    item["metric"].get("id", "/unknown.slice"), clean_id=True
+                )
+                averages[slice_id] = value
+        return averages
+
+    @staticmethod
+    async def service_resource_usage(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ServicesResourceUsageResult:
+        """
+        Get average CPU, memory, disk I/O and network usage of every enabled
+        service. Each metric is one query covering all slices, and the
+        queries run concurrently.
+
+        Args:
+            start (datetime, optional): The start time.
+                Defaults to 20 minutes ago if not provided.
+            end (datetime, optional): The end time.
+                Defaults to current time if not provided.
+        """
+
+        start, end = MonitoringQueries._get_time_range(start, end)
+
+        offset, duration = MonitoringQueries._calculate_offset_and_duration(start, end)
+
+        services, *results = await asyncio.gather(
+            ServiceManager.get_enabled_services(),
+            *[
+                MonitoringQueries._average_by_slice(expression, offset, duration)
+                for expression in SERVICE_RESOURCE_QUERIES.values()
+            ],
+        )
+
+        errors = [
+            result.error
+            for result in results
+            if isinstance(result, MonitoringQueryError)
+        ]
+        if len(errors) == len(results):
+            return MonitoringQueryError(error=errors[0])
+
+        usages = []
+        for service in services:
+            service_id = service.get_id()
+            usage = ServiceResourceUsage(
+                service_id=service_id,
+                display_name=service.get_display_name(),
+            )
+            for field, result in zip(SERVICE_RESOURCE_QUERIES, results):
+                if not isinstance(result, MonitoringQueryError):
+                    setattr(usage, field, result.get(service_id))
+            usages.append(usage)
+        return ServicesResourceUsage(services=usages, errors=errors)
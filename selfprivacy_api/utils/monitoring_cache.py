@@ -0,0 +1,233 @@
+"""
+In-memory cache of Prometheus range query results.
+
+Dashboards refresh the same windows every few seconds. Time ranges are
+aligned to step boundaries so that overlapping windows evaluate at the
+same timestamps, and a window that extends a cached one only fetches
+the missing tail. The most recent points are always fetched again,
+because Prometheus may still be receiving samples for them.
+
+The cache is bounded by the total number of points it holds, least
+recently used queries are dropped first. Entries are also dropped when
+idle or old, and rebuilt on the next query.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple, Union
+
+from selfprivacy_api.utils.singleton_metaclass import SingletonMetaclass
+
+# About 50 MiB of cached points
+MAX_CACHED_POINTS = 500_000
+# Two weeks of one-minute points
+MAX_POINTS_PER_SERIES = 20_160
+# Entries not used for this long are dropped
+MAX_ENTRY_AGE_SECONDS = 60 * 60
+# Entries are rebuilt from scratch after this long, even if used
+MAX_ENTRY_LIFETIME_SECONDS = 6 * 60 * 60
+# Points this close to now are not considered final
+FRESH_DATA_MARGIN_SECONDS = 120
+
+RangeFetcher = Callable[[str, int, int, int], Awaitable[Union[dict, Any]]]
+
+
+def align_range(start: int, end: int, step: int) -> Tuple[int, int]:
+    """Move both ends of a range down to a multiple of step."""
+    if step <= 0:
+        raise ValueError("Step must be a positive number of seconds")
+    start = start - start % step
+    end = end - end % step
+    return start, max(start, end)
+
+
+def _is_matrix(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("resultType") == "matrix"
+
+
+class _Series:
+    __slots__ = ("metric", "timestamps", "values")
+
+    def __init__(self, metric: dict):
+        self.metric = metric
+        self.timestamps: List[float] = []
+        self.values: List[str] = []
+
+    def replace_from(self, since: float, points: List[list]) -> None:
+        cut = bisect_left(self.timestamps, since)
+        del self.timestamps[cut:]
+        del self.values[cut:]
+        for timestamp, value in points:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+
+    def trim(self, max_points: int) -> None:
+        if len(self.timestamps) > max_points:
+            del self.timestamps[:-max_points]
+            del self.values[:-max_points]
+
+    def points(self, start: float, end: float) -> List[list]:
+        low = bisect_left(self.timestamps, start)
+        high = bisect_right(self.timestamps, end)
+        return [[self.timestamps[i], self.values[i]] for i in range(low, high)]
+
+
+class _CachedRange:
+    def __init__(self, start: int, step: int):
+        self.start = start
+        self.step = step
+        # Last timestamp whose points are final
+        self.covered_end = start - step
+        self.series: Dict[frozenset, _Series] = {}
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.points = 0
+
+    def merge(self, since: int, data: dict) -> None:
+        """Replace everything from since onwards with freshly fetched data."""
+        for item in data["result"]:
+            key = frozenset(item["metric"].items())
+            series = self.series.get(key)
+            if series is None:
+                series = _Series(item["metric"])
+                self.series[key] = series
+            series.replace_from(since, item["values"])
+
+    def trim(self) -> None:
+        oldest_kept = self.covered_end - (MAX_POINTS_PER_SERIES - 1) * self.step
+        if oldest_kept > self.start:
+            self.start = oldest_kept
+            for series in self.series.values():
+                series.trim(MAX_POINTS_PER_SERIES)
+        self.points = sum(len(series.timestamps) for series in self.series.values())
+
+    def result(self, start: int, end: int) -> dict:
+        result = []
+        for series in self.series.values():
+            points = series.points(start, end)
+            if points:
+                result.append({"metric": series.metric, "values": points})
+        return {"resultType": "matrix", "result": result}
+
+
+class RangeQueryCache(metaclass=SingletonMetaclass):
+    """
+    Range query cache singleton.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[Tuple[str, int], _CachedRange] = OrderedDict()
+        # {(event loop, query, step) -> outcome of the fetch running for it}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def query(
+        self, query: str, start: int, end: int, step: int, fetch: RangeFetcher
+    ) -> Union[dict, Any]:
+        """
+        Answer a range query from the cache, calling fetch with the same
+        arguments for whatever part is missing. Anything fetch returns
+        that is not a matrix result is passed through uncached.
+
+        Concurrent calls for the same query and step wait for the fetch
+        already running. If it failed, they get its error or exception
+        rather than fetching again; if it succeeded, they are likely
+        answered from the cache.
+        """
+        start, end = align_range(start, end, step)
+        key = (query, step)
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, query, step)
+        while flight_key in self._in_flight:
+            # Raises the exception of a failed fetch
+            outcome = await asyncio.shield(self._in_flight[flight_key])
+            if outcome is not None and not _is_matrix(outcome):
+                return outcome
+
+        flight = loop.create_future()
+        self._in_flight[flight_key] = flight
+        try:
+            result = await self._query(key, start, end, fetch)
+        except asyncio.CancelledError:
+            # Nothing to share, one of the waiters fetches instead
+            flight.set_result(None)
+            raise
+        except Exception as error:
+            flight.set_exception(error)
+            # Retrieved here, so that a fetch nobody waited for is not logged
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._in_flight[flight_key]
+
+    async def _query(
+        self, key: Tuple[str, int], start: int, end: int, fetch: RangeFetcher
+    ) -> Union[dict, Any]:
+        query, step = key
+        self._evict()
+
+        entry = self._entries.get(key)
+        if (
+            entry is None
+            or start < entry.start
+            # The cached range ends before this one starts, nothing to extend
+            or entry.covered_end + step < start
+        ):
+            entry = _CachedRange(start, step)
+            fetch_start = start
+        elif end <= entry.covered_end:
+            self.hits += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry.result(start, end)
+        else:
+            fetch_start = entry.covered_end + step
+
+        self.misses += 1
+        data = await fetch(query, fetch_start, end, step)
+        if not _is_matrix(data):
+            return data
+
+        entry.merge(fetch_start, data)
+        final_until = int(time.time()) - FRESH_DATA_MARGIN_SECONDS
+        entry.covered_end = max(
+            entry.covered_end, min(end, final_until - final_until % step)
+        )
+        entry.trim()
+        entry.last_used = time.monotonic()
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        result = entry.result(start, end)
+
+        cached_points = self.cached_points()
+        while cached_points > MAX_CACHED_POINTS:
+            _, evicted = self._entries.popitem(last=False)
+            cached_points -= evicted.points
+        return result
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if entry.last_used < now - MAX_ENTRY_AGE_SECONDS
+            or entry.created < now - MAX_ENTRY_LIFETIME_SECONDS
+        ]:
+            del self._entries[key]
+
+    def cached_points(self) -> int:
+        return sum(entry.points for entry in self._entries.values())
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the singleton instance (test-isolation helper)."""
+        SingletonMetaclass._instances.pop(cls, None)
@@ -0,0 +1,145 @@
+"""
+Compact time series for monitoring responses.
+
+A week of one-minute points for a few dozen slices is hundreds of
+thousands of samples. Instead of an object per sample, series are kept
+as two parallel columns, optionally downsampled to a point budget, and
+sent as base64 of little-endian int64 timestamps and float64 values.
+"""
+
+import base64
+import sys
+from array import array
+from typing import List, Sequence, Tuple
+
+Columns = Tuple[List[int], List[float]]
+
+# LTTB always keeps the first and the last point, and needs a bucket between
+MIN_LTTB_POINTS = 3
+
+
+def columns_from_values(values: Sequence[Sequence]) -> Columns:
+    """
+    Split Prometheus [timestamp, "value"] pairs into columns.
+    """
+    return (
+        [int(timestamp) for timestamp, _ in values],
+        [float(value) for _, value in values],
+    )
+
+
+def downsample_lttb(timestamps: List[int], values: List[float], target: int) -> Columns:
+    """
+    Largest-Triangle-Three-Buckets. Keeps the first and the last point
+    and, from each bucket in between, the point which forms the largest
+    triangle with the previously kept point and the next bucket's average.
+    Peaks and dips survive, unlike with plain averaging.
+    """
+    if target < MIN_LTTB_POINTS:
+        raise ValueError(f"LTTB needs at least {MIN_LTTB_POINTS} points")
+    length = len(timestamps)
+    if target >= length:
+        return timestamps, values
+
+    kept_timestamps = [timestamps[0]]
+    kept_values = [values[0]]
+    bucket_size = (length - 2) / (target - 2)
+    previous = 0
+
+    for bucket in range(target - 2):
+        low = int(bucket * bucket_size) + 1
+        high = int((bucket + 1) * bucket_size) + 1
+
+        next_low = high
+        next_high = min(int((bucket + 2) * bucket_size) + 1, length)
+        next_count = next_high - next_low
+        average_x = sum(timestamps[next_low:next_high]) / next_count
+        average_y = sum(values[next_low:next_high]) / next_count
+
+        previous_x = timestamps[previous]
+        previous_y = values[previous]
+        chosen = low
+        largest_area = -1.0
+        for index in range(low, high):
+            area = abs(
+                (previous_x - average_x) * (values[index] - previous_y)
+                - (previous_x - timestamps[index]) * (average_y - previous_y)
+            )
+            if area > largest_area:
+                largest_area = area
+                chosen = index
+
+        kept_timestamps.append(timestamps[chosen])
+        kept_values.append(values[chosen])
+        previous = chosen
+
+    kept_timestamps.append(timestamps[-1])
+    kept_values.append(values[-1])
+    return kept_timestamps, kept_values
+
+
+def downsample_buckets(
+    timestamps: List[int], values: List[float], target: int, aggregate: str
+) -> Columns:
+    """
+    Split the series into target buckets of consecutive points and
+    replace each bucket with one point at the bucket's first timestamp.
+
+    Args:
+        aggregate: "min", "max" or "avg".
+    """
+    if target < 1:
+        raise ValueError("Downsampling needs at least one point")
+    length = len(timestamps)
+    if target >= length:
+        return timestamps, values
+
+    bucket_size = length / target
+    kept_timestamps: List[int] = []
+    kept_values: List[float] = []
+    for bucket in range(target):
+        low = int(bucket * bucket_size)
+        high = int((bucket + 1) * bucket_size)
+        chunk = values[low:high]
+        if aggregate == "min":
+            value = min(chunk)
+        elif aggregate == "max":
+            value = max(chunk)
+        elif aggregate == "avg":
+            value = sum(chunk) / len(chunk)
+        else:
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+        kept_timestamps.append(timestamps[low])
+        kept_values.append(value)
+    return kept_timestamps, kept_values
+
+
+def _pack(typecode: str, items: Sequence) -> str:
+    packed = array(typecode, items)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, encoded: str) -> list:
+    packed = array(typecode)
+    packed.frombytes(base64.b64decode(encoded))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def pack_int64(items: Sequence[int]) -> str:
+    return _pack("q", items)
+
+
+def pack_float64(items: Sequence[float]) -> str:
+    return _pack("d", items)
+
+
+def unpack_int64(encoded: str) -> List[int]:
+    return _unpack("q", encoded)
+
+
+def unpack_float64(encoded: str) -> List[float]:
+    return _unpack("d", encoded)
@@ -0,0 +1,84 @@
+"""
+Long-lived HTTP client for the local Prometheus.
+
+Monitoring dashboards ask for several metrics at once. A client per
+event loop keeps connections alive between queries, so only the first
+query pays for connection setup.
+"""
+
+import asyncio
+import weakref
+from typing import Optional
+
+import httpx
+
+from selfprivacy_api.utils.singleton_metaclass import SingletonMetaclass
+
+PROMETHEUS_URL = "http://localhost:9001"
+
+DEFAULT_TIMEOUT = httpx.Timeout(0.8)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=10,
+    max_keepalive_connections=10,
+    keepalive_expiry=60,
+)
+
+
+class PrometheusClient(metaclass=SingletonMetaclass):
+    """
+    Prometheus HTTP client singleton.
+    """
+
+    def __init__(self):
+        self.base_url = PROMETHEUS_URL
+        self.timeout = DEFAULT_TIMEOUT
+        self.limits = DEFAULT_LIMITS
+        # {event loop -> client}; entries die with the loop
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def configure(
+        self,
+        base_url: Optional[str] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        limits: Optional[httpx.Limits] = None,
+    ) -> None:
+        """
+        Change connection settings.
+        Only clients created afterwards use them.
+        """
+        if base_url is not None:
+            self.base_url = base_url
+        if timeout is not None:
+            self.timeout = timeout
+        if limits is not None:
+            self.limits = limits
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Get the running event loop's client. Do not close it.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Close the running event loop's client and its connections.
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the singleton instance (test-isolation helper)."""
+        SingletonMetaclass._instances.pop(cls, None)
@@ -2,43 +2,55 @@ import json
 import uuid
 
 from datetime import datetime
-from typing import Optional
+from typing import Iterable
 from enum import Enum
 
+from pydantic import BaseModel
 
-def store_model_as_hash(redis, redis_key, model):
-    model_dict = model.model_dump()
-    for key, value in model_dict.items():
-        if isinstance(value, uuid.UUID):
-            value = str(value)
-        if isinstance(value, datetime):
-            value = value.isoformat()
-        if isinstance(value, Enum):
-            value = value.value
-        if isinstance(value, dict):
-            value = json.dumps(value)
+
+def hash_value(value) -> str:
+    """Stringify a model field the way it is stored in a redis hash."""
+    if isinstance(value, uuid.UUID):
         value = str(value)
-        model_dict[key] = value
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    return str(value)
+
+
+def model_as_hash_mapping(model: BaseModel) -> dict[str, str]:
+    return {key: hash_value(value) for key, value in model.model_dump().items()}
+
+
+def changed_hash_fields(old: dict[str, str], new: dict[str, str]) -> dict[str, str]:
+    return {key: value for key, value in new.items() if old.get(key) != value}
 
-    redis.hset(redis_key, mapping=model_dict)
+
+def store_model_as_hash(redis, redis_key, model):
+    redis.hset(redis_key, mapping=model_as_hash_mapping(model))
+
+
+def store_models_as_hashes(redis, models: Iterable[tuple[str, BaseModel]]) -> None:
+    """Store (redis_key, model) pairs in one pipeline round trip."""
+    pipe = redis.pipeline(transaction=False)
+    for redis_key, model in models:
+        pipe.hset(redis_key, mapping=model_as_hash_mapping(model))
+    pipe.execute()
 
 
 def hash_as_model(redis, redis_key: str, model_class):
-    token_dict = _model_dict_from_hash(redis, redis_key)
-    if token_dict is not None:
-        return model_class(**token_dict)
-    return None
+    raw_dict = redis.hgetall(redis_key)
+    if not raw_dict:
+        return None
+    token_dict = dict(raw_dict)
+    _prepare_model_dict(token_dict)
+    return model_class(**token_dict)
 
 
 def _prepare_model_dict(d: dict):
     for key in d.keys():
         if d[key] == "None":
             d[key] = None
-
-
-def _model_dict_from_hash(redis, redis_key: str) -> Optional[dict]:
-    if redis.exists(redis_key):
-        token_dict = redis.hgetall(redis_key)
-        _prepare_model_dict(token_dict)
-        return token_dict
-    return None
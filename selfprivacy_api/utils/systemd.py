@@ -3,20 +3,25 @@
 import asyncio
 import subprocess
 import logging
-from typing import List
+import weakref
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from sdbus import (
     DbusInterfaceCommonAsync,
     dbus_method_async,
     dbus_property_async,
 )
-from sdbus.exceptions import SdBusUnmappedMessageError
+from sdbus.sd_bus_internals import SdBusMessage, SdBusSlot
 from selfprivacy_api.models.services import ServiceStatus
 from selfprivacy_api.utils import lazy_var
 from selfprivacy_api.utils.dbus import DbusConnection
+from selfprivacy_api.utils.singleton_metaclass import SingletonMetaclass
 
 logger = logging.getLogger(__name__)
 
+SYSTEMD_SERVICE = "org.freedesktop.systemd1"
+SYSTEMD_OBJECT_PATH = "/org/freedesktop/systemd1"
+
 
 class SystemdUnitInterface(
     DbusInterfaceCommonAsync,
@@ -36,6 +41,11 @@ class SystemdManagerInterface(
     async def reboot(self):
         raise NotImplementedError
 
+    @dbus_method_async(input_signature="", result_signature="")
+    async def subscribe(self):
+        """Ask systemd to send unit signals, which it skips if nobody asked."""
+        raise NotImplementedError
+
     @dbus_method_async(
         input_signature="s",
         result_signature="o",
@@ -46,6 +56,16 @@ class SystemdManagerInterface(
     ) -> str:
         raise NotImplementedError
 
+    @dbus_method_async(
+        input_signature="as",
+        result_signature="a(ssssssouso)",
+    )
+    async def list_units_by_names(
+        self,
+        names: List[str],
+    ) -> List[Tuple[str, str, str, str, str, str, str, int, str, str]]:
+        raise NotImplementedError
+
     @dbus_method_async(
         input_signature="ss",
         result_signature="o",
@@ -82,23 +102,360 @@ class SystemdManagerInterface(
 
 systemd_proxy = lazy_var(
     lambda: SystemdManagerInterface.new_proxy(
-        service_name="org.freedesktop.systemd1",
-        object_path="/org/freedesktop/systemd1",
+        service_name=SYSTEMD_SERVICE,
+        object_path=SYSTEMD_OBJECT_PATH,
         bus=DbusConnection.get_instance().bus,
     )
 )
 
 
-async def get_unit_proxy(unit: str) -> SystemdUnitInterface:
-    # We use LoadUnit as GetUnit might return stale information.
-    object_path = await systemd_proxy().load_unit(unit)
+def get_unit_proxy_by_path(object_path: str) -> SystemdUnitInterface:
     return SystemdUnitInterface.new_proxy(
-        service_name="org.freedesktop.systemd1",
+        service_name=SYSTEMD_SERVICE,
         object_path=object_path,
         bus=DbusConnection.get_instance().bus,
     )
 
 
+async def get_unit_proxy(unit: str) -> SystemdUnitInterface:
+    # We use LoadUnit as GetUnit might return stale information.
+    object_path = await systemd_proxy().load_unit(unit)
+    return get_unit_proxy_by_path(object_path)
+
+
+def unit_object_path(unit: str) -> str:
+    """
+    The object path systemd gives unit, escaped as sd_bus_path_encode
+    does: every byte but ASCII letters, and digits past the first
+    character, becomes _ and two hex digits.
+    """
+    if not unit:
+        return SYSTEMD_OBJECT_PATH + "/unit/_"
+    escaped = "".join(
+        (
+            char
+            if char.isascii() and (char.isalpha() or (char.isdigit() and index > 0))
+            else "".join(f"_{byte:02x}" for byte in char.encode())
+        )
+        for index, char in enumerate(unit)
+    )
+    return SYSTEMD_OBJECT_PATH + "/unit/" + escaped
+
+
+class SystemdUnitInfo(NamedTuple):
+    """One entry of ListUnits and ListUnitsByNames."""
+
+    name: str
+    description: str
+    load_state: str
+    active_state: str
+    sub_state: str
+    followed: str
+    object_path: str
+    job_id: int
+    job_type: str
+    job_path: str
+
+
+async def list_units(units: List[str]) -> List[SystemdUnitInfo]:
+    """
+    Load, active and sub state of every unit in a single D-Bus call.
+    Units are loaded if needed. Entries are named by the unit id, so
+    an alias comes back under the name of the unit it points to.
+    """
+    listed = await systemd_proxy().list_units_by_names(units)
+    return [SystemdUnitInfo(*entry) for entry in listed]
+
+
+class _LoopUnitStates:
+    """Unit states kept current by signal matches of one event loop."""
+
+    def __init__(self):
+        self.subscribed: Optional[asyncio.Task] = None
+        self.slots: List[SdBusSlot] = []
+        # {object path -> task adding its PropertiesChanged match}
+        self.watched: Dict[str, asyncio.Task] = {}
+        # {unit -> ActiveState}
+        self.states: Dict[str, str] = {}
+        # {unit -> number of signals seen}, so that a live read finishing
+        # after a signal does not overwrite the newer state
+        self.versions: Dict[str, int] = {}
+
+    def forget(self, unit: str) -> None:
+        self.states.pop(unit, None)
+        self.versions[unit] = self.versions.get(unit, 0) + 1
+
+    def close(self) -> None:
+        for slot in self.slots:
+            slot.close()
+        self.slots.clear()
+        self.watched.clear()
+        self.subscribed = None
+
+
+class UnitStateCache(metaclass=SingletonMetaclass):
+    """
+    ActiveState of systemd units, answered from memory.
+
+    A unit is read over D-Bus the first time it is asked for. Before
+    that, PropertiesChanged signals of its object path are subscribed
+    to, and from then on they keep its state current. Signals of units
+    nobody asked for are never delivered. Object paths of units are
+    cached as well, so a miss costs one property read instead of
+    LoadUnit and a read.
+
+    Matches belong to the event loop which added them. Huey jobs run
+    each in a loop of their own, so matches of closed loops are removed
+    whenever states are looked up.
+    """
+
+    def __init__(self):
+        # {unit -> object path} and back
+        self._object_paths: Dict[str, str] = {}
+        self._units: Dict[str, str] = {}
+        # {event loop -> states}; tasks in the states keep their loop alive,
+        # so closed loops are dropped by _drop_closed_loops instead
+        self._loop_states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, _LoopUnitStates
+        ] = weakref.WeakKeyDictionary()
+        # Subscribe is per bus connection, not per loop
+        self._manager_subscribed = False
+
+    async def _subscribe(self, states: _LoopUnitStates) -> None:
+        bus = DbusConnection.get_instance().bus
+        states.slots.append(
+            await bus.match_signal_async(
+                SYSTEMD_SERVICE,
+                SYSTEMD_OBJECT_PATH,
+                "org.freedesktop.systemd1.Manager",
+                "UnitRemoved",
+                lambda message: self._on_unit_removed(states, message),
+            )
+        )
+        states.slots.append(
+            await bus.match_signal_async(
+                SYSTEMD_SERVICE,
+                SYSTEMD_OBJECT_PATH,
+                "org.freedesktop.systemd1.Manager",
+                "Reloading",
+                lambda message: self._on_reloading(states),
+            )
+        )
+        if not self._manager_subscribed:
+            await systemd_proxy().subscribe()
+            self._manager_subscribed = True
+
+    async def _add_watch(self, states: _LoopUnitStates, object_path: str) -> None:
+        bus = DbusConnection.get_instance().bus
+        states.slots.append(
+            await bus.match_signal_async(
+                SYSTEMD_SERVICE,
+                object_path,
+                "org.freedesktop.DBus.Properties",
+                "PropertiesChanged",
+                lambda message: self._on_properties_changed(states, message),
+            )
+        )
+
+    async def _watch(self, states: _LoopUnitStates, object_paths: List[str]) -> None:
+        """
+        Follow PropertiesChanged of object paths. Returns once the
+        matches are in place, so reads made after it miss no change.
+        """
+        loop = asyncio.get_running_loop()
+        for object_path in object_paths:
+            if object_path not in states.watched:
+                states.watched[object_path] = loop.create_task(
+                    self._add_watch(states, object_path)
+                )
+        try:
+            await asyncio.gather(
+                *[asyncio.shield(states.watched[path]) for path in object_paths]
+            )
+        except Exception:
+            # Let the next read try again
+            for object_path in object_paths:
+                task = states.watched.get(object_path)
+                if task is not None and task.done():
+                    if task.cancelled() or task.exception() is not None:
+                        del states.watched[object_path]
+            raise
+
+    def _on_properties_changed(
+        self, states: _LoopUnitStates, message: SdBusMessage
+    ) -> None:
+        unit = self._units.get(message.path or "")
+        if unit is None:
+            return
+        interface, changed, invalidated = message.get_contents()
+        if interface != "org.freedesktop.systemd1.Unit":
+            return
+        if "ActiveState" in changed:
+            states.forget(unit)
+            states.states[unit] = changed["ActiveState"][1]
+        elif "ActiveState" in invalidated:
+            states.forget(unit)
+
+    def _on_unit_removed(self, states: _LoopUnitStates, message: SdBusMessage) -> None:
+        unit, object_path = message.get_contents()
+        self._units.pop(object_path, None)
+        self._object_paths.pop(unit, None)
+        states.forget(unit)
+
+    def _on_reloading(self, states: _LoopUnitStates) -> None:
+        # Units may be replaced wholesale by a daemon reload
+        for unit in list(states.states):
+            states.forget(unit)
+
+    async def _states_for_running_loop(self) -> Optional[_LoopUnitStates]:
+        """States of this event loop, None if signals cannot be received."""
+        self._drop_closed_loops()
+        loop = asyncio.get_running_loop()
+        states = self._loop_states.get(loop)
+        if states is None:
+            states = _LoopUnitStates()
+            states.subscribed = loop.create_task(self._subscribe(states))
+            self._loop_states[loop] = states
+        try:
+            await asyncio.shield(states.subscribed)
+        except Exception as error:
+            logger.warning(f"Cannot follow systemd unit states: {error}")
+            states.close()
+            if self._loop_states.get(loop) is states:
+                del self._loop_states[loop]
+            return None
+        return states
+
+    def _drop_closed_loops(self) -> None:
+        """Remove the matches of loops which are gone, for the bus to keep."""
+        for loop, states in list(self._loop_states.items()):
+            if loop.is_closed():
+                states.close()
+                del self._loop_states[loop]
+
+    def _remember_object_path(self, unit: str, object_path: str) -> None:
+        self._object_paths[unit] = object_path
+        self._units[object_path] = unit
+
+    async def _object_path(self, unit: str) -> str:
+        object_path = self._object_paths.get(unit)
+        if object_path is None:
+            # We use LoadUnit as GetUnit might return stale information.
+            object_path = await systemd_proxy().load_unit(unit)
+            self._remember_object_path(unit, object_path)
+        return object_path
+
+    async def _read_path(
+        self, unit: str, object_path: str, states: Optional[_LoopUnitStates]
+    ) -> str:
+        if states is not None:
+            try:
+                await self._watch(states, [object_path])
+            except Exception as error:
+                logger.warning(f"Cannot follow systemd unit {unit}: {error}")
+                # Read it live, but keep the result out of the cache
+                states.forget(unit)
+        return await get_unit_proxy_by_path(object_path).active_state
+
+    async def _read_active_state(
+        self, unit: str, states: Optional[_LoopUnitStates] = None
+    ) -> str:
+        cached_path = unit in self._object_paths
+        object_path = await self._object_path(unit)
+        try:
+            return await self._read_path(unit, object_path, states)
+        except Exception:
+            if not cached_path:
+                raise
+            # The unit may have been unloaded since
+            self._object_paths.pop(unit, None)
+            self._units.pop(object_path, None)
+            return await self._read_path(unit, await self._object_path(unit), states)
+
+    async def get_active_state(self, unit: str) -> str:
+        states = await self._states_for_running_loop()
+        if states is None:
+            return await self._read_active_state(unit)
+
+        if unit in states.states:
+            return states.states[unit]
+        version = states.versions.get(unit, 0)
+        active_state = await self._read_active_state(unit, states)
+        if states.versions.get(unit, 0) == version:
+            states.states[unit] = active_state
+        return active_state
+
+    async def _list_active_states(
+        self, units: List[str], states: Optional[_LoopUnitStates]
+    ) -> Dict[str, str]:
+        versions = {}
+        if states is not None:
+            versions = {unit: states.versions.get(unit, 0) for unit in units}
+            # Listed units come back under their own path, known up front
+            expected_paths = {
+                unit: self._object_paths.get(unit) or unit_object_path(unit)
+                for unit in units
+            }
+            for unit, object_path in expected_paths.items():
+                self._units.setdefault(object_path, unit)
+            try:
+                await self._watch(states, list(expected_paths.values()))
+            except Exception as error:
+                logger.warning(f"Cannot follow systemd units: {error}")
+                states = None
+        try:
+            listed = {unit.name: unit for unit in await list_units(units)}
+        except Exception as error:
+            logger.warning(f"Cannot list systemd units at once: {error}")
+            listed = {}
+
+        active_states = {}
+        for unit in units:
+            if unit not in listed:
+                continue
+            info = listed[unit]
+            self._remember_object_path(unit, info.object_path)
+            if (
+                states is not None
+                and info.object_path in states.watched
+                and states.versions.get(unit, 0) == versions[unit]
+            ):
+                states.states[unit] = info.active_state
+            active_states[unit] = info.active_state
+
+        # Aliases, and everything if listing failed, are read one by one
+        unlisted = [unit for unit in units if unit not in active_states]
+        read = await asyncio.gather(*[self.get_active_state(unit) for unit in unlisted])
+        active_states.update(zip(unlisted, read))
+        return active_states
+
+    async def get_active_states(self, units: List[str]) -> Dict[str, str]:
+        """
+        ActiveState of every unit. Units missing from the cache are
+        fetched together with one ListUnitsByNames call.
+        Raises the first error of any unit.
+        """
+        units = list(dict.fromkeys(units))
+        states = await self._states_for_running_loop()
+        active_states = {}
+        if states is not None:
+            active_states = {
+                unit: states.states[unit] for unit in units if unit in states.states
+            }
+        missing = [unit for unit in units if unit not in active_states]
+        if missing:
+            active_states.update(await self._list_active_states(missing, states))
+        return {unit: active_states[unit] for unit in units}
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the singleton instance (test-isolation helper)."""
+        instance = SingletonMetaclass._instances.pop(cls, None)
+        if instance is not None:
+            for states in list(instance._loop_states.values()):
+                states.close()
+
+
 async def listen_for_unit_state_changes(units: List[str]):
     iterators = []
     for unit in units:
@@ -166,8 +523,7 @@ async def get_service_status(unit: str) -> ServiceStatus:
     Get ActiveState from the output.
     """
     try:
-        unit_proxy = await get_unit_proxy(unit)
-        active_state: str = await unit_proxy.active_state
+        active_state = await UnitStateCache().get_active_state(unit)
         return ServiceStatus.from_systemd_status(active_state)
     except Exception:
         logging.exception(f"Failed to get active state of unit {unit}")
@@ -187,13 +543,17 @@ async def get_service_status_from_several_units(services: list[str]) -> ServiceS
     - INACTIVE
     - ACTIVE
     """
-    service_statuses = []
-    for service in services:
-        try:
-            service_statuses.append(await get_service_status(service))
-        except SdBusUnmappedMessageError:
-            # If we failed to get status of a service via DBus, likely reason is that it doesn't exist.
-            return ServiceStatus.OFF
+    try:
+        active_states = await UnitStateCache().get_active_states(services)
+        service_statuses = [
+            ServiceStatus.from_systemd_status(active_states[service])
+            for service in services
+        ]
+    except Exception:
+        # A unit which cannot be read, likely because it does not exist, is OFF
+        service_statuses = await asyncio.gather(
+            *[get_service_status(service) for service in services]
+        )
     if ServiceStatus.OFF in service_statuses:
         return ServiceStatus.OFF
     if ServiceStatus.FAILED in service_statuses:
@@ -211,6 +571,17 @@ async def get_service_status_from_several_units(services: list[str]) -> ServiceS
     return ServiceStatus.OFF
 
 
+async def preload_unit_states(units: List[str]) -> None:
+    """
+    Fetch the states of many units in one go, so that statuses asked
+    for afterwards are answered from memory.
+    """
+    try:
+        await UnitStateCache().get_active_states(units)
+    except Exception:
+        logger.exception("Failed to preload states of systemd units")
+
+
 def get_last_log_lines(service: str, lines_count: int) -> List[str]:
     if lines_count < 1:
         raise ValueError("lines_count must be greater than 0")
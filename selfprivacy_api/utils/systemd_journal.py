@@ -1,77 +1,328 @@
+import re
+import time
 import typing
+import itertools
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime
+
 from systemd import journal
 from opentelemetry import trace
 
 tracer = trace.get_tracer(__name__)
 
 
-@tracer.start_as_current_span("get_events_from_journal")
-def get_events_from_journal(
-    j: journal.Reader, limit: int, next: typing.Callable[[journal.Reader], typing.Dict]
-):
-    events = []
-    i = 0
-    while i < limit:
-        entry = next(j)
-        if entry is None or entry == dict():
-            break
-        if entry["MESSAGE"] != "":
-            events.append(entry)
-            i += 1
+class JournalEntry:
+    """
+    The fields of a journal entry the API exports, and nothing else.
+    """
 
-    return events
+    __slots__ = (
+        "cursor",
+        "realtime",
+        "message",
+        "priority",
+        "systemd_unit",
+        "systemd_slice",
+    )
 
+    def __init__(
+        self,
+        cursor: str,
+        # Microseconds since the epoch
+        realtime: int,
+        message: str,
+        priority: typing.Optional[int] = None,
+        systemd_unit: typing.Optional[str] = None,
+        systemd_slice: typing.Optional[str] = None,
+    ):
+        self.cursor = cursor
+        self.realtime = realtime
+        self.message = message
+        self.priority = priority
+        self.systemd_unit = systemd_unit
+        self.systemd_slice = systemd_slice
 
-@tracer.start_as_current_span("get_paginated_logs")
-def get_paginated_logs(
-    limit: int = 20,
-    # All entries returned will be lesser than this cursor. Sets upper bound on results.
-    up_cursor: str | None = None,
-    # All entries returned will be greater than this cursor. Sets lower bound on results.
-    down_cursor: str | None = None,
-    # All entries will be from a specific systemd slice
-    filterBySlice: str | None = None,
-    # All entries will be from a specific systemd unit
-    filterByUnit: str | None = None,
-):
+    @property
+    def timestamp(self) -> datetime:
+        # Same conversion as journal.Reader does for __REALTIME_TIMESTAMP
+        return datetime.fromtimestamp(self.realtime / 1_000_000)
+
+
+def _get_field(j: journal.Reader, name: str) -> typing.Optional[str]:
+    try:
+        value = j._get(name)
+    except KeyError:
+        return None
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def read_entry(j: journal.Reader) -> JournalEntry:
+    """
+    Read the entry the reader is positioned at.
+    Only the exported fields are fetched, unlike journal.Reader.get_next,
+    which decodes every field of the entry into a dict.
+    """
+    priority = _get_field(j, "PRIORITY")
+    return JournalEntry(
+        cursor=j._get_cursor(),
+        realtime=j._get_realtime(),
+        message=_get_field(j, "MESSAGE") or "",
+        priority=int(priority) if priority is not None else None,
+        systemd_unit=_get_field(j, "_SYSTEMD_UNIT"),
+        systemd_slice=_get_field(j, "_SYSTEMD_SLICE"),
+    )
+
+
+def read_entries(
+    j: journal.Reader, reverse: bool = False
+) -> typing.Iterator[JournalEntry]:
+    """Read entries from the reader's current position until the end."""
+    step = j._previous if reverse else j._next
+    while step():
+        yield read_entry(j)
+
+
+@dataclass
+class LogFilter:
+    """
+    Which journal entries a log query returns.
+
+    Units, slices and priority are turned into journal matches, so
+    journald skips non-matching entries itself. Several units or slices
+    match any of them. Message patterns are checked on the entries that
+    are left.
+    """
+
+    units: typing.List[str] = field(default_factory=list)
+    slices: typing.List[str] = field(default_factory=list)
+    # Syslog priority: 0 is emerg, 7 is debug. Entries at most this verbose are returned.
+    max_priority: typing.Optional[int] = None
+    since: typing.Optional[datetime] = None
+    until: typing.Optional[datetime] = None
+    message_contains: typing.Optional[str] = None
+    message_regex: typing.Optional[re.Pattern] = None
+
+    def __post_init__(self):
+        if self.max_priority is not None and not 0 <= self.max_priority <= 7:
+            raise ValueError(
+                "Max priority must be a syslog priority from 0 (emerg) to 7 (debug)."
+            )
+
+    def matches_message(self, message: str) -> bool:
+        if self.message_contains is not None and self.message_contains not in message:
+            return False
+        if (
+            self.message_regex is not None
+            and self.message_regex.search(message) is None
+        ):
+            return False
+        return True
+
+    def matches_entry(self, entry: JournalEntry) -> bool:
+        """
+        Check an entry read without this filter's journal matches,
+        like a tailed one. Time bounds are not checked.
+        """
+        if self.units and entry.systemd_unit not in self.units:
+            return False
+        if self.slices and entry.systemd_slice not in self.slices:
+            return False
+        if self.max_priority is not None:
+            if entry.priority is None or entry.priority > self.max_priority:
+                return False
+        return self.matches_message(entry.message)
+
+
+@dataclass
+class ScanBudget:
+    """
+    How much of the journal one query may read, counting entries that
+    are filtered out too. When the budget runs out, reading stops and
+    exhausted is set. resume_cursor is then the last entry read, a query
+    started from it continues where this one stopped.
+
+    The time limit is checked between entries, so a single slow regex
+    match is not interrupted.
+    """
+
+    max_entries: typing.Optional[int] = None
+    max_seconds: typing.Optional[float] = None
+    scanned: int = 0
+    exhausted: bool = False
+    resume_cursor: typing.Optional[str] = None
+    _deadline: typing.Optional[float] = field(default=None, repr=False)
+
+    def start(self) -> None:
+        if self.max_seconds is not None and self._deadline is None:
+            self._deadline = time.monotonic() + self.max_seconds
+
+    def spend(self) -> bool:
+        """Take one entry from the budget, False if none is left."""
+        if self.max_entries is not None and self.scanned >= self.max_entries:
+            self.exhausted = True
+        elif self._deadline is not None and time.monotonic() >= self._deadline:
+            self.exhausted = True
+        else:
+            self.scanned += 1
+        return not self.exhausted
+
+
+def open_journal(log_filter: LogFilter) -> journal.Reader:
+    """
+    Open a journal reader with the filter's matches applied.
+    The caller must close it.
+    """
     j = journal.Reader()
+    for unit in log_filter.units:
+        j.add_match("_SYSTEMD_UNIT=" + unit)
+    for slice_name in log_filter.slices:
+        j.add_match("_SYSTEMD_SLICE=" + slice_name)
+    if log_filter.max_priority is not None:
+        for priority in range(0, log_filter.max_priority + 1):
+            j.add_match(f"PRIORITY={priority}")
+    return j
 
-    if filterBySlice:
-        j.add_match("_SYSTEMD_SLICE=" + filterBySlice)
-    if filterByUnit:
-        j.add_match("_SYSTEMD_UNIT=" + filterByUnit)
 
-    if up_cursor is None and down_cursor is None:
-        j.seek_tail()
+def _cursor_realtime(cursor: str) -> typing.Optional[int]:
+    """Realtime timestamp in microseconds stored in a journal cursor."""
+    for part in cursor.split(";"):
+        if part.startswith("t="):
+            try:
+                return int(part[2:], 16)
+            except ValueError:
+                return None
+    return None
 
-        events = get_events_from_journal(j, limit, lambda j: j.get_previous())
-        events.reverse()
 
-        j.close()
+def iter_logs(
+    log_filter: LogFilter,
+    # Only entries after this cursor are returned.
+    after_cursor: str | None = None,
+    # Only entries before this cursor are returned.
+    before_cursor: str | None = None,
+    reverse: bool = False,
+    budget: typing.Optional[ScanBudget] = None,
+) -> typing.Iterator[JournalEntry]:
+    """
+    Lazily yield journal entries matching the filter, oldest first
+    (newest first if reverse is set). Entries are read from the journal
+    as they are consumed, so long ranges can be streamed without
+    loading them all. The reader is closed when the iterator is
+    exhausted or closed. With a budget, reading stops once it runs out.
+    """
+    since = int(log_filter.since.timestamp() * 1_000_000) if log_filter.since else None
+    until = int(log_filter.until.timestamp() * 1_000_000) if log_filter.until else None
 
-        return events
-    elif up_cursor is None and down_cursor is not None:
-        j.seek_cursor(down_cursor)
-        j.get_previous()  # pagination is exclusive
+    # The cursor we start from is excluded, the one we stop at too.
+    start_cursor, stop_cursor = (
+        (before_cursor, after_cursor) if reverse else (after_cursor, before_cursor)
+    )
+    stop_realtime = _cursor_realtime(stop_cursor) if stop_cursor else None
 
-        events = get_events_from_journal(j, limit, lambda j: j.get_previous())
-        events.reverse()
+    j = open_journal(log_filter)
+    try:
+        if start_cursor is not None:
+            j.seek_cursor(start_cursor)
+        elif reverse and log_filter.until is not None:
+            j.seek_realtime(log_filter.until)
+        elif not reverse and log_filter.since is not None:
+            j.seek_realtime(log_filter.since)
+        elif reverse:
+            j.seek_tail()
+        else:
+            j.seek_head()
+
+        if budget is not None:
+            budget.start()
+        for entry in read_entries(j, reverse):
+            if entry.cursor == start_cursor:
+                continue
+            if budget is not None:
+                if not budget.spend():
+                    return
+                budget.resume_cursor = entry.cursor
+            if entry.cursor == stop_cursor:
+                return
+
+            realtime = entry.realtime
+            if reverse:
+                if since is not None and realtime < since:
+                    return
+                if stop_realtime is not None and realtime < stop_realtime:
+                    return
+                if until is not None and realtime >= until:
+                    continue
+            else:
+                if until is not None and realtime >= until:
+                    return
+                if stop_realtime is not None and realtime > stop_realtime:
+                    return
+                if since is not None and realtime < since:
+                    continue
 
+            if entry.message == "" or not log_filter.matches_message(entry.message):
+                continue
+            yield entry
+    finally:
         j.close()
 
-        return events
-    elif up_cursor is not None and down_cursor is None:
-        j.seek_cursor(up_cursor)
-        j.get_next()  # pagination is exclusive
 
-        events = get_events_from_journal(j, limit, lambda j: j.get_next())
+@tracer.start_as_current_span("query_logs")
+def query_logs(
+    log_filter: LogFilter,
+    limit: int = 20,
+    up_cursor: str | None = None,
+    down_cursor: str | None = None,
+    budget: typing.Optional[ScanBudget] = None,
+) -> typing.List[JournalEntry]:
+    """
+    Get a page of up to limit entries in chronological order.
 
-        j.close()
+    With no cursors, the newest entries are returned. With only
+    down_cursor, the entries right before it. With up_cursor, the
+    entries right after it, and with both cursors, the entries right
+    after up_cursor that are also before down_cursor.
 
-        return events
+    If the budget runs out, the page may be short. To continue, query
+    again with budget.resume_cursor as down_cursor if there was no
+    up_cursor, or as up_cursor otherwise.
+    """
+    if up_cursor is None:
+        entries = iter_logs(
+            log_filter, before_cursor=down_cursor, reverse=True, budget=budget
+        )
     else:
-        j.close()
-
-        raise NotImplementedError(
-            "Pagination by both up_cursor and down_cursor is not implemented"
+        entries = iter_logs(
+            log_filter,
+            after_cursor=up_cursor,
+            before_cursor=down_cursor,
+            budget=budget,
         )
+
+    with closing(entries):
+        events = list(itertools.islice(entries, limit))
+    if up_cursor is None:
+        events.reverse()
+    return events
+
+
+@tracer.start_as_current_span("get_paginated_logs")
+def get_paginated_logs(
+    limit: int = 20,
+    # All entries returned will be lesser than this cursor. Sets upper bound on results.
+    up_cursor: str | None = None,
+    # All entries returned will be greater than this cursor. Sets lower bound on results.
+    down_cursor: str | None = None,
+    # All entries will be from a specific systemd slice
+    filterBySlice: str | None = None,
+    # All entries will be from a specific systemd unit
+    filterByUnit: str | None = None,
+):
+    log_filter = LogFilter(
+        units=[filterByUnit] if filterByUnit else [],
+        slices=[filterBySlice] if filterBySlice else [],
+    )
+    return query_logs(log_filter, limit, up_cursor, down_cursor)
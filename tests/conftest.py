@@ -27,7 +27,13 @@ from selfprivacy_api.services import Service, ServiceManager, ServiceStatus
 from selfprivacy_api.services.test_service import DummyService
 from selfprivacy_api.utils.huey import huey
 from selfprivacy_api.utils.observable import Observable
+from selfprivacy_api.utils.journal_tail import JournalTail
+from selfprivacy_api.utils.keyspace_notifications import KeyspaceNotifications
+from selfprivacy_api.utils.monitoring_cache import RangeQueryCache
+from selfprivacy_api.utils.prometheus_client import PrometheusClient
 from selfprivacy_api.utils.redis_pool import RedisPool
+from selfprivacy_api.utils.systemd import UnitStateCache
+from tests.fake_prometheus import FakePrometheus
 
 API_REBUILD_SYSTEM_UNIT = "sp-nixos-rebuild.service"
 API_UPGRADE_SYSTEM_UNIT = "sp-nixos-upgrade.service"
@@ -70,13 +76,45 @@ def pytest_generate_tests(metafunc):
     os.environ["TEST_MODE"] = "true"
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="run benchmarks (tests marked with @pytest.mark.benchmark)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: slow performance measurement")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="needs --benchmark to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 @pytest.fixture(autouse=True)
 def isolated_redis_pool_singleton():
     """Each test builds its own RedisPool so singleton state (pools,
     per-loop caches, patched connection config) never leaks across tests."""
     RedisPool.reset()
+    KeyspaceNotifications.reset()
+    JournalTail.reset()
+    PrometheusClient.reset()
+    RangeQueryCache.reset()
+    UnitStateCache.reset()
     yield
     RedisPool.reset()
+    KeyspaceNotifications.reset()
+    JournalTail.reset()
+    PrometheusClient.reset()
+    RangeQueryCache.reset()
+    UnitStateCache.reset()
 
 
 def global_data_dir():
@@ -491,6 +529,49 @@ def kanidm_api(mocker):
     return recorder
 
 
+@pytest.fixture
+def prometheus_api(mocker):
+    """
+    Reroute httpx.AsyncClient, as looked up by the Prometheus client
+    module, through an httpx.MockTransport backed by a recording handler.
+    """
+    recorder = HttpxApiRecorder()
+    transport = httpx.MockTransport(recorder)
+    real_async_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_async_client(transport=transport, **kwargs)
+
+    mocker.patch(
+        "selfprivacy_api.utils.prometheus_client.httpx.AsyncClient",
+        new=client_factory,
+    )
+    return recorder
+
+
+@pytest_asyncio.fixture
+async def fake_prometheus() -> AsyncGenerator[FakePrometheus, None]:
+    """
+    Serve synthetic Prometheus responses on a local port and point the
+    Prometheus client at it.
+    """
+    server = FakePrometheus()
+    PrometheusClient().configure(base_url=await server.start())
+    yield server
+    await PrometheusClient().aclose()
+    await server.stop()
+
+
+@pytest.fixture(autouse=True)
+def size_tree_dir(mocker, tmp_path_factory):
+    """Keep saved storage usage trees out of the system state directory."""
+    directory = tmp_path_factory.mktemp("size-trees")
+    mocker.patch(
+        "selfprivacy_api.services.generic_size_counter.SIZE_TREE_DIR", str(directory)
+    )
+    return directory
+
+
 @pytest.fixture
 def mock_kanidm_domain(mocker):
     """Pin get_domain() as looked up by the kanidm user repository."""
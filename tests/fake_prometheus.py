@@ -0,0 +1,122 @@
+"""
+In-process stand-in for the Prometheus HTTP API.
+
+Serves synthetic /api/v1/query and /api/v1/query_range responses over
+real TCP with keep-alive, so the pooled client, JSON decoding and the
+resolvers are exercised exactly as against a real server.
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakePrometheus:
+    """
+    Every query returns the same number of series, each labelled so that
+    all monitoring resolvers find the label they group by.
+
+    Args:
+        series: Series per response.
+        latency: Seconds to wait before answering each request.
+    """
+
+    def __init__(self, series: int = 1, latency: float = 0.0):
+        self.series = series
+        self.latency = latency
+        self.requests: list[tuple[str, dict]] = []
+        self.url = ""
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _labels(self, index: int) -> dict:
+        return {
+            "id": f"/service{index}.slice",
+            "device": f"sd{index}",
+            "direction": "receive" if index % 2 == 0 else "transmit",
+            "instance": "localhost:9100",
+        }
+
+    def _range_data(self, params: dict) -> dict:
+        start = int(float(params["start"][0]))
+        end = int(float(params["end"][0]))
+        step = int(float(params["step"][0]))
+        timestamps = range(start, end + 1, step)
+        return {
+            "resultType": "matrix",
+            "result": [
+                {
+                    "metric": self._labels(index),
+                    "values": [
+                        [timestamp, str((timestamp // step + index) % 100)]
+                        for timestamp in timestamps
+                    ],
+                }
+                for index in range(self.series)
+            ],
+        }
+
+    def _instant_data(self) -> dict:
+        now = time.time()
+        return {
+            "resultType": "vector",
+            "result": [
+                {"metric": self._labels(index), "value": [now, str(index)]}
+                for index in range(self.series)
+            ],
+        }
+
+    async def _respond(self, target: str) -> tuple[int, bytes]:
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        self.requests.append((url.path, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if url.path == "/api/v1/query_range":
+            data = self._range_data(params)
+        elif url.path == "/api/v1/query":
+            data = self._instant_data()
+        else:
+            return 404, b"404 page not found"
+        return 200, json.dumps({"status": "success", "data": data}).encode()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                _, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                status, body = await self._respond(target)
+                reason = "OK" if status == 200 else "Not Found"
+                head = (
+                    f"HTTP/1.1 {status} {reason}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "\r\n"
+                )
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
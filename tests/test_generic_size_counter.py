@@ -0,0 +1,409 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+
+from selfprivacy_api.services import generic_size_counter, tasks
+from selfprivacy_api.services.generic_size_counter import (
+    ROTATIONAL_SCAN_OPTIONS,
+    SOLID_STATE_SCAN_OPTIONS,
+    ScanOptions,
+    SizeTreeStats,
+    StorageUsageMeasurement,
+    get_storage_usage_blocking,
+    get_storage_usage_measured_at,
+    get_storage_usage_measurement,
+    get_folders_storage_usage,
+    get_scan_options,
+    load_size_tree,
+    measure_folders_storage_usage,
+    measure_storage_usage,
+    refresh_size_tree,
+    refresh_storage_usage_if_older,
+    save_size_tree,
+    size_tree_path,
+)
+from selfprivacy_api.utils.redis_pool import RedisPool
+
+
+def write(path, size: int):
+    path.write_bytes(b"x" * size)
+
+
+def settle(*paths):
+    """Pretend the directories were last changed a while ago."""
+    old = time.time_ns() - 60 * 1_000_000_000
+    for path in paths:
+        os.utime(path, ns=(old, old))
+
+
+def make_tree(root):
+    (root / "a" / "deep").mkdir(parents=True)
+    (root / "b").mkdir()
+    write(root / "top", 10)
+    write(root / "a" / "one", 100)
+    write(root / "a" / "deep" / "two", 1000)
+    write(root / "b" / "three", 10000)
+    os.symlink(root / "b" / "three", root / "a" / "link")
+    settle(root, root / "a", root / "a" / "deep", root / "b")
+
+
+def refresh(root, previous=None, options=ScanOptions()):
+    stats = SizeTreeStats()
+    tree = refresh_size_tree(
+        str(root), os.lstat(root).st_mtime_ns, previous, stats=stats, options=options
+    )
+    return tree, stats
+
+
+def test_counts_files_without_following_symlinks(tmp_path):
+    make_tree(tmp_path)
+    link_size = os.lstat(tmp_path / "a" / "link").st_size
+
+    assert get_storage_usage_blocking(str(tmp_path)) == 11110 + link_size
+
+
+def test_missing_path_is_empty(tmp_path):
+    assert get_storage_usage_blocking(str(tmp_path / "missing")) == 0
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path):
+    make_tree(tmp_path)
+    tree, stats = refresh(tmp_path)
+    assert stats.listed == 4
+
+    again, stats = refresh(tmp_path, tree)
+
+    assert stats.listed == 0
+    assert stats.reused == 4
+    assert again.total() == tree.total()
+
+
+def test_only_changed_directory_is_listed(tmp_path):
+    make_tree(tmp_path)
+    tree, _ = refresh(tmp_path)
+
+    write(tmp_path / "a" / "deep" / "new", 5)
+    settle(tmp_path / "a" / "deep")
+    updated, stats = refresh(tmp_path, tree)
+
+    assert stats.listed == 1
+    assert updated.total() == tree.total() + 5
+
+
+def test_files_growing_in_place_are_counted(tmp_path):
+    make_tree(tmp_path)
+    tree, _ = refresh(tmp_path)
+
+    with open(tmp_path / "a" / "deep" / "two", "ab") as file:
+        file.write(b"x" * 500)
+    updated, stats = refresh(tmp_path, tree)
+
+    assert stats.listed == 0
+    assert updated.total() == tree.total() + 500
+
+
+def test_removed_subdirectory_is_dropped(tmp_path):
+    make_tree(tmp_path)
+    tree, _ = refresh(tmp_path)
+
+    os.remove(tmp_path / "b" / "three")
+    os.rmdir(tmp_path / "b")
+    settle(tmp_path)
+    updated, stats = refresh(tmp_path, tree)
+
+    assert stats.listed == 1
+    assert "b" not in updated.children
+    assert updated.total() == tree.total() - 10000
+
+
+def test_recently_changed_directory_is_listed_again(tmp_path):
+    write(tmp_path / "file", 1)
+    tree, _ = refresh(tmp_path)
+
+    _, stats = refresh(tmp_path, tree)
+
+    assert stats.listed == 1
+
+
+def test_tree_is_saved_between_calculations(tmp_path, size_tree_dir):
+    make_tree(tmp_path)
+    usage = get_storage_usage_blocking(str(tmp_path))
+
+    saved = load_size_tree(str(tmp_path))
+
+    assert saved is not None
+    tree, _ = saved
+    assert tree.total() == usage
+    assert len(os.listdir(size_tree_dir)) == 1
+
+
+def test_old_tree_is_rescanned(tmp_path, mocker):
+    make_tree(tmp_path)
+    get_storage_usage_blocking(str(tmp_path))
+
+    mocker.patch.object(generic_size_counter, "FULL_RESCAN_SECONDS", -1)
+
+    assert load_size_tree(str(tmp_path)) is None
+
+
+def test_tree_of_another_version_is_rescanned(tmp_path, size_tree_dir):
+    make_tree(tmp_path)
+    with gzip.open(size_tree_path(str(tmp_path), ScanOptions()), "wt") as file:
+        json.dump(
+            {"path": str(tmp_path), "scanned_at": time.time(), "tree": [0, 0, [], {}]},
+            file,
+        )
+
+    assert load_size_tree(str(tmp_path)) is None
+    assert get_storage_usage_blocking(str(tmp_path), ScanOptions()) > 11110
+
+
+def test_failed_save_leaves_no_partial_file(tmp_path, size_tree_dir, mocker):
+    make_tree(tmp_path)
+    tree, _ = refresh(tmp_path)
+    mocker.patch.object(
+        generic_size_counter.json, "dump", side_effect=OSError("disk full")
+    )
+
+    save_size_tree(str(tmp_path), tree, time.time())
+
+    assert os.listdir(size_tree_dir) == []
+
+
+def test_hard_links_are_counted_once(tmp_path):
+    make_tree(tmp_path)
+    before, _ = refresh(tmp_path)
+
+    os.link(tmp_path / "b" / "three", tmp_path / "a" / "deep" / "three")
+    os.link(tmp_path / "b" / "three", tmp_path / "again")
+    settle(tmp_path, tmp_path / "a" / "deep")
+    after, _ = refresh(tmp_path)
+
+    assert after.total() == before.total()
+
+
+def test_hard_links_stay_counted_once_when_reused(tmp_path):
+    make_tree(tmp_path)
+    os.link(tmp_path / "b" / "three", tmp_path / "a" / "three")
+    settle(tmp_path / "a")
+    tree, _ = refresh(tmp_path)
+
+    write(tmp_path / "a" / "deep" / "new", 1)
+    settle(tmp_path / "a" / "deep")
+    updated, stats = refresh(tmp_path, tree)
+
+    assert stats.reused == 3
+    assert updated.total() == tree.total() + 1
+
+
+def test_threaded_scan_matches_sequential(tmp_path):
+    for index in range(20):
+        directory = tmp_path / f"dir{index}" / "sub"
+        directory.mkdir(parents=True)
+        write(directory / "file", index)
+        write(directory.parent / "file", 100)
+
+    sequential, _ = refresh(tmp_path)
+    threaded, stats = refresh(tmp_path, options=ScanOptions(threads=4))
+
+    assert stats.listed == 41
+    assert threaded.total() == sequential.total() == sum(range(20)) + 2000
+    assert sorted(threaded.children) == sorted(sequential.children)
+
+
+def test_count_blocks(tmp_path):
+    write(tmp_path / "small", 1)
+    with open(tmp_path / "sparse", "wb") as file:
+        file.truncate(1024 * 1024)
+
+    apparent, _ = refresh(tmp_path)
+    allocated, _ = refresh(tmp_path, options=ScanOptions(count_blocks=True))
+
+    assert apparent.total() == 1024 * 1024 + 1
+    assert allocated.total() == sum(
+        os.lstat(tmp_path / name).st_blocks * 512 for name in ("small", "sparse")
+    )
+
+
+def test_trees_are_saved_per_counting_mode(tmp_path, size_tree_dir):
+    make_tree(tmp_path)
+    get_storage_usage_blocking(str(tmp_path), ScanOptions())
+    get_storage_usage_blocking(str(tmp_path), ScanOptions(count_blocks=True))
+
+    assert len(os.listdir(size_tree_dir)) == 2
+
+
+def test_scan_options_follow_the_volume(tmp_path, mocker):
+    rotational = mocker.patch.object(
+        generic_size_counter, "_is_rotational", return_value=True
+    )
+    assert get_scan_options(str(tmp_path)) == ROTATIONAL_SCAN_OPTIONS
+    assert rotational.call_args.args == (os.stat(tmp_path).st_dev,)
+
+    rotational.return_value = False
+    assert get_scan_options(str(tmp_path)) == SOLID_STATE_SCAN_OPTIONS
+
+
+async def test_first_measurement_is_taken_right_away(tmp_path):
+    make_tree(tmp_path)
+    link_size = os.lstat(tmp_path / "a" / "link").st_size
+
+    measurement = await get_storage_usage_measurement(str(tmp_path))
+
+    assert measurement.usage == 11110 + link_size
+    assert measurement.measured_at is not None
+    assert await get_storage_usage_measured_at(str(tmp_path)) is not None
+
+
+async def test_fresh_measurement_is_reused(tmp_path, mocker):
+    make_tree(tmp_path)
+    blocking = mocker.spy(generic_size_counter, "get_storage_usage_blocking")
+
+    first = await get_storage_usage_measurement(str(tmp_path))
+    second = await get_storage_usage_measurement(str(tmp_path))
+
+    assert first == second
+    assert blocking.call_count == 1
+
+
+async def test_stale_measurement_is_served_and_refreshed(tmp_path, mocker):
+    make_tree(tmp_path)
+    stale = await get_storage_usage_measurement(str(tmp_path))
+    write(tmp_path / "new", 5)
+
+    mocker.patch.object(generic_size_counter, "USAGE_FRESH_SECONDS", -1)
+    queue = mocker.patch.object(generic_size_counter, "refresh_folder_storage_usage")
+    served = await get_storage_usage_measurement(str(tmp_path))
+    # A second reader does not queue another refresh
+    await get_storage_usage_measurement(str(tmp_path))
+    assert served == stale
+    assert queue.call_count == 1
+
+    await refresh_storage_usage_if_older(*queue.call_args.args)
+    mocker.patch.object(generic_size_counter, "USAGE_FRESH_SECONDS", 60)
+    refreshed = await get_storage_usage_measurement(str(tmp_path))
+    assert refreshed.usage == stale.usage + 5
+
+
+def test_measurements_combine_to_the_oldest():
+    combined = StorageUsageMeasurement.combine(
+        [
+            StorageUsageMeasurement(1, datetime(2024, 1, 2)),
+            StorageUsageMeasurement(2, datetime(2024, 1, 1)),
+            StorageUsageMeasurement(3, None),
+        ]
+    )
+    assert combined == StorageUsageMeasurement(6, datetime(2024, 1, 1))
+    assert StorageUsageMeasurement.combine([]) == StorageUsageMeasurement(0, None)
+
+
+async def test_periodic_refresh_measures_stalest_folders_first(
+    tmp_path, mocker, raw_dummy_service
+):
+    folders = []
+    for name in ("new", "old", "never"):
+        (tmp_path / name).mkdir()
+        folders.append(str(tmp_path / name))
+    new, old, never = folders
+    await measure_storage_usage(new)
+    await measure_storage_usage(old)
+    redis = RedisPool().get_connection()
+    redis.hset(f"sizecounter:usage:{old}", "measured_at", 1)
+
+    mocker.patch.object(raw_dummy_service, "get_folders", return_value=folders)
+    mocker.patch(
+        "selfprivacy_api.services.tasks.ServiceManager.get_enabled_services",
+        return_value=[raw_dummy_service],
+    )
+    queue = mocker.patch.object(tasks, "refresh_folder_storage_usage")
+
+    await tasks.refresh_stale_storage_usage()
+
+    assert [call.args[0] for call in queue.call_args_list] == [never, old]
+
+
+async def test_queued_refresh_skips_folders_measured_since(tmp_path, mocker):
+    queued_at = time.time()
+    await measure_storage_usage(str(tmp_path))
+    measure = mocker.spy(generic_size_counter, "measure_storage_usage")
+
+    await refresh_storage_usage_if_older(str(tmp_path), queued_at)
+
+    measure.assert_not_called()
+
+
+async def test_queued_refresh_logs_errors(tmp_path, mocker, caplog):
+    mocker.patch.object(
+        generic_size_counter, "measure_storage_usage", side_effect=OSError("I/O error")
+    )
+
+    await refresh_storage_usage_if_older(str(tmp_path), time.time())
+
+    assert "I/O error" in caplog.text
+
+
+async def test_lock_is_kept_for_long_scans(tmp_path, mocker):
+    write(tmp_path / "file", 10)
+    mocker.patch.object(generic_size_counter, "SCAN_LOCK_SECONDS", 0.3)
+    real_blocking = generic_size_counter.get_storage_usage_blocking
+
+    def slow_blocking(path, options=None):
+        time.sleep(0.5)
+        return real_blocking(path, options)
+
+    mocker.patch.object(
+        generic_size_counter, "get_storage_usage_blocking", slow_blocking
+    )
+
+    measurement = await measure_storage_usage(str(tmp_path))
+
+    assert measurement.usage == 10
+
+
+async def test_folders_are_measured_concurrently(tmp_path, mocker):
+    folders = []
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        write(tmp_path / name / "file", 10)
+        folders.append(str(tmp_path / name))
+    mocker.patch.object(
+        generic_size_counter, "get_scan_options", return_value=SOLID_STATE_SCAN_OPTIONS
+    )
+    running = 0
+    most_running = 0
+    real_blocking = generic_size_counter.get_storage_usage_blocking
+
+    def slow_blocking(path, options=None):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        time.sleep(0.1)
+        running -= 1
+        return real_blocking(path, options)
+
+    mocker.patch.object(
+        generic_size_counter, "get_storage_usage_blocking", slow_blocking
+    )
+
+    by_folder = await get_folders_storage_usage(folders + [folders[0]])
+
+    assert list(by_folder) == folders
+    assert [measurement.usage for measurement in by_folder.values()] == [10, 10, 10]
+    # All folders share one device, which allows two scans at once
+    assert most_running == SOLID_STATE_SCAN_OPTIONS.concurrent_scans
+
+
+async def test_folders_are_measured_fresh(tmp_path, mocker):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        write(tmp_path / name / "file", 10)
+    folders = [str(tmp_path / "a"), str(tmp_path / "b")]
+    await get_folders_storage_usage(folders)
+
+    write(tmp_path / "a" / "more", 5)
+    settle(tmp_path / "a")
+
+    assert await measure_folders_storage_usage(folders + folders[:1]) == 25
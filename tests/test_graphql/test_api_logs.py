@@ -1,8 +1,12 @@
 import asyncio
+import gzip
 import pytest
 from datetime import datetime
 from systemd import journal
 
+from selfprivacy_api.jobs import Jobs, JobStatus
+from selfprivacy_api.utils.systemd_journal import LogFilter, ScanBudget
+from selfprivacy_api.utils.systemd_journal import query_logs as query_logs_page
 from tests.test_graphql.test_websocket import init_graphql
 
 
@@ -171,3 +175,228 @@ async def test_websocket_subscription_for_logs(authorized_client):
         for i in range(0, 10):
             journal.send(f"Lorem ipsum number {i}")
             read_until(f"Lorem ipsum number {i}")
+
+
+API_GET_LOGS_FILTERED = """
+query TestQuery($upCursor: String, $downCursor: String, $messageContains: String, $messageRegex: String, $maxPriority: Int) {
+    logs {
+        paginated(limit: 200, upCursor: $upCursor, downCursor: $downCursor, messageContains: $messageContains, messageRegex: $messageRegex, maxPriority: $maxPriority) {
+            entries {
+                message
+                priority
+            }
+        }
+    }
+}
+"""
+
+
+def query_logs(authorized_client, **variables):
+    response = authorized_client.post(
+        "/graphql",
+        json={"query": API_GET_LOGS_FILTERED, "variables": variables},
+    )
+    assert response.status_code == 200
+    assert response.json().get("errors") is None
+    return response.json()["data"]["logs"]["paginated"]["entries"]
+
+
+def test_graphql_get_logs_filtered_by_message(authorized_client):
+    for i in range(0, 3):
+        journal.send(f"Filtered log query test {i}", PRIORITY=journal.LOG_INFO)
+    journal.send("Filtered log query test error", PRIORITY=journal.LOG_ERR)
+
+    entries = query_logs(authorized_client, messageContains="Filtered log query test")
+    assert [entry["message"] for entry in entries][-4:] == [
+        "Filtered log query test 0",
+        "Filtered log query test 1",
+        "Filtered log query test 2",
+        "Filtered log query test error",
+    ]
+
+    entries = query_logs(
+        authorized_client, messageRegex=r"^Filtered log query test \d$"
+    )
+    assert [entry["message"] for entry in entries][-3:] == [
+        "Filtered log query test 0",
+        "Filtered log query test 1",
+        "Filtered log query test 2",
+    ]
+
+    entries = query_logs(
+        authorized_client,
+        messageContains="Filtered log query test",
+        maxPriority=journal.LOG_ERR,
+    )
+    assert entries[-1]["message"] == "Filtered log query test error"
+    assert all(entry["priority"] <= journal.LOG_ERR for entry in entries)
+
+
+def test_graphql_get_logs_between_cursors(authorized_client):
+    j = journal.Reader()
+    j.seek_tail()
+    expected_entries = take_from_journal(j, 6, lambda j: j.get_previous())
+    expected_entries.reverse()
+    j.close()
+
+    entries = query_logs(
+        authorized_client,
+        upCursor=expected_entries[0]["__CURSOR"],
+        downCursor=expected_entries[-1]["__CURSOR"],
+    )
+
+    assert [entry["message"] for entry in entries] == [
+        entry["MESSAGE"] for entry in expected_entries[1:-1]
+    ]
+
+
+def test_graphql_get_logs_invalid_regex(authorized_client):
+    response = authorized_client.post(
+        "/graphql",
+        json={"query": API_GET_LOGS_FILTERED, "variables": {"messageRegex": "("}},
+    )
+    assert response.status_code == 200
+    assert response.json()["errors"] is not None
+
+
+API_GET_LOGS_WITH_LIMIT = """
+query TestQuery($limit: Int!) {
+    logs {
+        paginated(limit: $limit) {
+            entries {
+                message
+            }
+        }
+    }
+}
+"""
+
+
+@pytest.mark.parametrize("limit", [-1, 0, 501])
+def test_graphql_get_logs_invalid_limit(authorized_client, limit):
+    response = authorized_client.post(
+        "/graphql",
+        json={"query": API_GET_LOGS_WITH_LIMIT, "variables": {"limit": limit}},
+    )
+    assert response.status_code == 200
+    assert response.json()["errors"] is not None
+
+
+@pytest.mark.parametrize("max_priority", [-1, 8])
+def test_graphql_get_logs_invalid_max_priority(authorized_client, max_priority):
+    response = authorized_client.post(
+        "/graphql",
+        json={
+            "query": API_GET_LOGS_FILTERED,
+            "variables": {"maxPriority": max_priority},
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["errors"] is not None
+
+
+def test_query_logs_stops_when_budget_runs_out():
+    journal.send("Scan budget test")
+    j = journal.Reader()
+    j.seek_tail()
+    newest = [j.get_previous() for _ in range(4)]
+    j.close()
+
+    budget = ScanBudget(max_entries=3)
+    entries = query_logs_page(
+        LogFilter(message_contains="No entry has this text"),
+        limit=10,
+        down_cursor=newest[0]["__CURSOR"],
+        budget=budget,
+    )
+
+    assert entries == []
+    assert budget.exhausted
+    assert budget.scanned == 3
+    assert budget.resume_cursor == newest[3]["__CURSOR"]
+
+    # Continuing from the resume cursor starts right before it
+    entries = query_logs_page(
+        LogFilter(), limit=1, down_cursor=budget.resume_cursor, budget=ScanBudget()
+    )
+    assert entries[0].cursor != newest[3]["__CURSOR"]
+
+
+def test_compact_entries_match_journal_reader():
+    j = journal.Reader()
+    j.seek_tail()
+    expected_entries = take_from_journal(j, 5, lambda j: j.get_previous())
+    expected_entries.reverse()
+    j.close()
+
+    entries = query_logs_page(
+        LogFilter(), limit=3, up_cursor=expected_entries[0]["__CURSOR"]
+    )
+
+    assert len(entries) == 3
+    for entry, journal_entry in zip(entries, expected_entries[1:]):
+        assert entry.cursor == journal_entry["__CURSOR"]
+        assert entry.message == journal_entry["MESSAGE"]
+        assert entry.timestamp == journal_entry["__REALTIME_TIMESTAMP"]
+        assert entry.priority == journal_entry.get("PRIORITY")
+        assert entry.systemd_unit == journal_entry.get("_SYSTEMD_UNIT")
+        assert entry.systemd_slice == journal_entry.get("_SYSTEMD_SLICE")
+
+
+API_EXPORT_LOGS = """
+mutation ExportLogs($input: LogExportInput!) {
+    system {
+        exportLogs(input: $input) {
+            success
+            code
+            job {
+                uid
+                status
+                result
+            }
+        }
+    }
+}
+"""
+
+
+@pytest.fixture
+def log_export_dir(mocker, tmp_path):
+    mocker.patch("selfprivacy_api.jobs.export_logs.LOG_EXPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_graphql_export_logs(authorized_client, client, log_export_dir):
+    since = datetime.now()
+    for i in range(0, 3):
+        journal.send(f"Exported log entry {i}")
+
+    response = authorized_client.post(
+        "/graphql",
+        json={
+            "query": API_EXPORT_LOGS,
+            "variables": {"input": {"since": since.isoformat()}},
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()["data"]["system"]["exportLogs"]
+    assert result["success"] is True
+    # Huey runs tasks immediately in tests
+    job_uid = result["job"]["uid"]
+    assert Jobs.get_job(job_uid).status == JobStatus.FINISHED
+
+    response = client.get(f"/api/logs/export/{job_uid}")
+    assert response.status_code == 401
+
+    response = authorized_client.get(f"/api/logs/export/{job_uid}")
+    assert response.status_code == 200
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    exported = [line for line in lines if "Exported log entry" in line]
+    assert [line.split("] ", 1)[1] for line in exported] == [
+        "Exported log entry 0",
+        "Exported log entry 1",
+        "Exported log entry 2",
+    ]
+
+    response = authorized_client.get("/api/logs/export/no-such-job")
+    assert response.status_code == 404
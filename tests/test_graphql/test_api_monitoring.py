@@ -2,11 +2,21 @@
 # pylint: disable=unused-argument
 # pylint: disable=missing-function-docstring
 
+import asyncio
 from datetime import datetime
 from typing import Optional
 import pytest
 
 from selfprivacy_api.models.services import ServiceStatus
+from selfprivacy_api.utils.monitoring import (
+    DownsampleMethod,
+    MonitoringMetricKind,
+    MonitoringMetrics,
+    MonitoringQueries,
+    MonitoringQueryError,
+    ServiceResourceUsage,
+)
+from selfprivacy_api.utils.monitoring_series import unpack_float64, unpack_int64
 
 from tests.test_graphql.common import (
     assert_empty,
@@ -820,3 +830,254 @@ def test_graphql_get_network_usage_unauthorized(client):
         json={"query": NETWORK_USAGE_QUERY},
     )
     assert_empty(response)
+
+
+BATCH_QUERY = """
+query Query($kinds: [MonitoringMetricKind!]!) {
+  monitoring {
+    batch(kinds: $kinds) {
+      durationMs
+      items {
+        kind
+        durationMs
+        result {
+          ... on MonitoringValues {
+            values {
+              value
+            }
+          }
+          ... on MonitoringMetrics {
+            metrics {
+              metricId
+            }
+          }
+          ... on MonitoringQueryError {
+            error
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+@pytest.mark.parametrize("mock_send_range_query", [["device", 2]], indirect=True)
+def test_graphql_get_monitoring_batch(
+    authorized_client,
+    mock_send_range_query,
+    mock_get_status_active,
+):
+    response = authorized_client.post(
+        "/graphql",
+        json={
+            "query": BATCH_QUERY,
+            "variables": {
+                "kinds": [
+                    "CPU_USAGE_OVERALL",
+                    "DISK_USAGE_OVERALL",
+                    "CPU_USAGE_OVERALL",
+                ]
+            },
+        },
+    )
+
+    data = get_data(response)["monitoring"]["batch"]
+    assert [item["kind"] for item in data["items"]] == [
+        "CPU_USAGE_OVERALL",
+        "DISK_USAGE_OVERALL",
+    ]
+    assert data["items"][0]["result"] == {"values": [{"value": "zero"}]}
+    assert data["items"][1]["result"] == {
+        "metrics": [{"metricId": "metric-0"}, {"metricId": "metric-1"}]
+    }
+    assert all(item["durationMs"] >= 0 for item in data["items"])
+
+
+def test_graphql_get_monitoring_batch_unauthorized(client):
+    response = client.post(
+        "/graphql",
+        json={"query": BATCH_QUERY, "variables": {"kinds": ["CPU_USAGE_OVERALL"]}},
+    )
+    assert_empty(response)
+
+
+async def test_monitoring_batch_runs_queries_concurrently(mocker):
+    async def slow_query(
+        query: str, start: int, end: int, step: int, result_type: Optional[str] = None
+    ):
+        await asyncio.sleep(0.2)
+        return {
+            "resultType": "matrix",
+            "result": [{"metric": {"device": "sda"}, "values": [[0, "1"]]}],
+        }
+
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_range_query",
+        slow_query,
+    )
+    kinds = [
+        MonitoringMetricKind.CPU_USAGE_OVERALL,
+        MonitoringMetricKind.MEMORY_USAGE_OVERALL,
+        MonitoringMetricKind.SWAP_USAGE_OVERALL,
+        MonitoringMetricKind.DISK_USAGE_OVERALL,
+        MonitoringMetricKind.NETWORK_USAGE_OVERALL,
+    ]
+
+    batch = await MonitoringQueries.batch(kinds)
+
+    assert [item.kind for item in batch.items] == kinds
+    assert all(item.duration_ms >= 200 for item in batch.items)
+    assert batch.duration_ms < 200 * len(kinds) / 2
+
+
+async def test_monitoring_batch_isolates_failures(mocker):
+    async def empty_query(
+        query: str, start: int, end: int, step: int, result_type: Optional[str] = None
+    ):
+        return {"resultType": "matrix", "result": []}
+
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_range_query",
+        empty_query,
+    )
+
+    batch = await MonitoringQueries.batch(
+        [
+            MonitoringMetricKind.CPU_USAGE_OVERALL,
+            MonitoringMetricKind.DISK_USAGE_OVERALL,
+        ]
+    )
+
+    assert isinstance(batch.items[0].result, MonitoringQueryError)
+    assert batch.items[1].result == MonitoringMetrics(metrics=[])
+
+
+async def test_monitoring_packed_series(mocker):
+    async def week_of_minutes(
+        query: str, start: int, end: int, step: int, result_type: Optional[str] = None
+    ):
+        return {
+            "resultType": "matrix",
+            "result": [
+                {
+                    "metric": {"device": device},
+                    "values": [
+                        [1700000000 + 60 * i, str(i % 100)] for i in range(7 * 1440)
+                    ],
+                }
+                for device in ("sda", "sdb")
+            ],
+        }
+
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_range_query",
+        week_of_minutes,
+    )
+
+    result = await MonitoringQueries.packed_series(
+        MonitoringMetricKind.DISK_USAGE_OVERALL,
+        max_points=500,
+        downsample=DownsampleMethod.MAX,
+    )
+
+    assert [series.metric_id for series in result.series] == ["sda", "sdb"]
+    series = result.series[0]
+    assert series.count == 500
+    assert len(unpack_int64(series.timestamps)) == 500
+    assert unpack_int64(series.timestamps)[0] == 1700000000
+    assert max(unpack_float64(series.values)) == 99.0
+
+
+async def test_monitoring_packed_series_rejects_instant_metrics():
+    result = await MonitoringQueries.packed_series(
+        MonitoringMetricKind.MEMORY_USAGE_MAX_BY_SLICE
+    )
+    assert isinstance(result, MonitoringQueryError)
+
+
+@pytest.mark.parametrize(
+    "max_points,downsample",
+    [
+        (0, DownsampleMethod.MAX),
+        (-5, DownsampleMethod.AVG),
+        (1, DownsampleMethod.LTTB),
+        (2, DownsampleMethod.LTTB),
+    ],
+)
+async def test_packed_series_rejects_too_few_points(max_points, downsample, mocker):
+    send = mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_range_query"
+    )
+
+    result = await MonitoringQueries.packed_series(
+        MonitoringMetricKind.DISK_USAGE_OVERALL,
+        max_points=max_points,
+        downsample=downsample,
+    )
+
+    assert isinstance(result, MonitoringQueryError)
+    send.assert_not_called()
+
+
+@pytest.mark.parametrize("step", [0, -60])
+async def test_range_queries_reject_bad_step(step):
+    result = await MonitoringQueries.cpu_usage_overall(step=step)
+    assert isinstance(result, MonitoringQueryError)
+
+
+async def test_service_resource_usage(mocker, raw_dummy_service):
+    queries = []
+
+    async def by_slice(query: str, result_type: Optional[str] = None):
+        queries.append(query)
+        if "network" in query:
+            return MonitoringQueryError(error="no network metrics")
+        return {
+            "resultType": "vector",
+            "result": [
+                {"metric": {"id": "/testservice.slice"}, "value": [0, "42"]},
+                {"metric": {"id": "/system.slice"}, "value": [0, "1000"]},
+            ],
+        }
+
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_query", by_slice
+    )
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.ServiceManager.get_enabled_services",
+        return_value=[raw_dummy_service],
+    )
+
+    result = await MonitoringQueries.service_resource_usage()
+
+    # One query per metric, whatever the number of services
+    assert len(queries) == 6
+    assert result.services == [
+        ServiceResourceUsage(
+            service_id="testservice",
+            display_name="Test Service",
+            cpu_usage=42.0,
+            memory_usage=42.0,
+            disk_read=42.0,
+            disk_write=42.0,
+        )
+    ]
+    assert result.errors == ["no network metrics", "no network metrics"]
+
+
+async def test_service_resource_usage_all_failed(mocker, raw_dummy_service):
+    async def failing(query: str, result_type: Optional[str] = None):
+        return MonitoringQueryError(error="Prometheus request failed!")
+
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.MonitoringQueries._send_query", failing
+    )
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring.ServiceManager.get_enabled_services",
+        return_value=[raw_dummy_service],
+    )
+
+    result = await MonitoringQueries.service_resource_usage()
+
+    assert result == MonitoringQueryError(error="Prometheus request failed!")
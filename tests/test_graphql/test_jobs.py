@@ -108,3 +108,75 @@ def test_job_without_args_unaffected_in_graphql_response(authorized_client, jobs
     assert len(output) == 1
     assert output[0]["name"] == "Total backup"
     assert output[0]["description"] == "Backing up all enabled services"
+
+
+API_JOBS_PAGE_QUERY = """
+paginated(limit: $limit, cursor: $cursor, status: $status, typePrefix: $typePrefix) {
+    jobs {
+        uid
+        typeId
+        name
+        status
+    }
+    nextCursor
+}
+"""
+
+
+def api_jobs_page(
+    authorized_client, limit=20, cursor=None, status=None, type_prefix=None
+):
+    query = (
+        "query TestJobs($limit: Int!, $cursor: String, $status: String,"
+        " $typePrefix: String) {\n jobs {" + API_JOBS_PAGE_QUERY + "}\n}"
+    )
+    response = graphql_send_query(
+        authorized_client,
+        query,
+        {
+            "limit": limit,
+            "cursor": cursor,
+            "status": status,
+            "typePrefix": type_prefix,
+        },
+    )
+    return get_data(response)["jobs"]["paginated"]
+
+
+def test_paginated_jobs_walks_all_pages(authorized_client, jobs):
+    added = [Jobs.add(f"job{i}", "test.paging", "paging") for i in range(5)]
+
+    received = []
+    cursor = None
+    pages = 0
+    while True:
+        page = api_jobs_page(authorized_client, limit=2, cursor=cursor)
+        pages += 1
+        received += page["jobs"]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    # Most recently updated first
+    assert [job["uid"] for job in received] == [str(job.uid) for job in reversed(added)]
+
+
+def test_paginated_jobs_filters(authorized_client, jobs):
+    backup = Jobs.add("Backup", "services.nextcloud.backup", "Backing up")
+    Jobs.add("Restore", "services.nextcloud.restore", "Restoring")
+    Jobs.add("Rebuild", "system.nixos.rebuild", "Rebuilding")
+    Jobs.update(backup, JobStatus.ERROR, error="Oops")
+
+    page = api_jobs_page(authorized_client, type_prefix="services.")
+    assert len(page["jobs"]) == 2
+    assert page["nextCursor"] is None
+
+    page = api_jobs_page(authorized_client, status="ERROR", type_prefix="services.")
+    assert [job["uid"] for job in page["jobs"]] == [str(backup.uid)]
+
+
+def test_paginated_jobs_rejects_large_limit(authorized_client, jobs):
+    query = "query TestJobs {\n jobs { paginated(limit: 1000) { nextCursor } }\n}"
+    response = graphql_send_query(authorized_client, query)
+    assert response.json()["errors"]
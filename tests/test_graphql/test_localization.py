@@ -1,5 +1,6 @@
+from selfprivacy_api.graphql.common_types.jobs import job_to_api_job, translate_jobs
 from selfprivacy_api.jobs import Jobs
-from selfprivacy_api.utils.localization import TranslateSystemMessage as t
+from selfprivacy_api.utils.localization import TranslateSystemMessage as t, _catalog
 from tests.common import generate_jobs_query
 from tests.test_graphql.common import get_data
 from tests.test_jobs import jobs  # noqa: F401  fixture
@@ -44,3 +45,24 @@ def test_graphql_jobs_query_honors_accept_language_ru(
     assert result[0]["description"] == (
         "Применение новой конфигурации системы путём сборки новой генерации NixOS."
     )
+
+
+def test_translate_jobs_in_bulk(jobs):  # noqa: F811
+    for _ in range(3):
+        Jobs.add(name="Rebuild system", type_id="test.rebuild", description="")
+    api_jobs = [job_to_api_job(job) for job in Jobs.get_jobs()]
+
+    translated = translate_jobs(api_jobs, locale="ru")
+
+    assert [job.name for job in translated] == ["Пересборка системы"] * 3
+    assert [job.uid for job in translated] == [job.uid for job in api_jobs]
+
+
+def test_translation_catalog_is_loaded_once():
+    t.translate(text="Rebuild system", locale="ru")
+    loads = _catalog.cache_info().misses
+
+    for text in ["Rebuild system", "Some message without translation"]:
+        t.translate(text=text, locale="ru")
+
+    assert _catalog.cache_info().misses == loads
@@ -6,7 +6,7 @@ from time import sleep
 
 from starlette.testclient import WebSocketTestSession
 
-from selfprivacy_api.jobs import Jobs
+from selfprivacy_api.jobs import Jobs, JobStatus
 from selfprivacy_api.graphql import IsAuthenticated
 
 from tests.conftest import DEVICE_WE_AUTH_TESTS_WITH
@@ -206,6 +206,61 @@ async def test_websocket_subscription(authenticated_websocket, empty_jobs):
                 assert api_job["result"] == None
 
 
+JOB_DELTAS_SUBSCRIPTION = """
+jobDeltas(coalesceMs: 200) {
+    uid
+    job {
+        uid
+        name
+        status
+        progress
+    }
+}
+"""
+
+
+def test_websocket_job_deltas(authenticated_websocket, empty_jobs):
+    websocket = authenticated_websocket
+    existing = Jobs.add("existing", "bogus.bogus", "was here before")
+    init_graphql(websocket)
+    arbitrary_id = "3aaa2446"
+    api_subscribe(websocket, arbitrary_id, JOB_DELTAS_SUBSCRIPTION)
+
+    snapshot = websocket.receive_json()["payload"]["data"]["jobDeltas"]
+    assert snapshot == [
+        {
+            "uid": str(existing.uid),
+            "job": {
+                "uid": str(existing.uid),
+                "name": "existing",
+                "status": "CREATED",
+                "progress": 0,
+            },
+        }
+    ]
+
+    # A burst of updates to one job is coalesced into a single delta
+    for progress in range(1, 6):
+        Jobs.update(existing, JobStatus.RUNNING, progress=progress)
+
+    deltas = websocket.receive_json()["payload"]["data"]["jobDeltas"]
+    assert deltas == [
+        {
+            "uid": str(existing.uid),
+            "job": {
+                "uid": str(existing.uid),
+                "name": "existing",
+                "status": "RUNNING",
+                "progress": 5,
+            },
+        }
+    ]
+
+    Jobs.remove(existing)
+    deltas = websocket.receive_json()["payload"]["data"]["jobDeltas"]
+    assert deltas == [{"uid": str(existing.uid), "job": None}]
+
+
 def test_websocket_subscription_unauthorized(unauthenticated_websocket):
     websocket = unauthenticated_websocket
     init_graphql(websocket)
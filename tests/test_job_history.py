@@ -0,0 +1,85 @@
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-argument
+import pytest
+from datetime import datetime
+from time import sleep
+
+from selfprivacy_api.jobs import Jobs, JobStatus
+from selfprivacy_api.jobs.history import JobHistory
+
+from tests.test_jobs import jobs
+
+
+@pytest.fixture
+def history(jobs):
+    JobHistory.reset()
+    yield JobHistory
+    JobHistory.reset()
+
+
+def finish(jobs, type_id: str, status: JobStatus = JobStatus.FINISHED, **kwargs):
+    job = jobs.add(name="Backup %(name)s", type_id=type_id, description="")
+    jobs.update(job=job, status=JobStatus.RUNNING, progress=50)
+    jobs.update(job=job, status=status, **kwargs)
+    return job
+
+
+def test_unfinished_jobs_are_not_archived(history, jobs):
+    job = jobs.add(name="Test", type_id="test", description="")
+    jobs.update(job=job, status=JobStatus.RUNNING)
+    assert history.count() == 0
+
+
+def test_finished_job_is_archived_once(history, jobs):
+    job = finish(
+        jobs,
+        "services.nextcloud.backup",
+        result="%(size)s backed up",
+        result_args={"size": "1 GB"},
+    )
+    finished_at = job.finished_at
+    # Updating a finished job again does not archive it again
+    jobs.update(job=job, status=JobStatus.FINISHED, result="Done")
+
+    [archived] = history.get_jobs()
+    assert archived.uid == str(job.uid)
+    assert archived.type_id == "services.nextcloud.backup"
+    assert archived.status == "FINISHED"
+    assert archived.result == "%(size)s backed up"
+    assert archived.result_args == {"size": "1 GB"}
+    assert archived.error is None
+    assert archived.finished_at == finished_at
+
+
+def test_archive_outlives_the_job(history, jobs):
+    job = finish(jobs, "test", JobStatus.ERROR, error="Oops")
+    jobs.remove(job)
+
+    [archived] = history.get_jobs()
+    assert archived.uid == str(job.uid)
+    assert archived.error == "Oops"
+
+
+def test_history_filters(history, jobs):
+    old_backup = finish(jobs, "services.nextcloud.backup")
+    sleep(0.01)
+    middle = datetime.now()
+    sleep(0.01)
+    rebuild = finish(jobs, "system.nixos.rebuild")
+    new_backup = finish(jobs, "services.gitea.backup")
+
+    assert [job.uid for job in history.get_jobs()] == [
+        str(new_backup.uid),
+        str(rebuild.uid),
+        str(old_backup.uid),
+    ]
+    assert [job.uid for job in history.get_jobs(type_prefix="services.")] == [
+        str(new_backup.uid),
+        str(old_backup.uid),
+    ]
+    assert [job.uid for job in history.get_jobs(since=middle)] == [
+        str(new_backup.uid),
+        str(rebuild.uid),
+    ]
+    assert [job.uid for job in history.get_jobs(until=middle)] == [str(old_backup.uid)]
+    assert len(history.get_jobs(limit=1)) == 1
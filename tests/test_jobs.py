@@ -1,11 +1,13 @@
 # pylint: disable=redefined-outer-name
 # pylint: disable=unused-argument
 import pytest
+import threading
 from time import sleep
 
 from selfprivacy_api.jobs import Jobs, JobStatus
 from selfprivacy_api.graphql.common_types.jobs import job_to_api_job, translate_job
 import selfprivacy_api.jobs as jobsmodule
+from selfprivacy_api.utils.redis_pool import RedisPool
 
 
 def test_add_reset(jobs_with_one_job):
@@ -258,6 +260,233 @@ def test_translate_job_status_text_args_cleared_on_update(jobs):
     assert translated.status_text == "Cleaning..."
 
 
+def test_get_jobs_by_status_follows_updates(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    assert jobs.get_jobs_by_status(JobStatus.CREATED) == [test_job]
+    assert jobs.get_jobs_by_status(JobStatus.RUNNING) == []
+
+    jobs.update(job=test_job, status=JobStatus.RUNNING)
+
+    assert jobs.get_jobs_by_status(JobStatus.CREATED) == []
+    assert jobs.get_jobs_by_status(JobStatus.RUNNING) == [test_job]
+
+
+def test_get_jobs_by_type(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    other_job = jobs.add(name="Other", type_id="other", description="Other job")
+
+    assert jobs.get_jobs_by_type("other") == [other_job]
+    assert len(jobs.get_jobs_by_type("test")) == 1
+    assert jobs.get_jobs_by_type("nonexistent") == []
+
+
+def test_remove_drops_from_indexes(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    jobs.update(job=test_job, status=JobStatus.RUNNING)
+    assert jobs.is_busy()
+
+    jobs.remove(test_job)
+
+    assert not jobs.is_busy()
+    assert jobs.get_jobs_by_type("test") == []
+    redis = RedisPool().get_connection()
+    assert redis.zcard(jobsmodule.UPDATED_AT_INDEX_KEY) == 0
+
+
+def test_is_busy_ignores_expired_running_job(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    jobs.update(job=test_job, status=JobStatus.RUNNING)
+    assert jobs.is_busy()
+
+    jobs.set_expiration(test_job, 0)
+
+    assert not jobs.is_busy()
+
+
+def test_repair_indexes_after_expiration(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    jobs.set_expiration(test_job, 0)
+
+    assert jobs.repair_indexes() == 1
+    assert jobs.repair_indexes() == 0
+    redis = RedisPool().get_connection()
+    assert redis.zcard(jobsmodule.UPDATED_AT_INDEX_KEY) == 0
+    assert redis.hlen(jobsmodule.TYPE_OF_INDEX_KEY) == 0
+
+
+def test_rebuild_indexes(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    redis = RedisPool().get_connection()
+    for key in redis.keys(jobsmodule.INDEX_PREFIX + "*"):
+        redis.delete(key)
+    assert jobs.has_unindexed_jobs()
+    assert jobs.get_jobs_by_type("test") == []
+
+    jobs.rebuild_indexes()
+
+    assert not jobs.has_unindexed_jobs()
+    assert jobs.get_jobs_by_type("test") == [test_job]
+    assert jobs.get_jobs_by_status(JobStatus.CREATED) == [test_job]
+
+
+def test_get_jobs_many_keeps_order_and_skips_missing(jobs):
+    first = jobs.add(name="First", type_id="test", description="")
+    second = jobs.add(name="Second", type_id="test", description="")
+    jobs.update(job=second, status=JobStatus.ERROR, error="Oops")
+
+    uids = [str(second.uid), "nonexistent", str(first.uid)]
+    assert jobs.get_jobs_many(uids) == [second, first]
+    assert jobs.get_jobs_many([]) == []
+
+
+def test_get_jobs_many_decodes_like_get_job(jobs_with_one_job):
+    job = jobs_with_one_job.get_jobs()[0]
+    jobs_with_one_job.update(job=job, status=JobStatus.FINISHED)
+
+    uid = str(job.uid)
+    [many] = jobs_with_one_job.get_jobs_many([uid])
+    assert many == jobs_with_one_job.get_job(uid)
+    assert many.finished_at is not None
+    assert many.error is None
+
+
+def test_job_uid_from_notification():
+    uid = "61a49bdc-eec6-4029-a4d7-c18709fd965a"
+    message = {
+        "channel": f"__keyspace@0__:jobs:{uid}",
+        "data": "hset",
+        "pattern": "__keyspace@0__:jobs:*",
+        "type": "pmessage",
+    }
+    assert jobsmodule.job_uid_from_notification(message) == uid
+    assert jobsmodule.job_uid_from_notification({"channel": "other:key"}) is None
+    assert jobsmodule.job_uid_from_notification({}) is None
+
+
+def test_update_writes_only_changed_fields(jobs_with_one_job):
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    redis = RedisPool().get_connection()
+    key = "jobs:" + str(test_job.uid)
+    redis.hset(key, "description", "Changed behind our back")
+
+    jobs.update(job=test_job, status=JobStatus.RUNNING, progress=42)
+
+    stored = redis.hgetall(key)
+    assert stored["description"] == "Changed behind our back"
+    assert stored["progress"] == "42"
+    assert stored["status"] == "RUNNING"
+
+
+def test_throttled_updates_are_coalesced(jobs_with_one_job, mocker):
+    mocker.patch("selfprivacy_api.jobs.JOB_UPDATE_MIN_INTERVAL_SECONDS", new=0.5)
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    uid = str(test_job.uid)
+
+    for progress in range(1, 11):
+        jobs.update(
+            job=test_job, status=JobStatus.RUNNING, progress=progress, throttle=True
+        )
+
+    # The first update goes through, the rest waits for the interval to end
+    stored = jobs.get_job(uid)
+    assert stored is not None
+    assert stored.progress == 1
+
+    sleep(0.8)
+    stored = jobs.get_job(uid)
+    assert stored is not None
+    assert stored.progress == 10
+    assert jobs.progress_updates(test_job) == list(range(10, 0, -1))
+
+
+def test_throttled_update_flushed_by_final_state(jobs_with_one_job, mocker):
+    mocker.patch("selfprivacy_api.jobs.JOB_UPDATE_MIN_INTERVAL_SECONDS", new=60)
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    uid = str(test_job.uid)
+
+    jobs.update(job=test_job, status=JobStatus.RUNNING, progress=1, throttle=True)
+    jobs.update(
+        job=test_job,
+        status=JobStatus.RUNNING,
+        status_text="Almost there",
+        progress=50,
+        throttle=True,
+    )
+    stored = jobs.get_job(uid)
+    assert stored is not None
+    assert stored.progress == 1
+
+    jobs.update(job=test_job, status=JobStatus.FINISHED, throttle=True)
+
+    stored = jobs.get_job(uid)
+    assert stored is not None
+    assert stored.status == JobStatus.FINISHED
+    assert stored.status_text == "Almost there"
+    assert stored.progress == 100
+    assert JobStatus.RUNNING in jobs.status_updates(test_job)
+
+
+def test_pending_update_of_removed_job_leaves_no_hash(jobs_with_one_job, mocker):
+    mocker.patch("selfprivacy_api.jobs.JOB_UPDATE_MIN_INTERVAL_SECONDS", new=60)
+    jobs = jobs_with_one_job
+    test_job = jobs.get_jobs()[0]
+    uid = str(test_job.uid)
+
+    jobs.update(job=test_job, status=JobStatus.RUNNING, progress=1, throttle=True)
+    jobs.update(job=test_job, status=JobStatus.RUNNING, progress=2, throttle=True)
+    # As if another process removed the job, or it expired
+    RedisPool().get_connection().delete("jobs:" + uid)
+    jobs.flush(uid)
+
+    assert jobs.get_job(uid) is None
+    assert jobs.get_jobs() == []
+    # Logs are kept regardless, as they were before updates were batched
+    assert jobs.progress_updates(test_job) == [2, 1]
+
+
+def test_flush_does_not_block_other_jobs(jobs, mocker):
+    first = jobs.add(name="First", type_id="test.first", description="")
+    second = jobs.add(name="Second", type_id="test.second", description="")
+    writing = threading.Event()
+    release = threading.Event()
+    timed_out = []
+    write_job_changes = jobsmodule._write_job_changes
+
+    def slow_write(job, *args):
+        if job.uid == first.uid:
+            writing.set()
+            if not release.wait(5):
+                timed_out.append(job.uid)
+        write_job_changes(job, *args)
+
+    mocker.patch("selfprivacy_api.jobs._write_job_changes", slow_write)
+    flushing = threading.Thread(
+        target=jobs.update, kwargs={"job": first, "status": JobStatus.RUNNING}
+    )
+    flushing.start()
+    try:
+        assert writing.wait(5)
+        jobs.update(job=second, status=JobStatus.RUNNING, progress=5)
+        stored = jobs.get_job(str(second.uid))
+        assert stored is not None
+        assert stored.progress == 5
+    finally:
+        release.set()
+        flushing.join()
+    assert timed_out == []
+    stored = jobs.get_job(str(first.uid))
+    assert stored is not None
+    assert stored.status == JobStatus.RUNNING
+
+
 @pytest.fixture
 def jobs():
     j = Jobs()
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from systemd import journal
+
+from selfprivacy_api.graphql.subscriptions.logs import log_stream
+from selfprivacy_api.utils.fanout import SlowConsumerError
+from selfprivacy_api.utils.journal_tail import JournalTail
+from selfprivacy_api.utils.systemd_journal import JournalEntry, LogFilter
+
+
+async def read_until(subscription, message: str, limit: int = 50) -> list[JournalEntry]:
+    entries = []
+    async with asyncio.timeout(5):
+        while len(entries) < limit:
+            entry = await subscription.get()
+            entries.append(entry)
+            if entry.message == message:
+                return entries
+    raise Exception(f"{message} was not received")
+
+
+@pytest.mark.asyncio
+async def test_tail_shares_entries_between_subscribers():
+    tail = JournalTail()
+    async with tail.subscribe() as first, tail.subscribe() as second:
+        assert tail.subscriber_count() == 2
+        journal.send("Journal tail shared entry")
+
+        first_entry = (await read_until(first, "Journal tail shared entry"))[-1]
+        second_entry = (await read_until(second, "Journal tail shared entry"))[-1]
+        # Decoded once, handed to both
+        assert first_entry is second_entry
+
+    assert tail.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_tail_applies_filters_per_subscriber():
+    tail = JournalTail()
+    errors_only = LogFilter(max_priority=journal.LOG_ERR)
+    async with tail.subscribe() as everything, tail.subscribe(errors_only) as errors:
+        journal.send("Journal tail info entry", PRIORITY=journal.LOG_INFO)
+        journal.send("Journal tail error entry", PRIORITY=journal.LOG_ERR)
+
+        messages = [
+            entry.message
+            for entry in await read_until(everything, "Journal tail error entry")
+        ]
+        assert "Journal tail info entry" in messages
+
+        entries = await read_until(errors, "Journal tail error entry")
+        assert "Journal tail info entry" not in [entry.message for entry in entries]
+        assert all(entry.priority <= journal.LOG_ERR for entry in entries)
+
+
+@pytest.mark.asyncio
+async def test_tail_drops_slow_consumer():
+    tail = JournalTail()
+    async with tail.subscribe() as fast, tail.subscribe(buffer_size=1) as slow:
+        for i in range(3):
+            journal.send(f"Journal tail slow consumer {i}")
+        await read_until(fast, "Journal tail slow consumer 2")
+
+        with pytest.raises(SlowConsumerError):
+            while True:
+                await slow.get()
+        assert slow.closed
+        assert tail.subscriber_count() == 1
+
+
+@pytest.mark.asyncio
+async def test_tail_shares_readers_between_equal_filters():
+    tail = JournalTail()
+    errors_only = LogFilter(max_priority=journal.LOG_ERR)
+    async with tail.subscribe(errors_only) as errors, tail.subscribe(
+        LogFilter(max_priority=journal.LOG_ERR, message_contains="tail")
+    ) as tail_errors, tail.subscribe() as everything:
+        assert tail.subscriber_count() == 3
+        # Message patterns are checked in Python, the rest by journald
+        assert tail.reader_count() == 2
+
+        journal.send("Journal tail shared reader error", PRIORITY=journal.LOG_ERR)
+        await read_until(errors, "Journal tail shared reader error")
+        await read_until(tail_errors, "Journal tail shared reader error")
+        await read_until(everything, "Journal tail shared reader error")
+
+    assert tail.reader_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_tail_passes_empty_messages():
+    tail = JournalTail()
+    async with tail.subscribe() as entries:
+        journal.send("")
+        journal.send("Journal tail after empty entry")
+
+        messages = [
+            entry.message
+            for entry in await read_until(entries, "Journal tail after empty entry")
+        ]
+        assert messages[-2:] == ["", "Journal tail after empty entry"]
+
+
+@pytest.mark.asyncio
+async def test_log_stream_reports_dropped_entries(mocker):
+    tail = JournalTail()
+    mocker.patch(
+        "selfprivacy_api.graphql.subscriptions.logs.JournalTail", return_value=tail
+    )
+    mocker.patch.object(
+        tail,
+        "open",
+        lambda log_filter, buffer_size: JournalTail.open(tail, log_filter, 1),
+    )
+    stream = log_stream()
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    for i in range(3):
+        journal.send(f"Journal tail dropped entry {i}")
+    await first
+
+    with pytest.raises(Exception, match="dropped"):
+        while True:
+            await stream.__anext__()
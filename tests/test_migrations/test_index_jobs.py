@@ -0,0 +1,41 @@
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-argument
+
+from selfprivacy_api.jobs import INDEX_PREFIX, JobStatus, Jobs
+from selfprivacy_api.migrations.index_jobs import IndexJobs
+from selfprivacy_api.utils.redis_pool import RedisPool
+
+
+def drop_indexes():
+    redis = RedisPool().get_connection()
+    for key in redis.keys(INDEX_PREFIX + "*"):
+        redis.delete(key)
+
+
+async def test_indexes_legacy_jobs(jobs):
+    running = jobs.add(
+        type_id="system.nixos.rebuild",
+        name="Rebuild",
+        description="",
+        status=JobStatus.RUNNING,
+    )
+    drop_indexes()
+    assert not Jobs.is_busy()
+
+    migration = IndexJobs()
+    assert await migration.is_migration_needed() is True
+
+    await migration.migrate()
+
+    assert Jobs.is_busy()
+    assert Jobs.get_jobs_by_type("system.nixos.rebuild") == [running]
+    assert await migration.is_migration_needed() is False
+
+
+async def test_not_needed_with_no_jobs(jobs):
+    assert await IndexJobs().is_migration_needed() is False
+
+
+async def test_not_needed_for_indexed_jobs(jobs):
+    jobs.add(type_id="test", name="Test", description="")
+    assert await IndexJobs().is_migration_needed() is False
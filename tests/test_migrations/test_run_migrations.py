@@ -128,6 +128,7 @@ def test_real_migration_names_are_stable():
     names = [migration.get_migration_name() for migration in real_migrations]
     assert names == [
         "write_token_to_redis",
+        "index_jobs",
         "check_for_system_rebuild_jobs",
         "merge_sp_modules_flake",
         "migrate_users_from_json",
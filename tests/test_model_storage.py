@@ -4,7 +4,11 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 
-from selfprivacy_api.utils.redis_model_storage import store_model_as_hash, hash_as_model
+from selfprivacy_api.utils.redis_model_storage import (
+    hash_as_model,
+    store_model_as_hash,
+    store_models_as_hashes,
+)
 from selfprivacy_api.utils.redis_pool import RedisPool
 
 TEST_KEY = "model_storage"
@@ -31,3 +35,18 @@ def test_store_retrieve_none():
     model = DummyModel(name="test", date=None)
     store_model_as_hash(redis, TEST_KEY, model)
     assert hash_as_model(redis, TEST_KEY, DummyModel) == model
+
+
+def test_store_many_models(clean_redis):
+    keys = [TEST_KEY + ":" + str(i) for i in range(3)]
+    models = [DummyModel(name=str(i), date=datetime.now()) for i in range(3)]
+
+    store_models_as_hashes(redis, zip(keys, models))
+
+    for key, model in zip(keys, models):
+        assert hash_as_model(redis, key, DummyModel) == model
+        redis.delete(key)
+
+
+def test_missing_hash_is_none(clean_redis):
+    assert hash_as_model(redis, TEST_KEY, DummyModel) is None
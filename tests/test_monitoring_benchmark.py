@@ -0,0 +1,144 @@
+"""
+Benchmarks of the monitoring resolvers against a local fake Prometheus.
+
+Run with:
+    pytest --benchmark -s tests/test_monitoring_benchmark.py
+
+Each benchmark prints wall time, peak traced memory and the number of
+memory blocks still held by the result. Times are taken with tracemalloc
+running, so compare them with each other rather than with production.
+"""
+
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+from selfprivacy_api.utils.monitoring import (
+    DownsampleMethod,
+    MonitoringMetricKind,
+    MonitoringMetrics,
+    MonitoringQueries,
+    MonitoringValues,
+)
+from selfprivacy_api.utils.monitoring_cache import RangeQueryCache
+
+WEEK = timedelta(days=7)
+DAY = timedelta(days=1)
+# A server with every service installed has a few dozen slices
+SLICES = 40
+
+
+async def measure(name: str, run: Callable[[], Awaitable[Any]]) -> Any:
+    tracemalloc.start()
+    began = time.perf_counter()
+    try:
+        result = await run()
+        elapsed = time.perf_counter() - began
+        _, peak = tracemalloc.get_traced_memory()
+        held = sum(
+            stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+        )
+    finally:
+        tracemalloc.stop()
+    print(
+        f"\n{name}: {elapsed * 1000:.1f} ms, "
+        f"peak {peak / 1024 / 1024:.1f} MiB, {held} blocks held"
+    )
+    return result
+
+
+def window(length: timedelta) -> tuple[datetime, datetime]:
+    end = datetime.now()
+    return end - length, end
+
+
+async def test_fake_prometheus_serves_queries(fake_prometheus):
+    fake_prometheus.series = 3
+    start, end = window(timedelta(minutes=20))
+
+    disks = await MonitoringQueries.disk_usage_overall(start, end, 60)
+    memory = await MonitoringQueries.memory_usage_max_by_slice(start, end)
+
+    assert isinstance(disks, MonitoringMetrics)
+    assert [metric.metric_id for metric in disks.metrics] == ["sd0", "sd1", "sd2"]
+    assert len(disks.metrics[0].values) in (20, 21)
+    assert isinstance(memory, MonitoringMetrics)
+    assert [metric.metric_id for metric in memory.metrics] == [
+        "service0",
+        "service1",
+        "service2",
+    ]
+    assert [path for path, _ in fake_prometheus.requests] == [
+        "/api/v1/query_range",
+        "/api/v1/query",
+    ]
+
+
+@pytest.mark.benchmark
+async def test_benchmark_week_of_cpu_usage(fake_prometheus):
+    start, end = window(WEEK)
+
+    values = await measure(
+        "cpu_usage_overall, 1 series x 1 week",
+        lambda: MonitoringQueries.cpu_usage_overall(start, end, 60),
+    )
+    assert isinstance(values, MonitoringValues)
+
+    RangeQueryCache().clear()
+    packed = await measure(
+        "packed_series cpu, 1 series x 1 week, 500 points",
+        lambda: MonitoringQueries.packed_series(
+            MonitoringMetricKind.CPU_USAGE_OVERALL, start, end, 60, max_points=500
+        ),
+    )
+    assert packed.series[0].count == 500
+
+
+@pytest.mark.benchmark
+async def test_benchmark_day_of_disk_usage(fake_prometheus):
+    fake_prometheus.series = SLICES
+    start, end = window(DAY)
+
+    metrics = await measure(
+        f"disk_usage_overall, {SLICES} series x 1 day",
+        lambda: MonitoringQueries.disk_usage_overall(start, end, 60),
+    )
+    assert len(metrics.metrics) == SLICES
+
+    cached = await measure(
+        f"disk_usage_overall again, {SLICES} series x 1 day",
+        lambda: MonitoringQueries.disk_usage_overall(start, end, 60),
+    )
+    assert len(cached.metrics) == SLICES
+
+    RangeQueryCache().clear()
+    packed = await measure(
+        f"packed_series disk, {SLICES} series x 1 day, LTTB to 300 points",
+        lambda: MonitoringQueries.packed_series(
+            MonitoringMetricKind.DISK_USAGE_OVERALL,
+            start,
+            end,
+            60,
+            max_points=300,
+            downsample=DownsampleMethod.LTTB,
+        ),
+    )
+    assert len(packed.series) == SLICES
+
+
+@pytest.mark.benchmark
+async def test_benchmark_batch_with_latency(fake_prometheus):
+    fake_prometheus.series = SLICES
+    fake_prometheus.latency = 0.05
+    start, end = window(timedelta(hours=1))
+
+    batch = await measure(
+        "batch of every metric, 50 ms per request",
+        lambda: MonitoringQueries.batch(list(MonitoringMetricKind), start, end, 60),
+    )
+    assert len(batch.items) == len(MonitoringMetricKind)
+    # Queries overlap, so the batch takes less than its parts added up
+    assert batch.duration_ms < sum(item.duration_ms for item in batch.items)
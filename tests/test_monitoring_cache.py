@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+
+from selfprivacy_api.utils.monitoring_cache import RangeQueryCache, align_range
+
+STEP = 60
+# Far enough in the past for all points to be final
+BASE = 1_700_000_040
+
+
+class FakePrometheus:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, query: str, start: int, end: int, step: int):
+        self.calls.append((start, end))
+        return {
+            "resultType": "matrix",
+            "result": [
+                {
+                    "metric": {"device": device},
+                    "values": [
+                        [timestamp, f"{device}-{timestamp}"]
+                        for timestamp in range(start, end + 1, step)
+                    ],
+                }
+                for device in ["sda", "sdb"]
+            ],
+        }
+
+
+def timestamps(data: dict) -> list:
+    return [value[0] for value in data["result"][0]["values"]]
+
+
+def test_align_range():
+    assert align_range(125, 250, 60) == (120, 240)
+    assert align_range(125, 130, 60) == (120, 120)
+
+
+@pytest.mark.asyncio
+async def test_repeated_window_is_served_from_cache():
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    first = await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+    second = await cache.query("q", BASE + 5, BASE + 610, STEP, prometheus)
+
+    assert first == second
+    assert timestamps(first) == list(range(BASE, BASE + 601, STEP))
+    assert prometheus.calls == [(BASE, BASE + 600)]
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_extended_window_fetches_only_tail():
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+    data = await cache.query("q", BASE + 300, BASE + 900, STEP, prometheus)
+
+    assert prometheus.calls == [(BASE, BASE + 600), (BASE + 660, BASE + 900)]
+    assert timestamps(data) == list(range(BASE + 300, BASE + 901, STEP))
+    assert [series["metric"]["device"] for series in data["result"]] == [
+        "sda",
+        "sdb",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_window_before_cached_one_is_fetched():
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    await cache.query("q", BASE + 600, BASE + 900, STEP, prometheus)
+    data = await cache.query("q", BASE, BASE + 900, STEP, prometheus)
+
+    assert prometheus.calls == [(BASE + 600, BASE + 900), (BASE, BASE + 900)]
+    assert timestamps(data) == list(range(BASE, BASE + 901, STEP))
+
+
+@pytest.mark.asyncio
+async def test_recent_points_are_fetched_again(mocker):
+    mocker.patch(
+        "selfprivacy_api.utils.monitoring_cache.time.time", return_value=BASE + 600
+    )
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+    await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+
+    # The last two minutes were not final yet
+    assert prometheus.calls == [(BASE, BASE + 600), (BASE + 540, BASE + 600)]
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = RangeQueryCache()
+    calls = []
+
+    async def failing(query, start, end, step):
+        calls.append(start)
+        return "error"
+
+    assert await cache.query("q", BASE, BASE + 600, STEP, failing) == "error"
+    assert await cache.query("q", BASE, BASE + 600, STEP, failing) == "error"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_queries_are_evicted(mocker):
+    # Each query caches two series of 11 points
+    mocker.patch("selfprivacy_api.utils.monitoring_cache.MAX_CACHED_POINTS", 44)
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    for query in ["a", "b", "a", "c", "a", "b"]:
+        await cache.query(query, BASE, BASE + 600, STEP, prometheus)
+
+    # "b" was pushed out by "c"
+    assert len(prometheus.calls) == 4
+    assert cache.cached_points() == 44
+
+
+@pytest.mark.asyncio
+async def test_query_larger_than_cache_is_not_kept(mocker):
+    mocker.patch("selfprivacy_api.utils.monitoring_cache.MAX_CACHED_POINTS", 10)
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    data = await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+
+    assert timestamps(data) == list(range(BASE, BASE + 601, STEP))
+    assert cache.cached_points() == 0
+
+
+@pytest.mark.asyncio
+async def test_old_entries_are_rebuilt(mocker):
+    monotonic = mocker.patch(
+        "selfprivacy_api.utils.monitoring_cache.time.monotonic", return_value=0.0
+    )
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+    # Used all the time, but too long ago created
+    for now in range(1800, 7 * 60 * 60, 1800):
+        monotonic.return_value = float(now)
+        await cache.query("q", BASE, BASE + 600, STEP, prometheus)
+
+    assert prometheus.calls == [(BASE, BASE + 600), (BASE, BASE + 600)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch():
+    prometheus = FakePrometheus()
+    cache = RangeQueryCache()
+
+    async def slow(*args):
+        await asyncio.sleep(0.01)
+        return await prometheus(*args)
+
+    results = await asyncio.gather(
+        *[cache.query("q", BASE, BASE + 600, STEP, slow) for _ in range(5)]
+    )
+
+    assert all(result == results[0] for result in results)
+    assert prometheus.calls == [(BASE, BASE + 600)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_a_failed_fetch():
+    cache = RangeQueryCache()
+    calls = []
+
+    async def slow_failing(query, start, end, step):
+        calls.append(start)
+        await asyncio.sleep(0.01)
+        return "error"
+
+    results = await asyncio.gather(
+        *[cache.query("q", BASE, BASE + 600, STEP, slow_failing) for _ in range(5)]
+    )
+
+    assert results == ["error"] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_a_fetch_exception():
+    cache = RangeQueryCache()
+    calls = []
+
+    async def slow_raising(query, start, end, step):
+        calls.append(start)
+        await asyncio.sleep(0.01)
+        raise TimeoutError("Prometheus is down")
+
+    results = await asyncio.gather(
+        *[cache.query("q", BASE, BASE + 600, STEP, slow_raising) for _ in range(5)],
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, TimeoutError) for result in results)
+    assert len(calls) == 1
+
+
+def test_align_range_rejects_bad_step():
+    for step in [0, -60]:
+        with pytest.raises(ValueError):
+            align_range(125, 250, step)
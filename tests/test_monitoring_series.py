@@ -0,0 +1,91 @@
+import base64
+import math
+import struct
+
+import pytest
+
+from selfprivacy_api.utils.monitoring_series import (
+    columns_from_values,
+    downsample_buckets,
+    downsample_lttb,
+    pack_float64,
+    pack_int64,
+    unpack_float64,
+    unpack_int64,
+)
+
+
+def test_columns_from_values():
+    assert columns_from_values([[1700000000, "1.5"], [1700000060, "NaN"]])[0] == [
+        1700000000,
+        1700000060,
+    ]
+    values = columns_from_values([[1700000000, "1.5"], [1700000060, "NaN"]])[1]
+    assert values[0] == 1.5
+    assert math.isnan(values[1])
+
+
+def test_packing_is_little_endian():
+    assert base64.b64decode(pack_int64([1, 2])) == struct.pack("<qq", 1, 2)
+    assert base64.b64decode(pack_float64([0.5])) == struct.pack("<d", 0.5)
+
+
+def test_packing_roundtrip():
+    timestamps = [1700000000 + 60 * i for i in range(1000)]
+    values = [i / 7 for i in range(1000)]
+
+    assert unpack_int64(pack_int64(timestamps)) == timestamps
+    assert unpack_float64(pack_float64(values)) == values
+
+
+def test_lttb_keeps_ends_and_peaks():
+    timestamps = list(range(1000))
+    values = [0.0] * 1000
+    values[500] = 100.0
+    values[700] = -100.0
+
+    kept_timestamps, kept_values = downsample_lttb(timestamps, values, 50)
+
+    assert len(kept_timestamps) == len(kept_values) == 50
+    assert kept_timestamps[0] == 0
+    assert kept_timestamps[-1] == 999
+    assert kept_timestamps == sorted(kept_timestamps)
+    assert 100.0 in kept_values
+    assert -100.0 in kept_values
+
+
+def test_lttb_does_not_upsample():
+    timestamps = [1, 2, 3]
+    values = [1.0, 2.0, 3.0]
+    assert downsample_lttb(timestamps, values, 10) == (timestamps, values)
+
+
+@pytest.mark.parametrize("target", [-1, 0, 1, 2])
+def test_lttb_rejects_too_few_points(target):
+    with pytest.raises(ValueError):
+        downsample_lttb([1, 2, 3, 4], [1.0, 2.0, 3.0, 4.0], target)
+
+
+@pytest.mark.parametrize("target", [-1, 0])
+def test_bucket_downsampling_rejects_no_points(target):
+    with pytest.raises(ValueError):
+        downsample_buckets([1, 2], [1.0, 2.0], target, "max")
+
+
+@pytest.mark.parametrize(
+    "aggregate,expected",
+    [("min", [0.0, 5.0]), ("max", [4.0, 9.0]), ("avg", [2.0, 7.0])],
+)
+def test_bucket_downsampling(aggregate, expected):
+    timestamps = list(range(10))
+    values = [float(i) for i in range(10)]
+
+    assert downsample_buckets(timestamps, values, 2, aggregate) == (
+        [0, 5],
+        expected,
+    )
+
+
+def test_bucket_downsampling_unknown_aggregate():
+    with pytest.raises(ValueError):
+        downsample_buckets([1, 2], [1.0, 2.0], 1, "median")
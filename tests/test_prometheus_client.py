@@ -0,0 +1,59 @@
+import time
+import pytest
+
+from selfprivacy_api.utils.monitoring import MonitoringQueries, MonitoringValues
+from selfprivacy_api.utils.prometheus_client import PrometheusClient
+
+
+def range_response(values):
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": [{"metric": {}, "values": values}],
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_queries_share_one_client(prometheus_api):
+    now = int(time.time())
+    last_point = now - now % 60
+    prometheus_api.respond(data=range_response([[last_point, "1"]]))
+    prometheus_api.respond(data=range_response([[last_point, "2"]]))
+
+    cpu = await MonitoringQueries.cpu_usage_overall()
+    client = PrometheusClient().get_client()
+    memory = await MonitoringQueries.memory_usage_overall()
+
+    assert isinstance(cpu, MonitoringValues)
+    assert isinstance(memory, MonitoringValues)
+    assert [value.value for value in cpu.values + memory.values] == ["1", "2"]
+    assert PrometheusClient().get_client() is client
+
+    assert len(prometheus_api.requests) == 2
+    for request in prometheus_api.requests:
+        assert request.url.host == "localhost"
+        assert request.url.port == 9001
+        assert request.url.path == "/api/v1/query_range"
+        assert request.url.params["step"] == "60"
+
+
+@pytest.mark.asyncio
+async def test_closed_client_is_replaced():
+    client = PrometheusClient().get_client()
+
+    await PrometheusClient().aclose()
+
+    assert client.is_closed
+    assert PrometheusClient().get_client() is not client
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_reported(prometheus_api):
+    prometheus_api.respond(status_code=500, data={"error": "boom"})
+
+    result = await MonitoringQueries.cpu_usage_overall()
+
+    assert not isinstance(result, MonitoringValues)
+    assert "unexpected HTTP status code" in result.error
@@ -6,7 +6,11 @@ from typing import List
 
 from selfprivacy_api.utils.redis_pool import RedisPool
 
-from selfprivacy_api.jobs import Jobs, job_notifications
+from selfprivacy_api.jobs import Jobs, JobStatus, job_notifications
+from selfprivacy_api.utils.keyspace_notifications import (
+    KeyspaceNotifications,
+    SlowConsumerError,
+)
 
 TEST_KEY = "test:test"
 STOPWORD = "STOP"
@@ -215,3 +219,38 @@ async def test_jobs_generator(empty_redis):
         assert id in " ".join(channels)
     # Asserting that they came in order
     assert "testjob4" not in " ".join(channels)
+
+
+@pytest.mark.asyncio
+async def test_hub_shares_one_feed_per_pattern(empty_redis):
+    hub = KeyspaceNotifications()
+    async with hub.subscribe("jobs:*") as first, hub.subscribe("jobs:*") as second:
+        assert hub.subscriber_count("jobs:*") == 2
+        job = Jobs.add("testjob1", "test.test", "Testing aaaalll day")
+
+        for channel in [first, second]:
+            message = await channel.get()
+            assert message["data"] == "hset"
+            assert str(job.uid) in message["channel"]
+
+    assert hub.subscriber_count("jobs:*") == 0
+
+
+@pytest.mark.asyncio
+async def test_hub_drops_slow_consumer(empty_redis):
+    hub = KeyspaceNotifications()
+    async with hub.subscribe("jobs:*") as fast, hub.subscribe(
+        "jobs:*", buffer_size=1
+    ) as slow:
+        job = Jobs.add("testjob1", "test.test", "Testing aaaalll day")
+        Jobs.update(job, JobStatus.RUNNING)
+
+        assert (await fast.get())["data"] == "hset"
+        assert (await fast.get())["data"] == "hset"
+
+        # The buffered message is still delivered, then the error
+        assert (await slow.get())["data"] == "hset"
+        with pytest.raises(SlowConsumerError):
+            await slow.get()
+        assert slow.closed
+        assert hub.subscriber_count("jobs:*") == 1
@@ -0,0 +1,339 @@
+import asyncio
+
+import pytest
+
+from selfprivacy_api.models.services import ServiceStatus
+from selfprivacy_api.utils import systemd
+from selfprivacy_api.utils.systemd import (
+    UnitStateCache,
+    get_service_status_from_several_units,
+    unit_object_path,
+)
+
+
+class FakeMessage:
+    def __init__(self, path, contents):
+        self.path = path
+        self._contents = contents
+
+    def get_contents(self):
+        return self._contents
+
+
+class FakeSlot:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBus:
+    def __init__(self):
+        # {(member, path or None) -> callback}
+        self.matches = {}
+        self.slots = []
+
+    async def match_signal_async(self, sender, path, interface, member, callback):
+        self.matches[(member, path)] = callback
+        slot = FakeSlot()
+        self.slots.append(slot)
+        return slot
+
+    def emit(self, member, path, contents):
+        """Deliver a signal to the match it would reach on a real bus."""
+        for key in ((member, path), (member, None)):
+            if key in self.matches:
+                self.matches[key](FakeMessage(path, contents))
+                return
+
+
+class FakeSystemd:
+    """Units with their ActiveState, counting every D-Bus call made."""
+
+    def __init__(self, states, delay=0.0):
+        self.states = states
+        self.delay = delay
+        self.aliases = {}
+        self.loads = []
+        self.reads = []
+        self.listings = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.subscriptions = 0
+        self.bus = FakeBus()
+
+    async def load_unit(self, name):
+        self.loads.append(name)
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if name not in self.states:
+            raise Exception(f"Unit {name} not found")
+        return unit_object_path(name)
+
+    async def list_units_by_names(self, names):
+        self.listings.append(names)
+        await asyncio.sleep(self.delay)
+        listed = []
+        for name in names:
+            unit = self.aliases.get(name, name)
+            if unit not in self.states:
+                raise Exception(f"Unit {name} not found")
+            listed.append(
+                (
+                    unit,
+                    "",
+                    "loaded",
+                    self.states[unit],
+                    "running",
+                    "",
+                    unit_object_path(unit),
+                    0,
+                    "",
+                    "/",
+                )
+            )
+        return listed
+
+    async def subscribe(self):
+        self.subscriptions += 1
+
+    def unit_proxy(self, object_path):
+        fake = self
+
+        class FakeUnitProxy:
+            @property
+            async def active_state(self):
+                unit = next(
+                    name
+                    for name in fake.states
+                    if unit_object_path(name) == object_path
+                )
+                fake.reads.append(unit)
+                await asyncio.sleep(fake.delay)
+                return fake.states[unit]
+
+        return FakeUnitProxy()
+
+
+@pytest.fixture
+def fake_systemd(mocker):
+    fake = FakeSystemd(
+        {
+            "nginx.service": "active",
+            "redis.service": "active",
+            "broken.service": "failed",
+        }
+    )
+    connection = mocker.Mock()
+    connection.bus = fake.bus
+    mocker.patch.object(systemd.DbusConnection, "get_instance", lambda: connection)
+    mocker.patch("selfprivacy_api.utils.systemd.systemd_proxy", lambda: fake)
+    mocker.patch(
+        "selfprivacy_api.utils.systemd.get_unit_proxy_by_path", fake.unit_proxy
+    )
+    return fake
+
+
+async def test_states_are_read_once(fake_systemd):
+    cache = UnitStateCache()
+
+    assert await cache.get_active_state("nginx.service") == "active"
+    assert await cache.get_active_state("nginx.service") == "active"
+
+    assert fake_systemd.loads == ["nginx.service"]
+    assert fake_systemd.reads == ["nginx.service"]
+    assert set(fake_systemd.bus.matches) == {
+        ("PropertiesChanged", unit_object_path("nginx.service")),
+        ("UnitRemoved", "/org/freedesktop/systemd1"),
+        ("Reloading", "/org/freedesktop/systemd1"),
+    }
+
+
+async def test_missing_units_are_listed_at_once(fake_systemd):
+    cache = UnitStateCache()
+    await cache.get_active_state("nginx.service")
+
+    states = await cache.get_active_states(
+        ["nginx.service", "redis.service", "broken.service"]
+    )
+
+    assert states == {
+        "nginx.service": "active",
+        "redis.service": "active",
+        "broken.service": "failed",
+    }
+    assert fake_systemd.listings == [["redis.service", "broken.service"]]
+
+    await cache.get_active_states(["redis.service", "broken.service"])
+    assert len(fake_systemd.listings) == 1
+    assert fake_systemd.reads == ["nginx.service"]
+
+
+async def test_aliases_are_read_one_by_one(fake_systemd):
+    fake_systemd.aliases["www.service"] = "nginx.service"
+    fake_systemd.states["www.service"] = "active"
+
+    states = await UnitStateCache().get_active_states(["www.service", "redis.service"])
+
+    assert states == {"www.service": "active", "redis.service": "active"}
+    assert fake_systemd.reads == ["www.service"]
+
+
+async def test_units_are_read_concurrently_if_listing_fails(fake_systemd, mocker):
+    fake_systemd.delay = 0.01
+    mocker.patch.object(
+        fake_systemd,
+        "list_units_by_names",
+        mocker.AsyncMock(side_effect=Exception("Unknown method")),
+    )
+
+    states = await UnitStateCache().get_active_states(
+        ["nginx.service", "redis.service", "broken.service"]
+    )
+
+    assert states == {
+        "nginx.service": "active",
+        "redis.service": "active",
+        "broken.service": "failed",
+    }
+    assert fake_systemd.most_in_flight == 3
+
+
+async def test_properties_changed_updates_state(fake_systemd):
+    cache = UnitStateCache()
+    await cache.get_active_state("nginx.service")
+
+    fake_systemd.bus.emit(
+        "PropertiesChanged",
+        unit_object_path("nginx.service"),
+        ("org.freedesktop.systemd1.Unit", {"ActiveState": ("s", "deactivating")}, []),
+    )
+
+    assert await cache.get_active_state("nginx.service") == "deactivating"
+    assert fake_systemd.reads == ["nginx.service"]
+
+
+async def test_only_units_asked_for_are_followed(fake_systemd):
+    cache = UnitStateCache()
+    await cache.get_active_states(["nginx.service", "redis.service"])
+
+    followed = {
+        path
+        for member, path in fake_systemd.bus.matches
+        if member == "PropertiesChanged"
+    }
+    assert followed == {
+        unit_object_path("nginx.service"),
+        unit_object_path("redis.service"),
+    }
+
+
+async def test_signal_during_listing_wins(fake_systemd):
+    fake_systemd.delay = 0.01
+    cache = UnitStateCache()
+    await cache.get_active_state("redis.service")
+
+    listing = asyncio.create_task(cache.get_active_states(["nginx.service"]))
+    await asyncio.sleep(0.005)
+    fake_systemd.bus.emit(
+        "PropertiesChanged",
+        unit_object_path("nginx.service"),
+        ("org.freedesktop.systemd1.Unit", {"ActiveState": ("s", "reloading")}, []),
+    )
+    await listing
+
+    assert await cache.get_active_state("nginx.service") == "reloading"
+
+
+async def test_removed_unit_is_read_again(fake_systemd):
+    cache = UnitStateCache()
+    await cache.get_active_state("nginx.service")
+
+    fake_systemd.states["nginx.service"] = "inactive"
+    fake_systemd.bus.emit(
+        "UnitRemoved",
+        "/org/freedesktop/systemd1",
+        ("nginx.service", unit_object_path("nginx.service")),
+    )
+
+    assert await cache.get_active_state("nginx.service") == "inactive"
+    assert fake_systemd.loads == ["nginx.service", "nginx.service"]
+
+
+async def test_signal_during_read_wins(fake_systemd):
+    fake_systemd.delay = 0.01
+    cache = UnitStateCache()
+    await cache.get_active_state("redis.service")
+
+    read = asyncio.create_task(cache.get_active_state("nginx.service"))
+    await asyncio.sleep(0.015)
+    fake_systemd.bus.emit(
+        "PropertiesChanged",
+        unit_object_path("nginx.service"),
+        ("org.freedesktop.systemd1.Unit", {"ActiveState": ("s", "reloading")}, []),
+    )
+    await read
+
+    assert await cache.get_active_state("nginx.service") == "reloading"
+
+
+async def test_status_of_several_units(fake_systemd):
+    assert (
+        await get_service_status_from_several_units(["nginx.service", "redis.service"])
+        == ServiceStatus.ACTIVE
+    )
+    assert (
+        await get_service_status_from_several_units(["nginx.service", "broken.service"])
+        == ServiceStatus.FAILED
+    )
+    assert (
+        await get_service_status_from_several_units(["nginx.service", "gone.service"])
+        == ServiceStatus.OFF
+    )
+
+
+async def test_without_signals_states_are_read_live(fake_systemd, mocker):
+    mocker.patch.object(
+        systemd.DbusConnection,
+        "get_instance",
+        mocker.Mock(side_effect=Exception("no bus")),
+    )
+    cache = UnitStateCache()
+
+    assert await cache.get_active_state("nginx.service") == "active"
+    assert await cache.get_active_state("nginx.service") == "active"
+
+    assert fake_systemd.reads == ["nginx.service", "nginx.service"]
+    assert fake_systemd.loads == ["nginx.service"]
+
+
+async def test_unit_which_cannot_be_followed_is_read_live(fake_systemd, mocker):
+    cache = UnitStateCache()
+    await cache.get_active_state("redis.service")
+    mocker.patch.object(
+        fake_systemd.bus,
+        "match_signal_async",
+        mocker.AsyncMock(side_effect=Exception("match limit reached")),
+    )
+
+    assert await cache.get_active_state("nginx.service") == "active"
+    assert await cache.get_active_state("nginx.service") == "active"
+
+    assert fake_systemd.reads == ["redis.service", "nginx.service", "nginx.service"]
+
+
+def test_matches_of_closed_loops_are_removed(fake_systemd):
+    cache = UnitStateCache()
+
+    # Like huey jobs, each in a loop of its own
+    assert asyncio.run(cache.get_active_state("nginx.service")) == "active"
+    first_slots = list(fake_systemd.bus.slots)
+    assert asyncio.run(cache.get_active_state("nginx.service")) == "active"
+
+    assert first_slots and all(slot.closed for slot in first_slots)
+    assert not any(slot.closed for slot in fake_systemd.bus.slots[len(first_slots) :])
+    assert len(cache._loop_states) == 1
+    assert fake_systemd.subscriptions == 1
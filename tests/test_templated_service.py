@@ -1,5 +1,6 @@
 import json
 from copy import deepcopy
+from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
@@ -14,6 +15,7 @@ from selfprivacy_api.services.config_item import (
     IntServiceConfigItem,
     StringServiceConfigItem,
 )
+from selfprivacy_api.services.generic_size_counter import StorageUsageMeasurement
 from selfprivacy_api.services.owned_path import OwnedPath
 from selfprivacy_api.services.flake_service_manager import (
     DEFAULT_NIXOS_CONFIG_URL,
@@ -744,13 +746,40 @@ def test_set_configuration_delegates_to_config_items(generic_userdata):
 @pytest.mark.asyncio
 async def test_get_storage_usage_sums_across_folders(mocker):
     async def fake_size(folder):
-        return {"a": 10, "b": 20, "c": 5}[folder]
+        return StorageUsageMeasurement(
+            usage={"a": 10, "b": 20, "c": 5}[folder],
+            measured_at=datetime(2024, 1, {"a": 3, "b": 1, "c": 2}[folder]),
+        )
 
     mocker.patch(
-        f"{TEMPLATED_SERVICE_MODULE_PATH}.get_storage_usage", side_effect=fake_size
+        "selfprivacy_api.services.generic_size_counter.get_storage_usage_measurement",
+        side_effect=fake_size,
     )
     service = _make_service(meta_patch={"folders": ["a", "b", "c"]})
-    assert (await service.get_storage_usage()) == 35
+    measurement = await service.get_storage_usage_measurement()
+    assert measurement.usage == 35
+    assert measurement.measured_at == datetime(2024, 1, 1)
+    assert {
+        folder: measurement.usage
+        for folder, measurement in (await service.get_storage_usage_by_folder()).items()
+    } == {"a": 10, "b": 20, "c": 5}
+
+
+@pytest.mark.asyncio
+async def test_get_storage_usage_measures_now(mocker):
+    async def fake_measure(folder):
+        return StorageUsageMeasurement(
+            usage={"a": 10, "b": 20}[folder], measured_at=datetime.now()
+        )
+
+    measure = mocker.patch(
+        "selfprivacy_api.services.generic_size_counter.measure_storage_usage",
+        side_effect=fake_measure,
+    )
+    service = _make_service(meta_patch={"folders": ["a", "b"]})
+
+    assert (await service.get_storage_usage()) == 30
+    assert sorted(call.args[0] for call in measure.call_args_list) == ["a", "b"]
 
 
 def test_has_folders_false_when_none_exist(tmpdir):